@@ -13,10 +13,14 @@ description:
   - This plugin works with an existing state file to create an inventory from resources created by cloud providers.
   - The plugin accepts a Terraform backend config to an existing state file or a path to an existing state file.
   - Uses a YAML configuration file that ends with terraform_state.(yml|yaml).
-  - Does not support caching.
+  - When the inventory cache is enabled, the cached resources of the V(local) and V(http) backends read without
+    the terraform binary are only used while their states keep the same lineage and serial, which is checked
+    by reading the head of the local state file or by a conditional request to the http backend.
+    The resources of the states pulled by terraform are used until the cache expires.
   - The Terraform providers for AWS, Azure and Google Cloud are supported by Red Hat Ansible. Other providers are supported by the community.
 extends_documentation_fragment:
   - constructed
+  - inventory_cache
 version_added: 2.1.0
 options:
   plugin:
@@ -30,8 +34,11 @@ options:
     description:
       - The Terraform backend type from which the state file will be retrieved.
       - Use V(cloud) for backend configured using cloud block, see U(https://developer.hashicorp.com/terraform/cli/cloud/settings#the-cloud-block).
+      - Required unless O(backends) is set.
+      - The states of the V(local) and V(http) backends are read directly, without running terraform, unless
+        they are configured with O(backend_config_files) or with options only known to terraform.
+        The relative paths of the V(local) backend are relative to the current directory.
     type: str
-    required: true
   backend_config:
     description:
       - A group of key-values used to configure the backend.
@@ -44,14 +51,106 @@ options:
       - Ignored if O(backend_type=cloud).
     type: list
     elements: path
+  backends:
+    description:
+      - A list of backends to pull the states from, in addition to the one defined by O(backend_type),
+        O(backend_config) and O(backend_config_files).
+      - The states are pulled concurrently, and their resources are merged into a single inventory.
+      - A backend from which the state cannot be pulled is reported as a warning, the plugin only fails
+        when the states cannot be pulled from any of the backends.
+    type: list
+    elements: dict
+    version_added: 5.0.0
+    suboptions:
+      backend_type:
+        description:
+          - The Terraform backend type from which the state file will be retrieved.
+        type: str
+        required: true
+      backend_config:
+        description:
+          - A group of key-values used to configure the backend, including the key of the state for
+            the backends storing several states.
+        type: dict
+      backend_config_files:
+        description:
+          - The absolute paths to configuration files to provide at init state to the -backend-config parameter.
+        type: list
+        elements: path
+      workspace:
+        description:
+          - The Terraform workspace to pull the state of, set with the C(TF_WORKSPACE) environment variable.
+          - Mutually exclusive with O(backends[].workspaces).
+        type: str
+      workspaces:
+        description:
+          - The Terraform workspaces to pull the states of, see O(workspaces).
+          - Mutually exclusive with O(backends[].workspace).
+        type: list
+        elements: str
+  workspaces:
+    description:
+      - Names of the Terraform workspaces of the backend defined by O(backend_type) to pull the states of,
+        shell-style patterns such as V(prod-*) are allowed.
+      - The workspaces are listed with C(terraform workspace list) from a single working directory initialized
+        for the backend, and the states of the matching ones are pulled concurrently, each with the
+        C(TF_WORKSPACE) environment variable set.
+      - The hosts of every matching workspace, including the V(default) one, get the C(terraform_workspace)
+        variable and are added to the C(workspace_<name>) group of their workspace, with the invalid characters
+        of the name replaced by C(_). The hosts of the backends configured with O(backends[].workspace) get them too.
+      - The hosts keep the names resolved from O(hostnames). As the same configuration applied to several
+        workspaces gives the same names to their hosts, the hosts of a workspace whose name is also given
+        to a host of another workspace or backend are prefixed with the name of the workspace and C(_),
+        for example C(prod_aws_instance_web). The prefixed hosts get the unprefixed name as C(ansible_host),
+        so that a host named after its address is still reached.
+      - The terraform binary is required to list the workspaces, including for the V(local) and V(http) backends.
+      - A workspace from which the state cannot be pulled is reported as a warning, the plugin only fails
+        when the states cannot be pulled from any of the workspaces.
+    type: list
+    elements: str
+    version_added: 5.0.0
+  concurrency:
+    description:
+      - Maximum number of states pulled at the same time when several backends are configured,
+        and maximum number of workspaces of each backend pulled at the same time when O(workspaces) is set.
+    type: int
+    default: 4
+    version_added: 5.0.0
   search_child_modules:
     description:
       - Whether to include resources from Terraform child modules.
     type: bool
     default: false
+  hostvar_include:
+    description:
+      - Names of the attributes of the instances to set as host variables, shell-style patterns such as
+        V(tags*) are allowed.
+      - When not set, all the attributes are set, except the ones matching O(hostvar_exclude).
+      - O(compose), O(keyed_groups) and O(groups) are evaluated against all the attributes of the instances,
+        and the variables composed with O(compose) are always set.
+    type: list
+    elements: str
+    version_added: 5.0.0
+  hostvar_exclude:
+    description:
+      - Names of the attributes of the instances not to set as host variables, shell-style patterns such as
+        V(*_data) are allowed.
+      - Takes precedence over O(hostvar_include).
+    type: list
+    elements: str
+    default: []
+    version_added: 5.0.0
+  hostvar_max_bytes:
+    description:
+      - When greater than 0, the attributes whose value, serialized as JSON, is larger than this number
+        of bytes are not set as host variables.
+    type: int
+    default: 0
+    version_added: 5.0.0
   binary_path:
     description:
       - The path of a terraform binary to use.
+      - The binary is not required when all the states are read from V(local) or V(http) backends.
     type: path
   provider_mapping:
     description:
@@ -69,6 +168,7 @@ options:
       types:
         description:
           - A list of terraform resources should be added to the inventory.
+          - Since version 5.0.0, the types may be shell-style patterns, for example V(aws_*instance).
         type: list
         elements: str
         required: True
@@ -102,6 +202,53 @@ options:
         type: str
         default: '_'
         required: False
+  working_dir_ttl:
+    description:
+      - When greater than 0, the Terraform working directory used to pull the state is kept under O(cache_dir)
+        and reused for this number of seconds, so that later runs of the plugin only run C(terraform state pull).
+      - The working directory is keyed on O(backend_type), O(backend_config), the content of O(backend_config_files)
+        and O(binary_path). It is initialized again with C(terraform init) once O(working_dir_ttl) expired,
+        or when pulling the state from it fails.
+      - Working directories which were not initialized for O(working_dir_ttl) seconds are removed.
+      - The working directories contain the backend configuration, including credentials,
+        and are only accessible by the current user.
+      - When V(0), a temporary working directory is initialized on every run of the plugin.
+    type: int
+    default: 0
+    version_added: 5.0.0
+  reuse_unchanged_states:
+    description:
+      - When V(true), the resources read from each state are recorded under O(cache_dir), along with the lineage
+        and serial of the state, and the C(ETag) and C(Last-Modified) headers of the V(http) backend
+        or the modification time of the V(local) one.
+      - The next runs of the plugin send conditional requests to the V(http) backend and skip reading an
+        unchanged V(local) state. The states of the other backends are still pulled with C(terraform state pull),
+        but are only decoded when their lineage or serial changed.
+      - The records contain the attributes of the resources, and are only accessible by the current user.
+    type: bool
+    default: false
+    version_added: 5.0.0
+  change_groups:
+    description:
+      - When V(true), each host is added to the C(tf_added), C(tf_changed) or C(tf_unchanged) group,
+        depending on how its attributes changed since the previous states.
+      - A digest of the attributes of each host is recorded under O(cache_dir) for each inventory source,
+        along with the lineage and serial of the states. The hosts are compared to the record made before
+        the last change of the states, so loading the inventory again keeps the same groups until a state
+        gets a new serial.
+      - All the hosts are in the C(tf_added) group the first time the inventory source is read.
+    type: bool
+    default: false
+    version_added: 5.0.0
+  cache_dir:
+    description:
+      - Directory under which the working directories are kept when O(working_dir_ttl) is set,
+        the states are recorded when O(reuse_unchanged_states) is enabled
+        and the digests of the hosts are recorded when O(change_groups) is enabled.
+      - When not set, the C(ANSIBLE_TERRAFORM_CACHE_DIR) environment variable is used,
+        falling back to C(~/.cache/ansible/cloud.terraform).
+    type: path
+    version_added: 5.0.0
 """
 
 EXAMPLES = r"""
@@ -485,21 +632,93 @@ EXAMPLES = r"""
     organization: redhat
     workspaces:
       name: ansible
+
+# Pulling the states of several projects concurrently into a single inventory
+- name: Using several backends
+  plugin: cloud.terraform.terraform_state
+  backends:
+    - backend_type: s3
+      backend_config:
+        region: us-east-1
+        bucket: my-sample-bucket
+        key: network/terraform.tfstate
+    - backend_type: s3
+      backend_config:
+        region: us-east-1
+        bucket: my-sample-bucket
+        key: compute/terraform.tfstate
+      workspace: production
+  concurrency: 8
+
+# Configuring only the hosts which changed since the previous apply
+- name: Using change_groups to target the added and changed hosts
+  plugin: cloud.terraform.terraform_state
+  backend_type: s3
+  backend_config:
+    region: us-east-1
+    key: terraform/state
+    bucket: my-sample-bucket
+  change_groups: true
+
+  # Running command `ansible-playbook -i change_terraform_state.yaml --limit tf_added:tf_changed site.yml`
+  # would then only configure the hosts added or replaced since the previous state.
+
+# Pulling the states of all the regional workspaces of a backend
+- name: Using workspaces to pull the states of several workspaces
+  plugin: cloud.terraform.terraform_state
+  backend_type: s3
+  backend_config:
+    region: us-east-1
+    key: terraform/state
+    bucket: my-sample-bucket
+  workspaces:
+    - eu-*
+    - us-east-1
+  concurrency: 8
+
+  # Running command `ansible-inventory -i workspaces_terraform_state.yaml --graph` would then produce the inventory:
+  # @all:
+  # |--@ungrouped:
+  # |--@workspace_eu_west_1:
+  # |  |--eu-west-1_aws_instance_test
+  # |--@workspace_us_east_1:
+  # |  |--us-east-1_aws_instance_test
+  #
+  # The hosts of both workspaces are named aws_instance_test, they are prefixed with their workspace
+  # to stay distinct. A name given to the hosts of a single workspace is kept as is.
 """
 
 
+import fnmatch
+import hashlib
+import inspect
+import json
 import os
 import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from functools import lru_cache, partial
 from tempfile import TemporaryDirectory
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.ansible_release import __version__ as ansible_version
 from ansible.module_utils.common import process
-from ansible.plugins.inventory import Constructable
+from ansible.module_utils.compat.version import LooseVersion
+from ansible.plugins.inventory import Cacheable, Constructable
+from ansible_collections.cloud.terraform.plugins.module_utils.cache import (
+    directory_lock,
+    get_cache_dir,
+    hash_file,
+    write_atomic,
+)
 from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError, TerraformWarning
 from ansible_collections.cloud.terraform.plugins.module_utils.models import (
+    TerraformState,
     TerraformStateResource,
     TerraformStateResourceInstance,
 )
@@ -507,6 +726,13 @@ from ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands
 from ansible_collections.cloud.terraform.plugins.module_utils.utils import ansible_dict_to_hcl, validate_bin_path
 from ansible_collections.cloud.terraform.plugins.plugin_utils.base import TerraformInventoryPluginBase
 from ansible_collections.cloud.terraform.plugins.plugin_utils.common import module_run_command
+from ansible_collections.cloud.terraform.plugins.plugin_utils.state_readers import (
+    fetch_state,
+    parse_state,
+    state_header,
+    state_unchanged,
+    supports_native_read,
+)
 
 
 @dataclass
@@ -526,8 +752,17 @@ PROVIDERS_CONFIG = [
     ),
 ]
 TERRAFORM_STATE_FILE_SUPPORT_VERSION = 4
+WORKING_DIR_INITIALIZED_MARKER = ".initialized"
+STATE_RECORDS_DIR = "inventory_states"
+HOST_DIGESTS_DIR = "inventory_hosts"
+# the template engine with the compile step the constructed expressions are memoized through
+COMPILE_HOOK_MIN_ANSIBLE_VERSION = "2.19"
+
+# loads the resources of a state document, read from a backend as bytes or pulled as text, given its source and validators
+StateLoader = Callable[[Union[str, bytes], str, Dict[str, str]], List[TerraformStateResource]]
 
 
+@lru_cache(maxsize=1024)
 def parse_provider_from_state_file_resource(provider: str) -> Optional[str]:
     """
     Read the provider from the State file resource.
@@ -542,35 +777,138 @@ def parse_provider_from_state_file_resource(provider: str) -> Optional[str]:
     return result
 
 
-def filter_instances(
-    resources: List[TerraformStateResource],
-    search_child_modules: bool,
-    custom_providers: List[TerraformProviderInstance],
-) -> List[TerraformStateResource]:
-    results: List[TerraformStateResource] = []
-    for r in resources:
-        if not search_child_modules and r.module:
-            # Skip child_modules resource when search_child_modules is set to False
-            continue
-        provider_name = parse_provider_from_state_file_resource(r.provider)
-        if any(r.type in p.types and provider_name == p.provider_name for p in PROVIDERS_CONFIG + custom_providers):
-            results.append(r)
-    return results
+class ProviderMatcher:
+    """Tells whether the resources of a provider and a type are instances of the inventory.
+
+    The types of the providers may be glob patterns. The answer is computed once for each provider
+    and type found in the state, as a state usually holds many resources of a few types.
+    """
+
+    def __init__(self, providers: List[TerraformProviderInstance]) -> None:
+        self._types: Set[Tuple[str, str]] = set()
+        patterns: Dict[str, List[str]] = {}
+        for provider in providers:
+            for resource_type in provider.types:
+                if any(c in resource_type for c in "*?["):
+                    patterns.setdefault(provider.provider_name, []).append(fnmatch.translate(resource_type))
+                else:
+                    self._types.add((provider.provider_name, resource_type))
+        self._patterns = {name: re.compile("|".join(p)) for name, p in patterns.items()}
+        self._matches: Dict[Tuple[str, str], bool] = {}
+
+    def matches(self, provider: str, resource_type: str) -> bool:
+        """Whether the resources of a provider, as written in the state, and a type are instances."""
+        key = (provider, resource_type)
+        match = self._matches.get(key)
+        if match is None:
+            provider_name = parse_provider_from_state_file_resource(provider)
+            pattern = self._patterns.get(provider_name) if provider_name else None
+            match = (provider_name, resource_type) in self._types or bool(pattern and pattern.match(resource_type))
+            self._matches[key] = match
+        return match
+
+
+def resource_filter(
+    search_child_modules: bool, custom_providers: List[TerraformProviderInstance]
+) -> Callable[[Dict[str, Any]], bool]:
+    """Tells whether a resource of the state, as JSON, is an instance, before decoding the others."""
+    matcher = ProviderMatcher(PROVIDERS_CONFIG + custom_providers)
+
+    def is_instance(resource: Dict[str, Any]) -> bool:
+        # Skip child_modules resource when search_child_modules is set to False
+        if not search_child_modules and resource.get("module"):
+            return False
+        return matcher.matches(resource.get("provider") or "", resource.get("type") or "")
+
+    return is_instance
+
+
+class TagHostname:
+    """A tag:Name=Value,Name hostname preference, split once for all the instances."""
+
+    def __init__(self, preference: str) -> None:
+        # from 'tag:Name=Tag1,Name=Tag2' to [('Name', 'Tag1', 'Name_Tag1'), ('Name', 'Tag2', 'Name_Tag2')]
+        self._tags: List[Tuple[str, Optional[str], str]] = []
+        for v in preference.split("tag:", 1)[1].split(","):
+            items = v.split("=", 1)
+            if len(items) > 1:
+                self._tags.append((items[0], items[1], to_text(items[0]) + "_" + to_text(items[1])))
+            else:
+                self._tags.append((v, None, v))
+
+    def __call__(self, instance: TerraformStateResourceInstance) -> Optional[str]:
+        instance_tags: Dict[str, str] = instance.attributes.get("tags", {})  # type: ignore  # mypy ignore
+        hostname = None
+        for key, value, tag_hostname in self._tags:
+            if value is not None:
+                if instance_tags.get(key) == value:
+                    hostname = tag_hostname
+            elif instance_tags.get(key):
+                hostname = instance_tags.get(key)
+        return hostname
 
 
 def get_tag_hostname(instance: TerraformStateResourceInstance, preference: str) -> Optional[str]:
-    # from 'tag:Name=Tag1,Name=Tag2' to ['Name=Tag1', 'Name=Tag2']
-    tag_hostnames = preference.split("tag:", 1)[1].split(",")
-    instance_tags: Dict[str, str] = instance.attributes.get("tags", {})  # type: ignore  # mypy ignore
-    hostname = None
-    for v in tag_hostnames:
-        items = v.split("=", 1)
-        if len(items) > 1:
-            if instance_tags.get(items[0]) == items[1]:
-                hostname = to_text(items[0]) + "_" + to_text(items[1])
-        elif instance_tags.get(v):
-            hostname = instance_tags.get(v)
-    return hostname
+    return TagHostname(preference)(instance)
+
+
+HostnameGetter = Callable[[str, str, TerraformStateResourceInstance], Optional[str]]
+
+
+class HostnameResolver:
+    """The hostnames preferences, compiled once for all the instances of an inventory."""
+
+    def __init__(self, hostnames: Optional[List[Any]] = None) -> None:
+        self._getters = [self._compile(preference) for preference in hostnames or []]
+
+    @classmethod
+    def _compile(cls, preference: Any) -> HostnameGetter:
+        if isinstance(preference, dict):
+            if "name" not in preference:
+                raise TerraformError("A 'name' key must be defined in a hostnames dictionary.")
+            name = cls._compile(preference["name"])
+            if "prefix" not in preference:
+                return name
+            prefix = cls._compile(preference["prefix"])
+            separator = preference.get("separator", "_")
+
+            def prefixed(
+                resource_name: str, resource_type: str, instance: TerraformStateResourceInstance
+            ) -> Optional[str]:
+                hostname = name(resource_name, resource_type, instance)
+                if hostname:
+                    hostname_from_prefix = prefix(resource_name, resource_type, instance)
+                    if hostname_from_prefix:
+                        hostname = hostname_from_prefix + separator + hostname
+                return hostname
+
+            return prefixed
+
+        if preference.startswith("tag:"):
+            tag_hostname = TagHostname(preference)
+            return lambda resource_name, resource_type, instance: tag_hostname(instance)
+
+        def attribute(
+            resource_name: str, resource_type: str, instance: TerraformStateResourceInstance
+        ) -> Optional[str]:
+            # a preference which is not an attribute is used as a literal hostname
+            if preference in instance.attributes:
+                return str(instance.attributes.get(preference, ""))
+            return str(preference)
+
+        return attribute
+
+    def __call__(
+        self, resource_name: str, resource_type: str, instance: TerraformStateResourceInstance
+    ) -> Optional[str]:
+        if not self._getters:
+            return resource_type + "_" + resource_name
+        hostname = None
+        for getter in self._getters:
+            hostname = getter(resource_name, resource_type, instance)
+            if hostname:
+                break
+        return hostname
 
 
 def get_preferred_hostname(
@@ -579,32 +917,125 @@ def get_preferred_hostname(
     instance: TerraformStateResourceInstance,
     hostnames: Optional[List[Any]] = None,
 ) -> Optional[str]:
-    if not hostnames:
-        return resource_type + "_" + resource_name
+    return HostnameResolver(hostnames)(resource_name, resource_type, instance)
 
-    hostname = None
-    for preference in hostnames:
-        if isinstance(preference, dict):
-            if "name" not in preference:
-                raise TerraformError("A 'name' key must be defined in a hostnames dictionary.")
-            hostname = get_preferred_hostname(resource_name, resource_type, instance, [preference["name"]])
-            hostname_from_prefix = None
-            if hostname and "prefix" in preference:
-                hostname_from_prefix = get_preferred_hostname(
-                    resource_name, resource_type, instance, [preference["prefix"]]
-                )
-                separator = preference.get("separator", "_")
-                if hostname_from_prefix:
-                    hostname = hostname_from_prefix + separator + hostname
-        elif preference.startswith("tag:"):
-            hostname = get_tag_hostname(instance, preference)
+
+def colliding_hostnames(hosts: List[Tuple[str, Optional[str]]]) -> Set[str]:
+    """The names given to hosts pulled from different workspaces, given the name and workspace of each host."""
+    workspaces: Dict[str, Set[Optional[str]]] = {}
+    for name, workspace in hosts:
+        workspaces.setdefault(name, set()).add(workspace)
+    return {name for name, found in workspaces.items() if len(found) > 1}
+
+
+class HostVarProjection:
+    """Selects the attributes of the instances set as host variables."""
+
+    def __init__(self, include: Optional[List[str]], exclude: Optional[List[str]], max_bytes: int = 0) -> None:
+        self._include = re.compile("|".join(fnmatch.translate(p) for p in include)) if include else None
+        self._exclude = re.compile("|".join(fnmatch.translate(p) for p in exclude)) if exclude else None
+        self._max_bytes = max_bytes
+        # the instances of a state share a few attribute names
+        self._selected: Dict[str, bool] = {}
+
+    def _select(self, name: str) -> bool:
+        selected = self._selected.get(name)
+        if selected is None:
+            selected = (self._include is None or bool(self._include.match(name))) and not (
+                self._exclude and self._exclude.match(name)
+            )
+            self._selected[name] = selected
+        return selected
+
+    def _fits(self, value: Any) -> bool:
+        if self._max_bytes <= 0 or value is None or isinstance(value, (bool, int, float)):
+            return True
+        if isinstance(value, str):
+            # escaping a byte takes at most 6 bytes, a string is only serialized when close to the limit
+            size = len(to_bytes(value))
+            if size > self._max_bytes:
+                return False
+            if size * 6 + 2 <= self._max_bytes:
+                return True
+        return len(to_bytes(json.dumps(value, default=str))) <= self._max_bytes
+
+    def __call__(self, attributes: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in attributes.items() if self._select(k) and self._fits(v)}
+
+
+def constructed_expressions(
+    compose: Optional[Dict[str, Any]], keyed_groups: Optional[List[Any]], groups: Optional[Dict[str, Any]]
+) -> Set[str]:
+    expressions: Set[str] = set()
+    if isinstance(compose, dict):
+        expressions.update(v for v in compose.values() if isinstance(v, str))
+    if isinstance(keyed_groups, list):
+        expressions.update(k["key"] for k in keyed_groups if isinstance(k, dict) and isinstance(k.get("key"), str))
+    if isinstance(groups, dict):
+        # conditionals are evaluated stripped
+        expressions.update(v.strip() for v in groups.values() if isinstance(v, str))
+    return expressions
+
+
+def supports_compile_hook(engine: Any) -> bool:
+    """Whether the template engine has the compile step the constructed expressions are memoized through.
+
+    The step is not part of the public templar API, it is only wrapped on the ansible-core versions
+    and with the signature it is known to have.
+    """
+    compile_expression = getattr(engine, "_compile_expression", None)
+    if LooseVersion(ansible_version) < LooseVersion(COMPILE_HOOK_MIN_ANSIBLE_VERSION) or not callable(
+        compile_expression
+    ):
+        return False
+    try:
+        return list(inspect.signature(compile_expression).parameters) == ["expression", "options"]
+    except (TypeError, ValueError):
+        return False
+
+
+@contextmanager
+def compiled_expressions(templar: Any, expressions: Set[str], note: Callable[[str], None]) -> Iterator[None]:
+    """Compiles each of the expressions once while the inventory is created.
+
+    The templar compiles an expression again every time it is evaluated, which dominates
+    the cost of compose, keyed_groups and groups evaluated for each host. When the template
+    engine has no supported compile step to hook into, the templar is left unchanged and
+    the expressions are compiled on each evaluation, as noted through the callback.
+    """
+    if not expressions:
+        yield
+        return
+    engine: Any = getattr(templar, "_engine", None)
+    if not supports_compile_hook(engine):
+        note(
+            "The constructed expressions are compiled for each host, ansible-core %s has no supported "
+            "template compile step to cache them with." % ansible_version
+        )
+        yield
+        return
+
+    compile_expression = engine._compile_expression
+    compiled: Dict[Tuple[str, Any], Any] = {}
+
+    def _compile_expression(expression: str, options: Any) -> Any:
+        if expression not in expressions:
+            return compile_expression(expression, options)
+        key = (expression, options)
+        template = compiled.get(key)
+        if template is None:
+            template = compiled[key] = compile_expression(expression, options)
+        return template
+
+    overridden = "_compile_expression" in vars(engine)
+    setattr(engine, "_compile_expression", _compile_expression)
+    try:
+        yield
+    finally:
+        if overridden:
+            setattr(engine, "_compile_expression", compile_expression)
         else:
-            hostname = preference
-            if preference in instance.attributes:
-                hostname = str(instance.attributes.get(preference, ""))
-        if hostname:
-            break
-    return hostname
+            delattr(engine, "_compile_expression")
 
 
 def write_terraform_config(backend_type: str, backend_config: Optional[Dict[str, Any]], path: str) -> None:
@@ -649,9 +1080,157 @@ def purge_backend_config(backend_config: Dict[str, Any], path: str) -> bool:
     return bool(m_keys)
 
 
-class InventoryModule(TerraformInventoryPluginBase, Constructable):  # type: ignore  # mypy ignore
+def working_dir_key(
+    terraform_binary: Optional[str],
+    backend_type: str,
+    backend_config: Optional[Dict[str, Any]],
+    backend_config_files: Optional[List[str]],
+    workspace: Optional[str] = None,
+) -> str:
+    """Key of the working directory initialized for a backend."""
+    digest = hashlib.sha256()
+    digest.update(
+        to_bytes(json.dumps([terraform_binary, backend_type, backend_config, workspace], sort_keys=True, default=str))
+    )
+    for backend_config_file in backend_config_files or []:
+        digest.update(to_bytes(backend_config_file))
+        hash_file(digest, backend_config_file)
+    return digest.hexdigest()
+
+
+def remove_expired_working_dirs(working_dirs: str, ttl: int, keep: str) -> None:
+    """Remove the working directories which were not initialized for longer than the TTL,
+    unless another process is using them.
+    """
+    try:
+        entries = os.listdir(working_dirs)
+    except OSError:
+        return
+    expiration = time.time() - ttl
+    for entry in entries:
+        working_dir = os.path.join(working_dirs, entry)
+        if entry == keep or not os.path.isdir(working_dir):
+            continue
+        try:
+            last_initialized = os.path.getmtime(os.path.join(working_dir, WORKING_DIR_INITIALIZED_MARKER))
+        except OSError:
+            last_initialized = os.path.getmtime(working_dir)
+        if last_initialized > expiration:
+            continue
+        with directory_lock(working_dir, blocking=False) as locked:
+            if locked:
+                shutil.rmtree(working_dir, ignore_errors=True)
+
+
+def state_record_filters(search_child_modules: bool, custom_providers: List[TerraformProviderInstance]) -> List[Any]:
+    """The options the recorded resources were filtered with, as read back from the record."""
+    return [search_child_modules, [asdict(provider) for provider in custom_providers]]
+
+
+def read_state_record(
+    path: str, search_child_modules: bool, custom_providers: List[TerraformProviderInstance]
+) -> Optional[Dict[str, Any]]:
+    """The resources recorded for a state, unless they were filtered differently."""
+    try:
+        with open(path) as record_file:
+            record: Dict[str, Any] = json.load(record_file)
+    except (OSError, ValueError):
+        return None
+    if record.get("filters") != state_record_filters(search_child_modules, custom_providers):
+        return None
+    return record
+
+
+def write_state_record(
+    path: str,
+    search_child_modules: bool,
+    custom_providers: List[TerraformProviderInstance],
+    validators: Dict[str, str],
+    lineage: str,
+    serial: int,
+    resources: List[TerraformStateResource],
+) -> None:
+    record = dict(
+        filters=state_record_filters(search_child_modules, custom_providers),
+        validators=validators,
+        lineage=lineage,
+        serial=serial,
+        resources=[asdict(resource) for resource in resources],
+    )
+    write_atomic(path, to_bytes(json.dumps(record)))
+
+
+def pull_state(load_state: StateLoader, terraform: TerraformCommands) -> List[TerraformStateResource]:
+    return load_state(terraform.state_pull_content(), "terraform state pull", {})
+
+
+def host_digests_path(cache_dir: Optional[str], source: str) -> str:
+    """Path of the digests of the hosts recorded for an inventory source."""
+    key = hashlib.sha256(to_bytes(os.path.abspath(source))).hexdigest()
+    return os.path.join(get_cache_dir(cache_dir), HOST_DIGESTS_DIR, key + ".json")
+
+
+def state_serials(states: List[Dict[str, Any]]) -> List[List[Any]]:
+    # the states of several backends are pulled in any order
+    return sorted([state["lineage"], state["serial"]] for state in states)
+
+
+def read_host_digests(path: str, states: List[Dict[str, Any]]) -> Dict[str, str]:
+    """The digests to compare the hosts with: the ones recorded before the states last changed."""
+    try:
+        with open(path) as record_file:
+            record: Dict[str, Any] = json.load(record_file)
+    except (OSError, ValueError):
+        return {}
+    if record.get("states") == state_serials(states):
+        return dict(record.get("previous") or {})
+    return dict(record.get("current") or {})
+
+
+def write_host_digests(
+    path: str, states: List[Dict[str, Any]], previous: Dict[str, str], current: Dict[str, str]
+) -> None:
+    record = dict(states=state_serials(states), previous=previous, current=current)
+    write_atomic(path, to_bytes(json.dumps(record)))
+
+
+class HostChanges:
+    """Classifies the hosts against the digests of their attributes recorded by a previous run."""
+
+    ADDED = "tf_added"
+    CHANGED = "tf_changed"
+    UNCHANGED = "tf_unchanged"
+
+    def __init__(self, previous: Dict[str, str]) -> None:
+        self.previous = previous
+        self.current: Dict[str, str] = {}
+
+    def add(self, name: str, attributes: Dict[str, Any]) -> None:
+        digest = hashlib.sha256(to_bytes(json.dumps(attributes, sort_keys=True, default=str)))
+        self.current[name] = digest.hexdigest()
+
+    def groups(self) -> Iterator[Tuple[str, str]]:
+        """The change group of each host added to the inventory."""
+        for name, digest in self.current.items():
+            previous = self.previous.get(name)
+            if previous is None:
+                yield name, self.ADDED
+            elif previous != digest:
+                yield name, self.CHANGED
+            else:
+                yield name, self.UNCHANGED
+
+
+class InventoryModule(TerraformInventoryPluginBase, Constructable, Cacheable):  # type: ignore  # mypy ignore
     NAME = "cloud.terraform.terraform_state"
 
+    def __init__(self) -> None:
+        super(InventoryModule, self).__init__()
+        # lineage and serial of the states pulled during the last parse
+        self._pulled_states: List[Dict[str, Any]] = []
+        # validators, lineage and serial of the states read without terraform, by backend
+        self._native_states: Dict[str, Dict[str, Any]] = {}
+
     def verify_file(self, path):  # type: ignore  # mypy ignore
         """
         return true/false if this is possibly a valid file for this plugin to consume
@@ -663,38 +1242,323 @@ class InventoryModule(TerraformInventoryPluginBase, Constructable):  # type: ign
                 valid = True
         return valid
 
-    def _query(
+    def _pull_resources(
         self,
+        working_dir: str,
         terraform_binary: str,
         backend_type: str,
         backend_config: Optional[Dict[str, Any]],
         backend_config_files: Optional[List[str]],
+        pull: Callable[[TerraformCommands], List[TerraformStateResource]],
+        init: bool = True,
+        workspace: Optional[str] = None,
+    ) -> List[TerraformStateResource]:
+        write_terraform_config(backend_type, backend_config, os.path.join(working_dir, "main.tf"))
+        terraform = TerraformCommands(module_run_command, working_dir, terraform_binary, False, workspace)
+        try:
+            if backend_type.lower() == "cloud":
+                backend_config_files = []
+                backend_config = {}
+            # Remove dict/list elements from backend_config
+            if backend_config:
+                path = os.path.join(working_dir, "config.tfbackend")
+                if purge_backend_config(backend_config, path):
+                    backend_config_files = backend_config_files or [] + [path]
+            if init:
+                terraform.init(backend_config=backend_config, backend_config_files=backend_config_files)
+            return pull(terraform)
+        except TerraformWarning as e:
+            raise TerraformError(e.message)
+
+    def _pull_workspaces(
+        self,
+        terraform: TerraformCommands,
+        workspaces: List[str],
+        concurrency: int,
+        state_loader: Callable[[str], StateLoader],
+    ) -> List[TerraformStateResource]:
+        """Pull the states of the matching workspaces concurrently from the initialized working directory."""
+        listed = terraform.workspace_list()
+        pattern = re.compile("|".join(fnmatch.translate(w) for w in workspaces))
+        matching = [w for w in sorted([listed.current] + listed.all) if pattern.match(w)]
+        if not matching:
+            self.warn("No workspace matches %s." % ", ".join(workspaces))
+            return []
+
+        def pull(workspace: str) -> List[TerraformStateResource]:
+            workspace_terraform = TerraformCommands(
+                module_run_command, terraform.project_path, terraform.binary_path, False, workspace
+            )
+            try:
+                content = workspace_terraform.state_pull_content()
+            except TerraformWarning as e:
+                raise TerraformError(e.message)
+            resources = state_loader(workspace)(content, "terraform state pull", {})
+            for resource in resources:
+                resource.workspace = workspace
+            return resources
+
+        resources: List[TerraformStateResource] = []
+        failures = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(matching)))) as executor:
+            futures = [executor.submit(pull, workspace) for workspace in matching]
+            for workspace, future in zip(matching, futures):
+                try:
+                    resources.extend(future.result())
+                except (TerraformError, OSError, ValueError) as e:
+                    failures += 1
+                    self.warn("Failed to pull the state of workspace %s: %s" % (workspace, e))
+        if failures == len(matching):
+            raise TerraformError("Failed to pull the state of any of the %d workspaces." % len(matching))
+        return resources
+
+    def _load_state(
+        self,
+        content: Union[str, bytes],
+        source: str,
+        validators: Dict[str, str],
+        record: Optional[Dict[str, Any]],
+        record_path: Optional[str],
         search_child_modules: bool,
         custom_providers: List[TerraformProviderInstance],
     ) -> List[TerraformStateResource]:
-        with TemporaryDirectory() as temp_dir:
-            write_terraform_config(backend_type, backend_config, os.path.join(temp_dir, "main.tf"))
-            terraform = TerraformCommands(module_run_command, temp_dir, terraform_binary, False)
+        """Filter the resources of a state document while decoding it, only when it differs from the recorded one."""
+        header = state_header(content) if record else None
+        if record and header == (record["lineage"], record["serial"]):
+            resources = self._reuse_state_record(record)
+            if validators == record["validators"]:
+                return resources
+            lineage, serial = header
+        else:
+            state_file = parse_state(content, source, resource_filter(search_child_modules, custom_providers))
+            if state_file is None:
+                self.warn("No state found in %s." % source)
+                return []
+            resources = self._register_state(state_file)
+            lineage, serial = state_file.lineage, state_file.serial
+        if record_path:
+            write_state_record(
+                record_path, search_child_modules, custom_providers, validators, lineage, serial, resources
+            )
+        return resources
+
+    def _reuse_state_record(self, record: Dict[str, Any]) -> List[TerraformStateResource]:
+        self._pulled_states.append(dict(lineage=record["lineage"], serial=record["serial"]))
+        return [TerraformStateResource.from_json(resource) for resource in record["resources"]]
+
+    def _register_state(self, state_file: TerraformState) -> List[TerraformStateResource]:
+        self._pulled_states.append(dict(lineage=state_file.lineage, serial=state_file.serial))
+        if state_file.version != TERRAFORM_STATE_FILE_SUPPORT_VERSION:
+            self.warn(
+                "Plugin may produce inconsistent results due to state file version incompatibility."
+                "The plugin supports version %d while state file has version %d"
+                % (TERRAFORM_STATE_FILE_SUPPORT_VERSION, state_file.version)
+            )
+        return state_file.resources
+
+    def _query(
+        self,
+        terraform_binary: Optional[str],
+        backend_type: str,
+        backend_config: Optional[Dict[str, Any]],
+        backend_config_files: Optional[List[str]],
+        search_child_modules: bool,
+        custom_providers: List[TerraformProviderInstance],
+        working_dir_ttl: int = 0,
+        cache_dir: Optional[str] = None,
+        workspace: Optional[str] = None,
+        reuse_unchanged_states: bool = False,
+        workspaces: Optional[List[str]] = None,
+        concurrency: int = 4,
+    ) -> List[TerraformStateResource]:
+        def state_loader(
+            workspace: Optional[str],
+        ) -> Tuple[Optional[Dict[str, Any]], StateLoader]:
+            record_path = None
+            record: Optional[Dict[str, Any]] = None
+            if reuse_unchanged_states:
+                key = working_dir_key(terraform_binary, backend_type, record_config, backend_config_files, workspace)
+                record_path = os.path.join(get_cache_dir(cache_dir), STATE_RECORDS_DIR, key + ".json")
+                record = read_state_record(record_path, search_child_modules, custom_providers)
+            load_state = partial(
+                self._load_state,
+                record=record,
+                record_path=record_path,
+                search_child_modules=search_child_modules,
+                custom_providers=custom_providers,
+            )
+            return record, load_state
+
+        # the backend configuration is purged in place before the records of the workspaces are keyed
+        record_config = deepcopy(backend_config) if workspaces else backend_config
+
+        pull: Callable[[TerraformCommands], List[TerraformStateResource]]
+        if workspaces:
+            pull = partial(
+                self._pull_workspaces,
+                workspaces=workspaces,
+                concurrency=concurrency,
+                state_loader=lambda workspace: state_loader(workspace)[1],
+            )
+        else:
+            record, load_state = state_loader(workspace)
+            if supports_native_read(backend_type, backend_config, backend_config_files):
+                fetched = fetch_state(backend_type, backend_config, workspace, record["validators"] if record else None)
+                header: Optional[Tuple[str, int]]
+                if not fetched.modified and record:
+                    resources = self._reuse_state_record(record)
+                    header = (record["lineage"], record["serial"])
+                else:
+                    resources = load_state(fetched.content, fetched.source, fetched.validators)
+                    header = state_header(fetched.content)
+                # a state whose lineage and serial are not found in its head is never checked against the cache
+                if header or not fetched.content.strip():
+                    key = working_dir_key(None, backend_type, backend_config, None, workspace)
+                    self._native_states[key] = dict(validators=fetched.validators, header=header)
+                return resources
+            pull = partial(pull_state, load_state)
+
+        if terraform_binary is None:
+            raise TerraformError("The terraform binary is required to pull the state of the %s backend." % backend_type)
+
+        if working_dir_ttl <= 0:
+            with TemporaryDirectory() as temp_dir:
+                return self._pull_resources(
+                    temp_dir,
+                    terraform_binary,
+                    backend_type,
+                    backend_config,
+                    backend_config_files,
+                    pull,
+                    workspace=workspace,
+                )
+
+        working_dirs = os.path.join(get_cache_dir(cache_dir), "inventory")
+        key = working_dir_key(terraform_binary, backend_type, backend_config, backend_config_files, workspace)
+        remove_expired_working_dirs(working_dirs, working_dir_ttl, keep=key)
+        working_dir = os.path.join(working_dirs, key)
+        os.makedirs(working_dir, mode=0o700, exist_ok=True)
+        initialized_marker = os.path.join(working_dir, WORKING_DIR_INITIALIZED_MARKER)
+        with directory_lock(working_dir):
             try:
-                if backend_type.lower() == "cloud":
-                    backend_config_files = []
-                    backend_config = {}
-                # Remove dict/list elements from backend_config
-                if backend_config:
-                    path = os.path.join(temp_dir, "config.tfbackend")
-                    if purge_backend_config(backend_config, path):
-                        backend_config_files = backend_config_files or [] + [path]
-                terraform.init(backend_config=backend_config, backend_config_files=backend_config_files)
-                state_file = terraform.state_pull()
-                if state_file.version != TERRAFORM_STATE_FILE_SUPPORT_VERSION:
+                initialized = os.path.getmtime(initialized_marker) > time.time() - working_dir_ttl
+            except OSError:
+                initialized = False
+            if initialized:
+                try:
+                    return self._pull_resources(
+                        working_dir,
+                        terraform_binary,
+                        backend_type,
+                        # the backend configuration is purged in place, it is kept for a new initialization
+                        deepcopy(backend_config),
+                        backend_config_files,
+                        pull,
+                        init=False,
+                        workspace=workspace,
+                    )
+                except TerraformError as e:
+                    self.debug("Failed to pull the state from the working directory, initializing it again: %s" % e)
+            resources = self._pull_resources(
+                working_dir,
+                terraform_binary,
+                backend_type,
+                backend_config,
+                backend_config_files,
+                pull,
+                workspace=workspace,
+            )
+            with open(initialized_marker, "w"):
+                pass
+            return resources
+
+    def _query_backends(
+        self,
+        terraform_binary: Optional[str],
+        backends: List[Dict[str, Any]],
+        search_child_modules: bool,
+        custom_providers: List[TerraformProviderInstance],
+        concurrency: int,
+        working_dir_ttl: int = 0,
+        cache_dir: Optional[str] = None,
+        reuse_unchanged_states: bool = False,
+    ) -> List[TerraformStateResource]:
+        """Pull the states of several backends concurrently, and merge their resources in the order of the backends."""
+
+        def query(backend: Dict[str, Any]) -> List[TerraformStateResource]:
+            resources = self._query(
+                terraform_binary,
+                backend["backend_type"],
+                backend.get("backend_config"),
+                backend.get("backend_config_files"),
+                search_child_modules,
+                custom_providers,
+                working_dir_ttl=working_dir_ttl,
+                cache_dir=cache_dir,
+                workspace=backend.get("workspace"),
+                reuse_unchanged_states=reuse_unchanged_states,
+                workspaces=backend.get("workspaces"),
+                concurrency=concurrency,
+            )
+            if backend.get("workspace"):
+                for resource in resources:
+                    resource.workspace = backend["workspace"]
+            return resources
+
+        if len(backends) == 1:
+            return query(backends[0])
+
+        resources: List[TerraformStateResource] = []
+        failures = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(backends)))) as executor:
+            futures = [executor.submit(query, backend) for backend in backends]
+            for index, (backend, future) in enumerate(zip(backends, futures)):
+                try:
+                    resources.extend(future.result())
+                except (TerraformError, OSError, ValueError) as e:
+                    failures += 1
                     self.warn(
-                        "Plugin may produce inconsistent results due to state file version incompatibility."
-                        "The plugin supports version %d while state file has version %d"
-                        % (TERRAFORM_STATE_FILE_SUPPORT_VERSION, state_file.version)
+                        "Failed to pull the state from backend #%d (%s%s): %s"
+                        % (
+                            index,
+                            backend["backend_type"],
+                            ", workspace %s" % backend["workspace"] if backend.get("workspace") else "",
+                            e,
+                        )
                     )
-                return filter_instances(state_file.resources, search_child_modules, custom_providers)
-            except TerraformWarning as e:
-                raise TerraformError(e.message)
+        if failures == len(backends):
+            raise TerraformError("Failed to pull the state from any of the %d backends." % len(backends))
+        return resources
+
+    def _cached_states_unchanged(
+        self, backends: List[Dict[str, Any]], native_states: Optional[Dict[str, Dict[str, Any]]]
+    ) -> bool:
+        """Whether the states read without terraform still have the lineage and serial they had when cached.
+        The states pulled by terraform are not checked, pulling them costs as much as refreshing the cache.
+        """
+        if native_states is None:
+            return False
+        for backend in backends:
+            backend_type, backend_config = backend["backend_type"], backend.get("backend_config")
+            if backend.get("workspaces") or not supports_native_read(
+                backend_type, backend_config, backend.get("backend_config_files")
+            ):
+                continue
+            state = native_states.get(
+                working_dir_key(None, backend_type, backend_config, None, backend.get("workspace"))
+            )
+            if state is None:
+                return False
+            header = (state["header"][0], state["header"][1]) if state["header"] else None
+            try:
+                if not state_unchanged(
+                    backend_type, backend_config, backend.get("workspace"), state["validators"], header
+                ):
+                    return False
+            except TerraformError as e:
+                self.debug("Failed to check the state of the cached resources, refreshing them: %s" % e)
+                return False
+        return True
 
     def _sanitize_hostname(self, hostname: str) -> str:
         if ":" in to_text(hostname):
@@ -710,27 +1574,59 @@ class InventoryModule(TerraformInventoryPluginBase, Constructable):  # type: ign
         keyed_groups: List[Dict[str, Any]],
         groups: Dict[str, Any],
         strict: bool,
+        hostvar_projection: Optional[HostVarProjection] = None,
+        host_changes: Optional[HostChanges] = None,
     ) -> None:
+        resolve_hostname = HostnameResolver(hostnames)
+        hosts = []
         for resource in resources:
             for instance in resource.instances:
-                name = get_preferred_hostname(resource.name, resource.type, instance, hostnames)
-                if name:
-                    name = self._sanitize_hostname(name)
-                    self.inventory.add_host(name)
-                    host_vars = instance.attributes
+                hostname = resolve_hostname(resource.name, resource.type, instance)
+                if hostname:
+                    hosts.append((resource, instance, hostname, self._sanitize_hostname(hostname)))
+        colliding = colliding_hostnames([(name, resource.workspace) for resource, _instance, _hostname, name in hosts])
+
+        expressions = constructed_expressions(compose, keyed_groups, groups)
+        with compiled_expressions(self.templar, expressions, self.vvv):
+            for resource, instance, hostname, name in hosts:
+                prefixed = resource.workspace is not None and name in colliding
+                if prefixed:
+                    # the same configuration applied to several workspaces names their hosts the same
+                    name = self._sanitize_hostname("%s_%s" % (resource.workspace, hostname))
+                self.inventory.add_host(name)
+                host_vars = instance.attributes
+
+                # Set individuals host variables
+                for k, v in (hostvar_projection(host_vars) if hostvar_projection else host_vars).items():
+                    self.inventory.set_variable(name, k, v)
+
+                if prefixed:
+                    # the resolved hostname may be the address of the host
+                    self.inventory.set_variable(name, "ansible_host", hostname)
+
+                if resource.workspace:
+                    self.inventory.set_variable(name, "terraform_workspace", resource.workspace)
+                    workspace_group = self.inventory.add_group(
+                        self._sanitize_group_name("workspace_%s" % resource.workspace)
+                    )
+                    self.inventory.add_child(workspace_group, name)
+
+                # Composed variables
+                self._set_composite_vars(compose, host_vars, name, strict=strict)
 
-                    # Set individuals host variables
-                    for k, v in host_vars.items():
-                        self.inventory.set_variable(name, k, v)
+                # Create groups based on variable values and add the corresponding hosts to it
+                self._add_host_to_keyed_groups(keyed_groups, host_vars, name, strict=strict)
 
-                    # Composed variables
-                    self._set_composite_vars(compose, host_vars, name, strict=strict)
+                # Create groups based on jinja2 conditionals
+                self._add_host_to_composed_groups(groups, host_vars, name, strict=strict)
 
-                    # Create groups based on variable values and add the corresponding hosts to it
-                    self._add_host_to_keyed_groups(keyed_groups, host_vars, name, strict=strict)
+                if host_changes:
+                    host_changes.add(name, host_vars)
 
-                    # Create groups based on jinja2 conditionals
-                    self._add_host_to_composed_groups(groups, host_vars, name, strict=strict)
+        if host_changes:
+            for name, group in host_changes.groups():
+                self.inventory.add_group(group)
+                self.inventory.add_child(group, name)
 
     def parse(self, inventory, loader, path, cache=False):  # type: ignore  # mypy ignore
         super(InventoryModule, self).parse(inventory, loader, path, cache=cache)
@@ -744,35 +1640,98 @@ class InventoryModule(TerraformInventoryPluginBase, Constructable):  # type: ign
         terraform_binary = cfg.get("binary_path")
         search_child_modules = cfg.get("search_child_modules", False)
 
-        if not backend_type:
-            raise TerraformError("The parameter 'backend_type' is required to use this inventory plugin.")
-
-        if not backend_config and not backend_config_files:
-            raise TerraformError(
-                "At least one of 'backend_config' or 'backend_config_files' option is required to configure the Terraform backend."
+        backends = []
+        if backend_type or not cfg.get("backends"):
+            backends.append(
+                dict(
+                    backend_type=backend_type,
+                    backend_config=backend_config,
+                    backend_config_files=backend_config_files,
+                    workspaces=cfg.get("workspaces"),
+                )
             )
+        backends.extend(dict(backend) for backend in cfg.get("backends") or [])
+
+        for backend in backends:
+            if not backend.get("backend_type"):
+                raise TerraformError("The parameter 'backend_type' is required to use this inventory plugin.")
+
+            if not backend.get("backend_config") and not backend.get("backend_config_files"):
+                raise TerraformError(
+                    "At least one of 'backend_config' or 'backend_config_files' option is required to configure the Terraform backend."
+                )
+
+            if backend.get("workspace") and backend.get("workspaces"):
+                raise TerraformError("The parameters 'workspace' and 'workspaces' of a backend are mutually exclusive.")
+
+            # Transform the backend_config_files from Str to List[Str]
+            if backend.get("backend_config_files") and not isinstance(backend["backend_config_files"], list):
+                backend["backend_config_files"] = [backend["backend_config_files"]]
 
         if terraform_binary is not None:
             validate_bin_path(terraform_binary)
-        else:
+        elif any(b.get("workspaces") for b in backends) or not all(
+            supports_native_read(b["backend_type"], b.get("backend_config"), b.get("backend_config_files"))
+            for b in backends
+        ):
             terraform_binary = process.get_bin_path("terraform")
 
-        # Transform the backend_config_files from Str to List[Str]
-        if backend_config_files and not isinstance(backend_config_files, list):
-            backend_config_files = [backend_config_files]
-
         conf_providers = [
             TerraformProviderInstance(provider_name=p["provider_name"], types=p["types"]) for p in provider_mapping
         ]
 
-        instances = self._query(
-            terraform_binary,
-            backend_type,
-            backend_config,
-            backend_config_files,
-            search_child_modules,
-            conf_providers,
-        )
+        hostvar_projection = None
+        if cfg.get("hostvar_include") or cfg.get("hostvar_exclude") or cfg.get("hostvar_max_bytes"):
+            hostvar_projection = HostVarProjection(
+                cfg.get("hostvar_include"), cfg.get("hostvar_exclude"), cfg.get("hostvar_max_bytes", 0)
+            )
+
+        cache_key = self.get_cache_key(path)
+        # the options, including the cache ones, are set when reading the configuration
+        user_cache_setting = "cache" in self._options and self.get_option("cache")
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        instances = None
+        if attempt_to_read_cache:
+            try:
+                cached = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+            else:
+                if self._cached_states_unchanged(backends, cached.get("native_states")):
+                    instances = [TerraformStateResource.from_json(r) for r in cached["resources"]]
+                    self._pulled_states = cached.get("states", [])
+                    self._native_states = cached["native_states"]
+                else:
+                    cache_needs_update = True
+
+        if instances is None:
+            self._pulled_states = []
+            self._native_states = {}
+            instances = self._query_backends(
+                terraform_binary,
+                backends,
+                search_child_modules,
+                conf_providers,
+                cfg.get("concurrency", 4),
+                working_dir_ttl=cfg.get("working_dir_ttl", 0),
+                cache_dir=cfg.get("cache_dir"),
+                reuse_unchanged_states=cfg.get("reuse_unchanged_states", False),
+            )
+
+        if cache_needs_update:
+            self._cache[cache_key] = dict(
+                states=self._pulled_states,
+                native_states=self._native_states,
+                resources=[asdict(instance) for instance in instances],
+            )
+
+        host_changes = None
+        if cfg.get("change_groups"):
+            host_digests = host_digests_path(cfg.get("cache_dir"), path)
+            host_changes = HostChanges(read_host_digests(host_digests, self._pulled_states))
+
         self.create_inventory(
             instances,
             cfg.get("hostnames"),
@@ -780,4 +1739,9 @@ class InventoryModule(TerraformInventoryPluginBase, Constructable):  # type: ign
             cfg.get("keyed_groups"),
             cfg.get("groups"),
             cfg.get("strict"),
+            hostvar_projection=hostvar_projection,
+            host_changes=host_changes,
         )
+
+        if host_changes:
+            write_host_digests(host_digests, self._pulled_states, host_changes.previous, host_changes.current)
@@ -0,0 +1,447 @@
+import contextlib
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ansible.module_utils.common.text.converters import to_bytes
+from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.types import TJsonObject
+
+CACHE_DIR_ENV = "ANSIBLE_TERRAFORM_CACHE_DIR"
+PLUGIN_CACHE_ENV = "ANSIBLE_TERRAFORM_PLUGIN_CACHE"
+LOCK_FILE_NAME = ".terraform.lock.hcl"
+CONFIGURATION_FILE_SUFFIXES = (".tf", ".tf.json", ".tfvars", ".tfvars.json")
+INIT_FINGERPRINT_FILE_NAME = "ansible_init_fingerprint"
+APPLY_FINGERPRINT_FILE_NAME = "ansible_apply_fingerprint"
+# blocks of the configuration whose changes require to run init again:
+# module sources and versions, backend/cloud settings and required providers
+INIT_BLOCK_TYPES = ("module", "terraform")
+HEREDOC_RE = re.compile(r"<<-?([A-Za-z_][A-Za-z0-9_-]*)\r?\n")
+LOCKED_PROVIDER_RE = re.compile(r'provider\s+"([^"]+)"\s*\{[^}]*?\bversion\s*=\s*"([^"]+)"')
+
+
+def get_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """Resolve the directory persisting data between runs.
+    Explicitly configured directory > ANSIBLE_TERRAFORM_CACHE_DIR > $XDG_CACHE_HOME/ansible/cloud.terraform
+    """
+    if cache_dir:
+        return os.path.expanduser(cache_dir)
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.path.expanduser(os.environ[CACHE_DIR_ENV])
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg_cache_home, "ansible", "cloud.terraform")
+
+
+def get_plugin_cache_dir(enabled: bool, cache_dir: Optional[str] = None) -> Optional[str]:
+    """Resolve the provider plugin cache directory shared by the Terraform runs.
+    The directory managed under the cache directory when enabled, otherwise the TF_PLUGIN_CACHE_DIR set by the user.
+    """
+    if enabled:
+        return os.path.join(get_cache_dir(cache_dir), "plugins")
+    return os.environ.get("TF_PLUGIN_CACHE_DIR") or None
+
+
+@contextlib.contextmanager
+def directory_lock(directory: str, blocking: bool = True, shared: bool = False) -> Iterator[bool]:
+    """Lock a directory across processes with a lock file in it, yields whether the lock was acquired.
+    A shared lock is only exclusive of the exclusive ones,
+    a non-blocking lock is not acquired when another process holds a conflicting one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    with open(os.path.join(directory, ".lock"), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, operation if blocking else operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def plugin_cache_populated(project_path: str, plugin_cache_dir: str) -> bool:
+    """Whether all the providers pinned by the dependency lock file of a project are in the plugin cache,
+    in which case an init only reads from the cache. Without lock file the providers to install are unknown.
+    """
+    try:
+        with open(os.path.join(project_path, LOCK_FILE_NAME)) as f:
+            providers = LOCKED_PROVIDER_RE.findall(f.read())
+    except OSError:
+        return False
+    # the cache is laid out as <hostname>/<namespace>/<type>/<version>/<os>_<arch>/
+    return bool(providers) and all(
+        os.path.isdir(path) and bool(os.listdir(path))
+        for path in (os.path.join(plugin_cache_dir, address, version) for address, version in providers)
+    )
+
+
+def get_data_dir(project_path: str) -> str:
+    """The Terraform data directory of a project, TF_DATA_DIR is resolved relatively to the project path."""
+    return os.path.join(project_path, os.environ.get("TF_DATA_DIR") or ".terraform")
+
+
+def hash_file(digest: "hashlib._Hash", path: str) -> None:
+    """Feed the content of a file into the digest, a missing file is hashed as a marker."""
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        digest.update(b"\0missing")
+
+
+def hash_configuration(digest: "hashlib._Hash", project_path: str) -> None:
+    """Feed the Terraform configuration of a project into the digest.
+    Hidden directories, such as the data directory and VCS metadata, are not part of the configuration.
+    """
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.endswith(CONFIGURATION_FILE_SUFFIXES):
+                path = os.path.join(root, name)
+                digest.update(to_bytes(os.path.relpath(path, project_path)))
+                hash_file(digest, path)
+
+
+def extract_hcl_blocks(text: str, block_types: Tuple[str, ...]) -> List[str]:
+    """Extract the text of the top-level blocks of the given types from a HCL document.
+    Braces inside strings, comments and heredocs do not count towards the nesting.
+    """
+    blocks = []
+    depth = 0
+    block_start: Optional[int] = None
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == '"':
+            index += 1
+            while index < len(text) and text[index] not in '"\n':
+                index += 2 if text[index] == "\\" else 1
+        elif char == "#" or text.startswith("//", index):
+            newline = text.find("\n", index)
+            index = len(text) if newline == -1 else newline
+        elif text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            index = len(text) if end == -1 else end + 1
+        elif text.startswith("<<", index):
+            heredoc = HEREDOC_RE.match(text, index)
+            if heredoc:
+                marker = re.compile(r"^[ \t]*{0}[ \t]*$".format(re.escape(heredoc.group(1))), re.MULTILINE)
+                heredoc_end = marker.search(text, heredoc.end())
+                index = len(text) if heredoc_end is None else heredoc_end.end() - 1
+        elif char == "{":
+            if depth == 0:
+                # the block header and its opening brace are always on the same line
+                line_start = text.rfind("\n", 0, index) + 1
+                header = text[line_start:index].split()
+                if header and header[0] in block_types:
+                    block_start = line_start
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0 and block_start is not None:
+                blocks.append(text[block_start:index] + "}")
+                block_start = None
+        index += 1
+    return blocks
+
+
+def init_fingerprint(
+    project_path: str,
+    terraform_version: LooseVersion,
+    backend_config: Dict[str, Any],
+    backend_config_files: List[str],
+    reconfigure: bool,
+    plugin_paths: List[str],
+) -> str:
+    """Fingerprint of everything `terraform init` depends on, used to skip init when nothing changed."""
+    digest = hashlib.sha256()
+    digest.update(to_bytes(str(terraform_version)))
+    digest.update(to_bytes(json.dumps(backend_config, sort_keys=True, default=str)))
+    for backend_config_file in backend_config_files:
+        digest.update(to_bytes(backend_config_file))
+        hash_file(digest, os.path.join(project_path, backend_config_file))
+    digest.update(to_bytes(json.dumps([reconfigure, plugin_paths])))
+    hash_file(digest, os.path.join(project_path, LOCK_FILE_NAME))
+
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.endswith(".tf"):
+                with open(path, "rb") as f:
+                    blocks = extract_hcl_blocks(f.read().decode("utf-8", errors="replace"), INIT_BLOCK_TYPES)
+            elif name.endswith(".tf.json"):
+                with open(path, "rb") as f:
+                    try:
+                        content = json.loads(f.read())
+                    except ValueError:
+                        content = None
+                if not isinstance(content, dict):
+                    content = {}
+                blocks = [json.dumps(content.get(t), sort_keys=True) for t in INIT_BLOCK_TYPES if t in content]
+            else:
+                continue
+            for block in blocks:
+                digest.update(to_bytes(os.path.relpath(path, project_path)))
+                digest.update(to_bytes(block))
+    return digest.hexdigest()
+
+
+def apply_fingerprint(
+    project_path: str,
+    terraform_version: LooseVersion,
+    workspace: str,
+    variables_args: List[str],
+    variables_files: List[str],
+    state_lineage: str,
+    state_serial: int,
+    options: Dict[str, Any],
+) -> str:
+    """Fingerprint of everything a plan depends on, except the remote objects themselves.
+    Used to skip planning when the configuration, the variables and the state did not change since the last run.
+    """
+    digest = hashlib.sha256()
+    digest.update(to_bytes(str(terraform_version)))
+    digest.update(to_bytes(json.dumps([workspace, variables_args, state_lineage, state_serial])))
+    digest.update(to_bytes(json.dumps(options, sort_keys=True, default=str)))
+    for variables_file in variables_files:
+        digest.update(to_bytes(variables_file))
+        hash_file(digest, os.path.join(project_path, variables_file))
+    hash_file(digest, os.path.join(project_path, LOCK_FILE_NAME))
+    hash_configuration(digest, project_path)
+    return digest.hexdigest()
+
+
+def _read_fingerprint(project_path: str, name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(get_data_dir(project_path), name)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_fingerprint(project_path: str, name: str, fingerprint: str) -> None:
+    try:
+        write_atomic(os.path.join(get_data_dir(project_path), name), to_bytes(fingerprint))
+    except OSError:
+        pass
+
+
+def read_init_fingerprint(project_path: str) -> Optional[str]:
+    return _read_fingerprint(project_path, INIT_FINGERPRINT_FILE_NAME)
+
+
+def write_init_fingerprint(project_path: str, fingerprint: str) -> None:
+    _write_fingerprint(project_path, INIT_FINGERPRINT_FILE_NAME, fingerprint)
+
+
+def read_apply_fingerprint(project_path: str) -> Optional[str]:
+    return _read_fingerprint(project_path, APPLY_FINGERPRINT_FILE_NAME)
+
+
+def write_apply_fingerprint(project_path: str, fingerprint: str) -> None:
+    _write_fingerprint(project_path, APPLY_FINGERPRINT_FILE_NAME, fingerprint)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write a file so that concurrent readers never see a partial content."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def evict_to_size(directory: str, max_size: int) -> None:
+    """Remove the least recently used entries of a directory until it holds at most max_size bytes."""
+    entries = []
+    for name in os.listdir(directory):
+        if name.startswith(".tmp-"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # removed by a concurrent run
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for mtime, size, path in entries)
+    for mtime, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def _prune_provider_schemas(schemas: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what TerraformProviderSchemaCollection.from_json reads.
+    Data source schemas, provider configuration schemas and deeply nested blocks are the bulk of the document.
+    """
+    provider_schemas: Dict[str, Any] = {}
+    for provider_name, provider_schema in (schemas.get("provider_schemas") or {}).items():
+        resource_schemas = {}
+        for resource_name, resource_schema in (provider_schema.get("resource_schemas") or {}).items():
+            block = resource_schema.get("block", {})
+            resource_schemas[resource_name] = {
+                "version": resource_schema["version"],
+                "block": {
+                    "attributes": block.get("attributes", {}),
+                    "block_types": {
+                        block_name: {"block": {"attributes": block_type.get("block", {}).get("attributes", {})}}
+                        for block_name, block_type in block.get("block_types", {}).items()
+                    },
+                },
+            }
+        provider_schemas[provider_name] = {"resource_schemas": resource_schemas}
+    return {"format_version": schemas["format_version"], "provider_schemas": provider_schemas}
+
+
+class ProviderSchemaCache:
+    """On-disk cache of `terraform providers schema -json`.
+
+    Entries are keyed on the Terraform version, the dependency lock file and the installed provider binaries,
+    but not on the project path, so that projects pinning the same providers share the entries.
+    """
+
+    def __init__(self, cache_dir: str, terraform_version: LooseVersion, max_size: int):
+        self.directory = os.path.join(cache_dir, "provider_schemas")
+        self.terraform_version = terraform_version
+        self.max_size = max_size
+
+    def key(self, project_path: str) -> Optional[str]:
+        providers_dir = os.path.join(get_data_dir(project_path), "providers")
+        binaries: List[str] = []
+        for root, dirs, files in os.walk(providers_dir, followlinks=True):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                # identifies the binary by its location in the provider tree (registry/namespace/type/version/os_arch)
+                # and its size, hashing the content of binaries weighing hundreds of MB would defeat the purpose
+                binaries.append("{0}:{1}".format(os.path.relpath(path, providers_dir), os.stat(path).st_size))
+
+        lock_file = os.path.join(project_path, LOCK_FILE_NAME)
+        if not binaries and not os.path.isfile(lock_file):
+            # nothing identifies the providers in use, the schema cannot be cached safely
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(to_bytes(str(self.terraform_version)))
+        hash_file(digest, lock_file)
+        for binary in binaries:
+            digest.update(to_bytes(binary))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json.gz")
+
+    def get(self, key: str) -> Optional[TJsonObject]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rb") as f:
+                result: TJsonObject = json.loads(f.read())
+            # mark the entry as recently used for the eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            # missing, concurrently evicted or corrupted entry
+            return None
+        return result
+
+    def set(self, key: str, schemas: TJsonObject) -> None:
+        try:
+            write_atomic(self._path(key), gzip.compress(to_bytes(json.dumps(_prune_provider_schemas(schemas)))))
+            evict_to_size(self.directory, self.max_size)
+        except OSError:
+            # the cache is an optimization only, failing to write it must not fail the run
+            pass
+
+
+class VersionCache:
+    """On-disk cache of `terraform version -json`.
+
+    Entries are keyed on the resolved path, inode, size and modification time of the binary,
+    so replacing or upgrading the binary in place invalidates them.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.directory = os.path.join(cache_dir, "versions")
+
+    def key(self, binary_path: str) -> Optional[str]:
+        resolved = shutil.which(binary_path)
+        if not resolved:
+            return None
+        resolved = os.path.realpath(resolved)
+        try:
+            stat = os.stat(resolved)
+        except OSError:
+            return None
+        identity = "{0}:{1}:{2}:{3}".format(resolved, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        return hashlib.sha256(to_bytes(identity)).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "rb") as f:
+                version = f.read().decode("utf-8").strip()
+        except OSError:
+            return None
+        return version or None
+
+    def set(self, key: str, version: str) -> None:
+        try:
+            write_atomic(self._path(key), to_bytes(version))
+        except OSError:
+            pass
+
+
+class ValidationCache:
+    """Records the configurations that `terraform validate` already accepted.
+
+    Entries are keyed on the content of the configuration files, the installed modules,
+    the Terraform version and the variables arguments, including the content of the variables files.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.directory = os.path.join(cache_dir, "validations")
+
+    def key(self, project_path: str, terraform_version: LooseVersion, variables_args: List[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(to_bytes(str(terraform_version)))
+        hash_configuration(digest, project_path)
+        hash_file(digest, os.path.join(get_data_dir(project_path), "modules", "modules.json"))
+        for index, arg in enumerate(variables_args):
+            digest.update(to_bytes(arg))
+            if index > 0 and variables_args[index - 1] == "-var-file":
+                hash_file(digest, os.path.join(project_path, arg))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def has(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def add(self, key: str) -> None:
+        try:
+            write_atomic(self._path(key), b"")
+        except OSError:
+            pass
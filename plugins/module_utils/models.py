@@ -1,5 +1,6 @@
+import json
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Union
 
 from ansible_collections.cloud.terraform.plugins.module_utils.types import AnyJsonType, TJsonObject
 
@@ -142,6 +143,58 @@ class TerraformShow:
         )
 
 
+@dataclass
+class TerraformPlanSummary:
+    to_add: int = 0
+    to_change: int = 0
+    to_destroy: int = 0
+    to_replace: int = 0
+    to_import: int = 0
+    destroyed_addresses: List[str] = field(default_factory=list)
+    replaced_addresses: List[str] = field(default_factory=list)
+    # the "Plan: ..." line of the human-readable output
+    message: str = ""
+    errors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_json_lines(cls, lines: Iterable[str]) -> "TerraformPlanSummary":
+        """Summarize the machine-readable output of `terraform plan -json`, one event per line."""
+        summary = cls()
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            event_type = event.get("type")
+            if event_type == "planned_change":
+                action = event.get("change", {}).get("action")
+                address = event["change"].get("resource", {}).get("addr")
+                # like the human-readable plan checked by check_destroy, a replacement is not a destroy action
+                if action == "delete" and address:
+                    summary.destroyed_addresses.append(address)
+                if action == "replace":
+                    summary.to_replace += 1
+                    if address:
+                        summary.replaced_addresses.append(address)
+            elif event_type == "change_summary":
+                changes = event.get("changes", {})
+                summary.to_add = changes.get("add", 0)
+                summary.to_change = changes.get("change", 0)
+                summary.to_destroy = changes.get("remove", 0)
+                summary.to_import = changes.get("import", 0)
+                summary.message = event.get("@message", "")
+            elif event_type == "diagnostic" and event.get("@level") == "error":
+                diagnostic = event.get("diagnostic", {})
+                summary.errors.append(
+                    "{0}: {1}".format(diagnostic.get("summary"), diagnostic.get("detail"))
+                    if diagnostic.get("detail")
+                    else diagnostic.get("summary", event.get("@message"))
+                )
+        return summary
+
+
 @dataclass
 class TerraformStateResourceInstance:
     schema_version: int
@@ -169,6 +222,8 @@ class TerraformStateResource:
     type: str
     provider: str
     instances: List[TerraformStateResourceInstance]
+    # the workspace the state was explicitly pulled from, including the default one, None otherwise
+    workspace: Optional[str] = None
 
     @classmethod
     def from_json(cls, json: TJsonObject) -> "TerraformStateResource":
@@ -179,6 +234,7 @@ class TerraformStateResource:
             name=json.get("name"),
             provider=json.get("provider"),
             instances=[TerraformStateResourceInstance.from_json(i) for i in json.get("instances", [])],
+            workspace=json.get("workspace"),
         )
 
 
@@ -323,6 +379,25 @@ class TerraformProviderSchema:
 class TerraformProviderSchemaCollection:
     format_version: str
     provider_schemas: Dict[str, TerraformProviderSchema]
+    # resource type -> names of its sensitive attributes, built on first use
+    _sensitive_attributes_index: Optional[Dict[str, FrozenSet[str]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def sensitive_attributes(self, resource_type: str) -> FrozenSet[str]:
+        if self._sensitive_attributes_index is None:
+            index: Dict[str, FrozenSet[str]] = {}
+            for provider_schema in self.provider_schemas.values():
+                for resource_schema_name, resource_schema in provider_schema.resource_schemas.items():
+                    # the first provider defining a resource type wins
+                    if resource_schema_name not in index:
+                        index[resource_schema_name] = frozenset(
+                            name
+                            for name, spec in resource_schema.attributes.items()
+                            if getattr(spec, "sensitive", False)
+                        )
+            self._sensitive_attributes_index = index
+        return self._sensitive_attributes_index.get(resource_type, frozenset())
 
     @classmethod
     def from_json(cls, json: TJsonObject) -> "TerraformProviderSchemaCollection":
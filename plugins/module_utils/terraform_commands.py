@@ -1,11 +1,24 @@
+import collections
 import enum
 import json
 import os
-from typing import Dict, List, Optional, Tuple, cast
+import shlex
+import shutil
+import tempfile
+from typing import Deque, Dict, List, Optional, Tuple, cast
 
 from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.cache import (
+    INIT_FINGERPRINT_FILE_NAME,
+    ProviderSchemaCache,
+    VersionCache,
+    directory_lock,
+    get_data_dir,
+    plugin_cache_populated,
+)
 from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError, TerraformWarning
 from ansible_collections.cloud.terraform.plugins.module_utils.models import (
+    TerraformPlanSummary,
     TerraformProviderSchemaCollection,
     TerraformShow,
     TerraformState,
@@ -29,6 +42,29 @@ def _capture_error_message(stderr: str) -> str:
     return err
 
 
+def _read_excerpt(path: str, lines: int) -> str:
+    """Read the first and the last lines of a log file, without loading the whole file in memory."""
+    head: List[str] = []
+    tail: Deque[str] = collections.deque(maxlen=lines)
+    total = 0
+    with open(path, errors="replace") as f:
+        for line in f:
+            if total < lines:
+                head.append(line)
+            else:
+                tail.append(line)
+            total += 1
+    omitted = total - len(head) - len(tail)
+    if omitted > 0:
+        head.append("\n... {0} lines omitted, see {1} ...\n\n".format(omitted, path))
+    return "".join(head + list(tail))
+
+
+def _log_contains(path: str, text: str) -> bool:
+    with open(path, errors="replace") as f:
+        return any(text in line for line in f)
+
+
 class TerraformCommands:
     def __init__(
         self,
@@ -37,19 +73,93 @@ class TerraformCommands:
         binary_path: str,
         check_mode: bool,
         workspace: Optional[str] = None,
+        output_log_dir: Optional[str] = None,
+        output_excerpt_lines: int = 100,
     ):
         self.run_command_fp = run_command_fp
         self.project_path = project_path
         self.binary_path = binary_path
         self.check_mode = check_mode
         self.tfworkspace = workspace
-
-    def _run(self, *args: str, check_rc: bool) -> Tuple[int, str, str]:
-        params = {}
+        self.output_log_dir = output_log_dir
+        self.output_excerpt_lines = output_excerpt_lines
+        # command name -> paths of the files its stdout and stderr were logged to
+        self.output_logs: Dict[str, Dict[str, str]] = {}
+        # summary of the last plan created with machine-readable output
+        self.plan_summary: Optional[TerraformPlanSummary] = None
+
+    def _run_params(self, environ_update: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, str]]:
+        environ_update = dict(environ_update or {})
         if self.tfworkspace:
-            params = {"environ_update": {"TF_WORKSPACE": self.tfworkspace}}
+            environ_update["TF_WORKSPACE"] = self.tfworkspace
+        params: Dict[str, Dict[str, str]] = {}
+        if environ_update:
+            params = {"environ_update": environ_update}
+        return params
+
+    def _run(self, *args: str, check_rc: bool, environ_update: Optional[Dict[str, str]] = None) -> Tuple[int, str, str]:
+        params = self._run_params(environ_update)
         return self.run_command_fp([self.binary_path] + list(args), cwd=self.project_path, check_rc=check_rc, **params)
 
+    def _run_to_files(self, log_dir: str, *args: str) -> Tuple[int, Dict[str, str]]:
+        """Run a command with its stdout and stderr streamed to files created in the log directory.
+        The command goes through the same runner as the other commands, the shell only redirects its outputs.
+        """
+        logs: Dict[str, str] = {}
+        try:
+            for stream in ("stdout", "stderr"):
+                fd, logs[stream] = tempfile.mkstemp(
+                    prefix="terraform-{0}-".format(args[0]), suffix=".{0}.log".format(stream), dir=log_dir
+                )
+                os.close(fd)
+        except OSError as e:
+            raise TerraformError("Failed to run {0} with its output logged to {1}: {2}".format(args[0], log_dir, e))
+        command = "{0} < /dev/null > {1} 2> {2}".format(
+            " ".join(shlex.quote(arg) for arg in [self.binary_path] + list(args)),
+            shlex.quote(logs["stdout"]),
+            shlex.quote(logs["stderr"]),
+        )
+        rc, dummy, stderr = self.run_command_fp(
+            command, cwd=self.project_path, check_rc=False, use_unsafe_shell=True, **self._run_params()
+        )
+        if stderr:
+            # the outputs of the command are redirected, only the shell itself can write to stderr
+            raise TerraformError(
+                "Failed to run {0} with its output logged to {1}: {2}".format(args[0], log_dir, stderr)
+            )
+        return rc, logs
+
+    def _run_logged(self, *args: str) -> Tuple[int, str, str]:
+        """Run a command which may produce a large output.
+        When an output log directory is set, stdout and stderr are streamed to files in that directory
+        and only excerpts of them are returned.
+        """
+        if self.output_log_dir is None:
+            return self._run(*args, check_rc=False)
+
+        rc, logs = self._run_to_files(self.output_log_dir, *args)
+        self.output_logs[args[0]] = logs
+        return (
+            rc,
+            _read_excerpt(logs["stdout"], self.output_excerpt_lines),
+            _read_excerpt(logs["stderr"], self.output_excerpt_lines),
+        )
+
+    def _run_plan_json(self, *args: str) -> Tuple[int, TerraformPlanSummary, str]:
+        """Run `terraform plan -json`, and summarize its events while reading them from the log file."""
+        log_dir = self.output_log_dir or tempfile.mkdtemp()
+        try:
+            rc, logs = self._run_to_files(log_dir, *args)
+            with open(logs["stdout"], errors="replace") as f:
+                summary = TerraformPlanSummary.from_json_lines(f)
+            stderr = _read_excerpt(logs["stderr"], self.output_excerpt_lines)
+        finally:
+            if self.output_log_dir is None:
+                shutil.rmtree(log_dir, ignore_errors=True)
+        if self.output_log_dir is not None:
+            self.output_logs[args[0]] = logs
+        return rc, summary, stderr
+
     def apply_plan(
         self,
         plan_file_path: str,
@@ -85,7 +195,7 @@ class TerraformCommands:
             stdout = "No stdout when an application is necessary in check mode."
             stderr = "No stderr when an application is necessary in check mode."
         else:
-            rc, stdout, stderr = self._run(*command, check_rc=False)
+            rc, stdout, stderr = self._run_logged(*command)
             if rc != 0:
                 raise TerraformError(
                     stderr.rstrip(),
@@ -106,6 +216,7 @@ class TerraformCommands:
         reconfigure: bool = False,
         upgrade: bool = False,
         plugin_paths: Optional[List[str]] = None,
+        plugin_cache_dir: Optional[str] = None,
     ) -> None:
         command = ["init", "-input=false", "-no-color"]
         if backend_config:
@@ -121,7 +232,19 @@ class TerraformCommands:
         if plugin_paths:
             for plugin_path in plugin_paths:
                 command.extend(["-plugin-dir", plugin_path])
-        rc, stdout, stderr = self._run(*command, check_rc=False)
+        if plugin_cache_dir:
+            # Terraform does not guarantee concurrent writes to the plugin cache to be safe, only the runs which
+            # may install providers into the cache lock it exclusively, the ones reusing cached providers share it
+            populated = not upgrade and plugin_cache_populated(self.project_path, plugin_cache_dir)
+            try:
+                with directory_lock(plugin_cache_dir, shared=populated):
+                    rc, stdout, stderr = self._run(
+                        *command, check_rc=False, environ_update={"TF_PLUGIN_CACHE_DIR": plugin_cache_dir}
+                    )
+            except OSError as e:
+                raise TerraformError("Failed to lock the plugin cache directory {0}: {1}".format(plugin_cache_dir, e))
+        else:
+            rc, stdout, stderr = self._run(*command, check_rc=False)
         if rc != 0:
             raise TerraformError(_capture_error_message(stderr))
 
@@ -132,16 +255,29 @@ class TerraformCommands:
         destroy: bool,
         state_args: List[str],
         variables_args: List[str],
+        parallelism: Optional[int] = None,
+        lock: bool = True,
+        lock_timeout: Optional[int] = None,
+        refresh_mode: str = "full",
+        json_output: bool = False,
     ) -> Tuple[bool, bool, str, str]:
         command = [
             "plan",
-            "-lock=true",
+            "-lock={0}".format("true" if lock else "false"),
             "-input=false",
             "-no-color",
             "-detailed-exitcode",
             "-out",
             target_plan_file_path,
         ]
+        if lock_timeout is not None:
+            command.append("-lock-timeout={0}s".format(lock_timeout))
+        if parallelism is not None:
+            command.append("-parallelism={0}".format(parallelism))
+        if refresh_mode == "skip":
+            command.append("-refresh=false")
+        elif refresh_mode == "only":
+            command.append("-refresh-only")
         for t in targets:
             command.extend(["-target", t])
         if destroy:
@@ -149,7 +285,12 @@ class TerraformCommands:
         command.extend(state_args)
         command.extend(variables_args)
 
-        rc, stdout, stderr = self._run(*command, check_rc=False)
+        if json_output:
+            command.append("-json")
+            rc, self.plan_summary, stderr = self._run_plan_json(*command)
+            stdout = "\n".join(self.plan_summary.errors + [self.plan_summary.message]).strip()
+        else:
+            rc, stdout, stderr = self._run_logged(*command)
 
         if rc == 0:
             # no changes
@@ -177,7 +318,12 @@ class TerraformCommands:
                 )
             )
 
-        if "- destroy" in stdout:
+        if self.plan_summary is not None:
+            any_destroyed = bool(self.plan_summary.destroyed_addresses)
+        elif "plan" in self.output_logs:
+            # the excerpt may not contain the whole plan
+            any_destroyed = _log_contains(self.output_logs["plan"]["stdout"], "- destroy")
+        elif "- destroy" in stdout:
             any_destroyed = True
         else:
             any_destroyed = False
@@ -185,7 +331,13 @@ class TerraformCommands:
         return changed, any_destroyed, stdout, stderr
 
     # requires init to function
-    def providers_schema(self) -> TerraformProviderSchemaCollection:
+    def providers_schema(self, cache: Optional[ProviderSchemaCache] = None) -> TerraformProviderSchemaCollection:
+        cache_key = cache.key(self.project_path) if cache else None
+        if cache and cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return TerraformProviderSchemaCollection.from_json(cached)
+
         # in the command we have "providers schema", in the schema we have "provider_schemas"
         command = ["providers", "schema", "-json"]
         rc, text, err = self._run(*command, check_rc=False)
@@ -196,7 +348,10 @@ class TerraformCommands:
                 "Failure when getting provider schemas. " "Exited {0}.\nstdout: {1}\nstderr: {2}".format(rc, text, err),
                 command=" ".join(command),
             )
-        result = TerraformProviderSchemaCollection.from_json(json.loads(text))
+        schemas = json.loads(text)
+        if cache and cache_key:
+            cache.set(cache_key, schemas)
+        result = TerraformProviderSchemaCollection.from_json(schemas)
         return result
 
     def show(self, state_or_plan_file_path: str = "") -> Optional[TerraformShow]:
@@ -245,6 +400,10 @@ class TerraformCommands:
         return TerraformShow.from_json(result)
 
     def state_pull(self) -> TerraformState:
+        return TerraformState.from_json(json.loads(self.state_pull_content()))
+
+    def state_pull_content(self) -> str:
+        """The state document, as written by terraform, for the callers deciding whether to decode it."""
         command = ["state", "pull"]
         rc, stdout, stderr = self._run(*command, check_rc=False)
         if rc == 1:
@@ -259,7 +418,7 @@ class TerraformCommands:
                 command=" ".join(command),
             )
 
-        return TerraformState.from_json(json.loads(stdout))
+        return stdout
 
     def validate(self, version: LooseVersion, variables_args: List[str]) -> None:
         command = ["validate"]
@@ -267,9 +426,17 @@ class TerraformCommands:
             command += variables_args
         self._run(*command, check_rc=True)
 
-    def version(self) -> LooseVersion:
+    def version(self, cache: Optional[VersionCache] = None) -> LooseVersion:
+        cache_key = cache.key(self.binary_path) if cache else None
+        if cache and cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return LooseVersion(cached)
+
         rc, extract_version, stderr = self._run("version", "-json", check_rc=True)
         terraform_version = cast(str, (json.loads(extract_version))["terraform_version"])
+        if cache and cache_key:
+            cache.set(cache_key, terraform_version)
         return LooseVersion(terraform_version)
 
     def workspace(self, command: WorkspaceCommand, workspace: str) -> None:
@@ -298,8 +465,32 @@ class TerraformCommands:
             raise TerraformWarning("Failed to show Terraform current workspace:\n{0}".format(err))
         return out.rstrip("\n")
 
+    def workspace_selected(self) -> str:
+        """Resolve the current workspace the same way `terraform workspace show` does, without running it.
+        TF_WORKSPACE takes precedence over the workspace recorded in the data directory by `terraform workspace select`.
+        """
+        if os.environ.get("TF_WORKSPACE"):
+            return os.environ["TF_WORKSPACE"]
+        try:
+            with open(os.path.join(get_data_dir(self.project_path), "environment")) as f:
+                workspace = f.read().strip()
+        except FileNotFoundError:
+            workspace = ""
+        return workspace or "default"
+
     def is_initialized(self) -> bool:
         """Determines whether the project has been initialized or not
         `terraform init` executed on the project path
+
+        The backend state of the data directory is only written for an explicit backend, the projects
+        using the implicit local backend are recognized by their installed providers or modules,
+        or by the fingerprint of their last init.
         """
-        return os.path.isfile(os.path.join(self.project_path, ".terraform", "terraform.tfstate"))
+        data_dir = get_data_dir(self.project_path)
+        markers = (
+            (os.path.isfile, "terraform.tfstate"),
+            (os.path.isfile, INIT_FINGERPRINT_FILE_NAME),
+            (os.path.isdir, "providers"),
+            (os.path.isdir, "modules"),
+        )
+        return any(check(os.path.join(data_dir, name)) for check, name in markers)
@@ -1,3 +1,4 @@
+import dataclasses
 import json
 import os
 import shutil
@@ -5,7 +6,9 @@ from typing import List, Optional, Union, cast
 
 from ansible.module_utils.common.text.converters import to_text
 from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.cache import ValidationCache
 from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError, TerraformWarning
+from ansible_collections.cloud.terraform.plugins.module_utils.models import TerraformShow
 from ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands import TerraformCommands
 from ansible_collections.cloud.terraform.plugins.module_utils.types import (
     AnsibleRunCommandType,
@@ -60,6 +63,16 @@ def get_outputs(
             return outputs
 
 
+def get_outputs_from_show(show: Optional[TerraformShow]) -> TJsonObject:
+    """Build the same structure as `terraform output -json` from an already parsed `terraform show -json`
+    so that the state does not have to be read a second time.
+    Must be called before the show result is sanitized, as sanitizing drops the sensitive output values.
+    """
+    if show is None:
+        return {}
+    return {name: dataclasses.asdict(output) for name, output in show.values.outputs.items()}
+
+
 def validate_project_path(project_path: str) -> None:
     if project_path is None or "/" not in project_path:
         raise TerraformError("Path for Terraform project can not be None or ''.")
@@ -87,10 +100,20 @@ def preflight_validation(
     project_path: str,
     version: LooseVersion,
     variables_args: List[str],
+    cache: Optional[ValidationCache] = None,
+    skip_validate: bool = False,
 ) -> None:
     validate_project_path(project_path)
     validate_bin_path(bin_path)
+    if skip_validate:
+        return
+
+    cache_key = cache.key(project_path, version, variables_args) if cache else None
+    if cache and cache_key and cache.has(cache_key):
+        return
     terraform.validate(version, variables_args)
+    if cache and cache_key:
+        cache.add(cache_key)
 
 
 def _convert_value_to_hcl(value: TJsonBareValue) -> str:
@@ -125,6 +125,7 @@ options:
     description:
       - Enable statefile locking, if you use a service that accepts locks (such
         as S3+DynamoDB) to store your statefile.
+      - Applies to both the creation and the application of the plan.
     type: bool
     default: true
     version_added: 1.0.0
@@ -132,6 +133,7 @@ options:
     description:
       - How long to maintain the lock on the statefile, if you use a service
         that accepts locks (such as S3+DynamoDB).
+      - Applies to both the creation and the application of the plan.
     type: int
     version_added: 1.0.0
   force_init:
@@ -148,6 +150,20 @@ options:
     default: true
     type: bool
     version_added: 1.0.0
+  init_policy:
+    description:
+      - When O(force_init=true) and O(overwrite_init=true), controls when C(terraform init) is run again
+        on an initialized project.
+      - V(always) runs C(terraform init) on every run.
+      - V(changed) runs C(terraform init) only when its inputs changed since the last init run by the module.
+        The inputs are fingerprinted in the Terraform data directory and include O(backend_config),
+        the content of O(backend_config_files), O(plugin_paths), O(init_reconfigure), the C(.terraform.lock.hcl)
+        dependency lock file, the C(module) and C(terraform) blocks of the configuration and the Terraform version.
+      - C(terraform init) is always run when O(provider_upgrade=true).
+    type: str
+    choices: [ always, changed ]
+    default: always
+    version_added: 5.0.0
   backend_config:
     description:
       - A group of key-values to provide at init stage to the -backend-config parameter.
@@ -181,9 +197,140 @@ options:
     version_added: 1.0.0
   parallelism:
     description:
-      - Restrict concurrent operations when Terraform applies the plan.
+      - Restrict concurrent operations when Terraform creates and applies the plan.
     type: int
     version_added: 1.0.0
+  plan_format:
+    description:
+      - Output format of C(terraform plan).
+      - V(text) parses the human-readable output of the plan.
+      - V(json) runs C(terraform plan -json) and summarizes the machine-readable events while reading them,
+        without keeping the rendered plan in memory. The summary is returned in C(plan_summary),
+        and O(check_destroy) relies on the planned deletions and replacements rather than on the plan text.
+        Requires Terraform 0.15.3 or later.
+    type: str
+    choices: [ text, json ]
+    default: text
+    version_added: 5.0.0
+  skip_unchanged:
+    description:
+      - When V(true), a fingerprint of the configuration files, the variables, the dependency lock file and the
+        lineage and serial of the state, read with C(terraform state pull), is recorded in the data directory
+        of the project after each successful run.
+      - When the fingerprint did not change since the last run, the module returns C(changed=false) right away,
+        without planning. The C(outputs) are read from the pulled state, the C(diff) is empty and so is
+        C(plan_summary). With O(diff_format=full), the C(before) and C(after) states of the C(diff) are not read either.
+      - Changes of the remote objects made outside of Terraform are not detected, as the state is not refreshed.
+      - This option has no effect when an existing O(plan_file) is applied.
+    type: bool
+    default: false
+    version_added: 5.0.0
+  refresh_mode:
+    description:
+      - How Terraform refreshes the state from the remote objects when creating the plan.
+      - V(full) refreshes the state before planning the changes of the configuration.
+      - V(skip) plans the changes of the configuration against the current state without refreshing it, with
+        C(-refresh=false). This avoids most of the provider API calls, but drift of the remote objects is not detected.
+      - V(only) only plans the update of the state to match the remote objects, with C(-refresh-only).
+        The configuration changes are not planned. Requires Terraform 0.15.4 or later and O(state=present).
+      - This option has no effect when an existing O(plan_file) is applied.
+    type: str
+    choices: [ full, skip, only ]
+    default: full
+    version_added: 5.0.0
+  validation:
+    description:
+      - How the configuration is validated with C(terraform validate) once the plan was created.
+      - V(always) runs C(terraform validate) on every run.
+      - V(cached) skips C(terraform validate) when the same configuration was already successfully validated,
+        based on the content of the C(*.tf), C(*.tf.json) and C(*.tfvars) files of the project, the installed modules,
+        the Terraform version and the variables. Successful validations are recorded under O(cache_dir).
+      - V(plan) considers a successfully created plan as validation of the configuration, and only runs
+        C(terraform validate) when an existing O(plan_file) is applied.
+    type: str
+    choices: [ always, cached, plan ]
+    default: always
+    version_added: 5.0.0
+  output_log_dir:
+    description:
+      - When set, the stdout and stderr of the C(terraform plan) and C(terraform apply) commands are streamed to log
+        files created in this directory instead of being kept in memory, for example a temporary directory or a
+        directory of the project.
+      - The module then only returns the first and the last O(output_excerpt_lines) lines of each output in C(stdout)
+        and C(stderr), and the paths of the log files in C(output_logs).
+      - The log files are not removed by the module.
+    type: path
+    version_added: 5.0.0
+  output_excerpt_lines:
+    description:
+      - Number of lines kept from the beginning and from the end of each output logged to O(output_log_dir).
+      - Must be greater than or equal to V(0).
+    type: int
+    default: 100
+    version_added: 5.0.0
+  diff_format:
+    description:
+      - Content of the C(diff) returned by the module.
+      - V(resources) only includes the resources and outputs that differ between the initial and the final state,
+        keyed by their address, up to O(diff_max_resources) resources.
+      - V(full) includes the whole initial and final states.
+    type: str
+    choices: [ resources, full ]
+    default: resources
+    version_added: 5.0.0
+  diff_max_resources:
+    description:
+      - Maximum number of changed resources included in the C(diff) when O(diff_format=resources).
+      - The number of changed resources left out of the C(diff) is reported under C(omitted_resources).
+      - Must be greater than or equal to V(0).
+    type: int
+    default: 100
+    version_added: 5.0.0
+  cache_dir:
+    description:
+      - Directory used to persist data between runs of the module, such as the Terraform version,
+        provider schemas and validation caches.
+      - When not set, the C(ANSIBLE_TERRAFORM_CACHE_DIR) environment variable is used,
+        falling back to C(~/.cache/ansible/cloud.terraform).
+    type: path
+    version_added: 5.0.0
+  plugin_cache:
+    description:
+      - Share the providers installed by C(terraform init) between projects through a plugin cache directory,
+        C(plugins) under O(cache_dir), so that providers already in the cache are not downloaded again.
+      - A run of C(terraform init) which may install providers into the cache directory, because a provider pinned
+        in the dependency lock file is missing from the cache, there is no lock file yet or O(provider_upgrade=true),
+        holds an exclusive lock file on the directory. Runs only reusing cached providers share the lock
+        and run concurrently.
+      - When not set, the C(ANSIBLE_TERRAFORM_PLUGIN_CACHE) environment variable is used.
+      - When disabled, a C(TF_PLUGIN_CACHE_DIR) set in the environment is still used by Terraform,
+        and is locked the same way.
+    type: bool
+    default: false
+    version_added: 5.0.0
+  version_cache:
+    description:
+      - Cache the version reported by the Terraform binary on disk, under O(cache_dir).
+      - Entries are keyed on the resolved path, inode, size and modification time of the binary.
+    type: bool
+    default: true
+    version_added: 5.0.0
+  provider_schema_cache:
+    description:
+      - Cache the output of C(terraform providers schema) on disk, under O(cache_dir).
+      - Entries are keyed on the Terraform version, the C(.terraform.lock.hcl) dependency lock file and the installed
+        provider binaries, so projects pinning the same provider versions share the same entries.
+      - The schema is not cached when the project has neither a dependency lock file nor installed providers.
+    type: bool
+    default: false
+    version_added: 5.0.0
+  provider_schema_cache_max_size:
+    description:
+      - Maximum size in megabytes of the provider schemas cache.
+      - The least recently used entries are evicted when the cache grows over this size.
+    type: int
+    default: 512
+    version_added: 5.0.0
 notes:
    - To just run a C(terraform plan), use check mode.
 requirements: [ "terraform" ]
@@ -281,7 +428,11 @@ outputs:
       description: The value of the output as interpolated by Terraform
 stdout:
   type: str
-  description: Full C(terraform) command stdout, in case you want to display it or examine the event log
+  description:
+    - Full C(terraform) command stdout, in case you want to display it or examine the event log.
+    - When O(output_log_dir) is set, only the first and the last O(output_excerpt_lines) lines of the output,
+      the full output is in the log file reported in C(output_logs).
+    - When O(plan_format=json), the errors and the summary message of the plan, see C(plan_summary).
   returned: always
   sample: ''
 command:
@@ -299,6 +450,54 @@ state:
   description: The computed state.
   returned: always
   sample: 'present'
+output_logs:
+  type: dict
+  description:
+    - Paths of the files the stdout and stderr of the C(plan) and C(apply) commands were logged to, keyed by command.
+    - Only populated when O(output_log_dir) is set.
+  returned: always
+  sample: '{"plan": {"stdout": "/tmp/terraform-plan-1a2b3c.stdout.log", "stderr": "/tmp/terraform-plan-1a2b3c.stderr.log"}}'
+plan_summary:
+  type: dict
+  description:
+    - Summary of the plan when O(plan_format=json).
+  returned: always
+  sample: '{"to_add": 1, "to_change": 0, "to_destroy": 2, "to_replace": 1, "to_import": 0,
+    "destroyed_addresses": ["aws_s3_bucket.logs"], "replaced_addresses": ["aws_instance.web"],
+    "message": "Plan: 1 to add, 0 to change, 2 to destroy.", "errors": []}'
+  contains:
+    to_add:
+      type: int
+      description: Number of resources to create, including the replaced ones.
+    to_change:
+      type: int
+      description: Number of resources to update in-place.
+    to_destroy:
+      type: int
+      description: Number of resources to destroy, including the replaced ones.
+    to_replace:
+      type: int
+      description: Number of resources to replace.
+    to_import:
+      type: int
+      description: Number of resources to import.
+    destroyed_addresses:
+      type: list
+      elements: str
+      description:
+        - Addresses of the resources to destroy.
+        - The replaced resources are not included, like O(check_destroy) they are reported separately.
+    replaced_addresses:
+      type: list
+      elements: str
+      description: Addresses of the resources to destroy and re-create.
+    message:
+      type: str
+      description: 'Summary message of the plan, such as C(Plan: 1 to add, 0 to change, 2 to destroy.).'
+    errors:
+      type: list
+      elements: str
+      description: Error messages reported by the plan.
 stderr:
   type: str
   description: The terraform apply command standard error.
@@ -309,15 +508,32 @@ stderr:
 import dataclasses
 import os
 import tempfile
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
-from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible.module_utils.compat.version import LooseVersion
 from ansible.module_utils.six import integer_types
+from ansible_collections.cloud.terraform.plugins.module_utils.cache import (
+    PLUGIN_CACHE_ENV,
+    ProviderSchemaCache,
+    ValidationCache,
+    VersionCache,
+    apply_fingerprint,
+    get_cache_dir,
+    get_plugin_cache_dir,
+    init_fingerprint,
+    read_apply_fingerprint,
+    read_init_fingerprint,
+    write_apply_fingerprint,
+    write_init_fingerprint,
+)
 from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError, TerraformWarning
 from ansible_collections.cloud.terraform.plugins.module_utils.models import (
     TerraformModuleResource,
+    TerraformOutput,
     TerraformProviderSchemaCollection,
     TerraformShow,
+    TerraformState,
     TerraformWorkspaceContext,
 )
 from ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands import (
@@ -326,7 +542,7 @@ from ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands
 )
 from ansible_collections.cloud.terraform.plugins.module_utils.types import AnyJsonType, TJsonBareValue
 from ansible_collections.cloud.terraform.plugins.module_utils.utils import (
-    get_outputs,
+    get_outputs_from_show,
     get_state_args,
     preflight_validation,
 )
@@ -335,17 +551,8 @@ from ansible_collections.cloud.terraform.plugins.module_utils.utils import (
 def is_attribute_sensitive_in_providers_schema(
     schemas: TerraformProviderSchemaCollection, resource: TerraformModuleResource, attribute: str
 ) -> bool:
-    for provider_schema in schemas.provider_schemas:
-        resource_schemas = schemas.provider_schemas[provider_schema].resource_schemas
-        for resource_schema_name, resource_schema in resource_schemas.items():
-            if resource_schema_name == resource.type:
-                # it can happen that attribute is not in the providers schema
-                if resource_schema.attributes.get(attribute):
-                    sensitive = resource_schema.attributes[attribute].sensitive
-                else:
-                    sensitive = False
-                return sensitive
-    return False
+    # it can happen that attribute is not in the providers schema
+    return attribute in schemas.sensitive_attributes(resource.type)
 
 
 def is_attribute_in_sensitive_values(resource: TerraformModuleResource, attribute: str) -> bool:
@@ -369,11 +576,10 @@ def filter_resource_attributes(
 ) -> TerraformShow:
     # using .get() in case there is no existing .tfstate before apply
     for resource in state_contents.values.root_module.resources:
+        sensitive_attributes = provider_schemas.sensitive_attributes(resource.type)
         attributes_to_remove = []
         for attribute in resource.values:
-            if is_attribute_sensitive_in_providers_schema(
-                provider_schemas, resource, attribute
-            ) or is_attribute_in_sensitive_values(resource, attribute):
+            if attribute in sensitive_attributes or is_attribute_in_sensitive_values(resource, attribute):
                 attributes_to_remove.append(attribute)
         for attribute in attributes_to_remove:
             resource.values[attribute] = None
@@ -402,6 +608,63 @@ def sanitize_state(
     return show_state
 
 
+def get_resources_diff(
+    initial_state: Optional[TerraformShow], final_state: Optional[TerraformShow], max_resources: int
+) -> Dict[str, Dict[str, Any]]:
+    """Compare two states by resource address, and only return the resources and outputs that differ."""
+    before_resources: Dict[str, TerraformModuleResource] = {}
+    after_resources: Dict[str, TerraformModuleResource] = {}
+    before_outputs: Dict[str, TerraformOutput] = {}
+    after_outputs: Dict[str, TerraformOutput] = {}
+    if initial_state is not None:
+        before_resources = {r.address: r for r in initial_state.values.root_module.flatten_resources()}
+        before_outputs = initial_state.values.outputs
+    if final_state is not None:
+        after_resources = {r.address: r for r in final_state.values.root_module.flatten_resources()}
+        after_outputs = final_state.values.outputs
+
+    changed_addresses = sorted(
+        address
+        for address in set(before_resources) | set(after_resources)
+        if before_resources.get(address) != after_resources.get(address)
+    )
+    changed_outputs = sorted(
+        name for name in set(before_outputs) | set(after_outputs) if before_outputs.get(name) != after_outputs.get(name)
+    )
+
+    diff: Dict[str, Dict[str, Any]] = {}
+    for key, resources, outputs in [
+        ("before", before_resources, before_outputs),
+        ("after", after_resources, after_outputs),
+    ]:
+        diff[key] = dict(
+            resources={
+                address: dataclasses.asdict(resources[address])
+                for address in changed_addresses[:max_resources]
+                if address in resources
+            },
+            outputs={name: dataclasses.asdict(outputs[name]) for name in changed_outputs if name in outputs},
+        )
+        if len(changed_addresses) > max_resources:
+            diff[key]["omitted_resources"] = len(changed_addresses) - max_resources
+    return diff
+
+
+def get_diff(
+    diff_format: str, initial_state: Optional[TerraformShow], final_state: Optional[TerraformShow], max_resources: int
+) -> Dict[str, Dict[str, Any]]:
+    if diff_format == "full":
+        return dict(
+            before=dataclasses.asdict(initial_state) if initial_state is not None else {},
+            after=dataclasses.asdict(final_state) if final_state is not None else {},
+        )
+    return get_resources_diff(initial_state, final_state, max_resources)
+
+
+def get_plan_summary(terraform: TerraformCommands) -> Dict[str, Any]:
+    return dataclasses.asdict(terraform.plan_summary) if terraform.plan_summary is not None else {}
+
+
 def format_args(terraform_variables: TJsonBareValue) -> str:
     if isinstance(terraform_variables, str):
         return '"{string}"'.format(string=terraform_variables.replace("\\", "\\\\").replace('"', '\\"'))
@@ -447,6 +710,55 @@ def process_complex_args(terraform_variables: AnyJsonType) -> str:
     return ",".join(ret_out)
 
 
+def get_variables_args(
+    variables: Dict[str, Any], complex_vars: bool, variables_files: Optional[List[str]]
+) -> List[str]:
+    variables_args = []
+    if complex_vars:
+        for k, v in variables.items():
+            if isinstance(v, dict):
+                variables_args.extend(["-var", "{0}={{{1}}}".format(k, process_complex_args(v))])
+            elif isinstance(v, list):
+                variables_args.extend(["-var", "{0}={1}".format(k, process_complex_args(v))])
+            # on the top-level we need to pass just the python string with necessary
+            # terraform string escape sequences
+            elif isinstance(v, str):
+                variables_args.extend(["-var", "{0}={1}".format(k, v)])
+            else:
+                variables_args.extend(["-var", "{0}={1}".format(k, format_args(v))])
+    else:
+        for k, v in variables.items():
+            variables_args.extend(["-var", "{0}={1}".format(k, v)])
+
+    if variables_files:
+        for f in variables_files:
+            variables_args.extend(["-var-file", f])
+    return variables_args
+
+
+def get_apply_fingerprint(
+    terraform: TerraformCommands,
+    project_path: str,
+    version: LooseVersion,
+    workspace: str,
+    variables_args: List[str],
+    variables_files: List[str],
+    options: Dict[str, Any],
+) -> Tuple[Optional[str], Optional[TerraformState]]:
+    """Pull the state and fingerprint it along with the configuration and the variables.
+    Without any state yet, there is nothing to fingerprint.
+    """
+    try:
+        state = terraform.state_pull()
+    except (TerraformWarning, ValueError):
+        # `terraform state pull` prints nothing when there is no state
+        return None, None
+    fingerprint = apply_fingerprint(
+        project_path, version, workspace, variables_args, variables_files, state.lineage, state.serial, options
+    )
+    return fingerprint, state
+
+
 def main() -> None:
     module = AnsibleModule(
         argument_spec=dict(
@@ -469,9 +781,23 @@ def main() -> None:
             backend_config_files=dict(type="list", elements="path"),
             init_reconfigure=dict(type="bool", default=False),
             overwrite_init=dict(type="bool", default=True),
+            init_policy=dict(type="str", choices=["always", "changed"], default="always"),
             check_destroy=dict(type="bool", default=False),
             parallelism=dict(type="int"),
+            plan_format=dict(type="str", choices=["text", "json"], default="text"),
+            skip_unchanged=dict(type="bool", default=False),
+            refresh_mode=dict(type="str", choices=["full", "skip", "only"], default="full"),
             provider_upgrade=dict(type="bool", default=False),
+            validation=dict(type="str", choices=["always", "cached", "plan"], default="always"),
+            output_log_dir=dict(type="path"),
+            output_excerpt_lines=dict(type="int", default=100),
+            diff_format=dict(type="str", choices=["resources", "full"], default="resources"),
+            diff_max_resources=dict(type="int", default=100),
+            cache_dir=dict(type="path"),
+            plugin_cache=dict(type="bool", default=False, fallback=(env_fallback, [PLUGIN_CACHE_ENV])),
+            version_cache=dict(type="bool", default=True),
+            provider_schema_cache=dict(type="bool", default=False),
+            provider_schema_cache_max_size=dict(type="int", default=512),
         ),
         required_if=[("state", "planned", ["plan_file"])],
         supports_check_mode=True,
@@ -492,10 +818,18 @@ def main() -> None:
     backend_config_files = module.params.get("backend_config_files")
     init_reconfigure = module.params.get("init_reconfigure")
     overwrite_init = module.params.get("overwrite_init")
+    init_policy = module.params.get("init_policy")
     check_destroy = module.params.get("check_destroy")
     provider_upgrade = module.params.get("provider_upgrade")
+    validation = module.params.get("validation")
+    refresh_mode = module.params.get("refresh_mode")
+    plan_format = module.params.get("plan_format")
     state = module.params.get("state")
 
+    for option in ("output_excerpt_lines", "diff_max_resources"):
+        if module.params.get(option) < 0:
+            module.fail_json(msg="{0} must be greater than or equal to 0".format(option))
+
     if state == "planned":
         computed_check_mode = True
         computed_state = "present"
@@ -513,38 +847,120 @@ def main() -> None:
     else:
         terraform_binary = module.get_bin_path("terraform", required=True)
 
-    terraform = TerraformCommands(module.run_command, project_path, terraform_binary, computed_check_mode, workspace)
+    terraform = TerraformCommands(
+        module.run_command,
+        project_path,
+        terraform_binary,
+        computed_check_mode,
+        workspace,
+        output_log_dir=module.params.get("output_log_dir"),
+        output_excerpt_lines=module.params.get("output_excerpt_lines"),
+    )
 
-    checked_version = terraform.version()
+    cache_dir = get_cache_dir(module.params.get("cache_dir"))
+    checked_version = terraform.version(VersionCache(cache_dir) if module.params.get("version_cache") else None)
 
-    if force_init and (overwrite_init or not terraform.is_initialized()):
-        terraform.init(
-            backend_config or {},
-            backend_config_files or [],
-            init_reconfigure,
-            provider_upgrade,
-            plugin_paths or [],
+    if force_init:
+        init_args = dict(
+            project_path=project_path,
+            terraform_version=checked_version,
+            backend_config=backend_config or {},
+            backend_config_files=backend_config_files or [],
+            reconfigure=init_reconfigure,
+            plugin_paths=plugin_paths or [],
         )
+        needs_init = not terraform.is_initialized()
+        if not needs_init and overwrite_init:
+            if init_policy == "always" or provider_upgrade:
+                needs_init = True
+            else:
+                needs_init = init_fingerprint(**init_args) != read_init_fingerprint(project_path)
+        if needs_init:
+            terraform.init(
+                backend_config or {},
+                backend_config_files or [],
+                init_reconfigure,
+                provider_upgrade,
+                plugin_paths or [],
+                get_plugin_cache_dir(module.params.get("plugin_cache"), module.params.get("cache_dir")),
+            )
+            if init_policy == "changed":
+                # computed after init, which may have created or updated the dependency lock file
+                write_init_fingerprint(project_path, init_fingerprint(**init_args))
 
     out = None
     err = None
     try:
-        provider_schemas = terraform.providers_schema()
+        variables_args = get_variables_args(variables, complex_vars, variables_files)
+
+        skip_unchanged = module.params.get("skip_unchanged") and not plan_file
+        if skip_unchanged:
+            fingerprint_args: Dict[str, Any] = dict(
+                terraform=terraform,
+                project_path=project_path,
+                version=checked_version,
+                workspace=workspace or terraform.workspace_selected(),
+                variables_args=variables_args,
+                variables_files=variables_files or [],
+                options=dict(
+                    state=computed_state,
+                    targets=module.params.get("targets"),
+                    state_file=state_file,
+                    refresh_mode=refresh_mode,
+                ),
+            )
+            fingerprint, pulled_state = get_apply_fingerprint(**fingerprint_args)
+            if pulled_state is not None and fingerprint == read_apply_fingerprint(project_path):
+                module.exit_json(
+                    changed=False,
+                    # nothing changed, the states are not read
+                    diff=get_diff(
+                        module.params.get("diff_format"), None, None, module.params.get("diff_max_resources")
+                    ),
+                    state=computed_state,
+                    workspace=fingerprint_args["workspace"],
+                    outputs={
+                        name: dict(sensitive=bool(output.sensitive), value=output.value, type=output.type)
+                        for name, output in pulled_state.outputs.items()
+                    },
+                    stdout="",
+                    stderr="",
+                    command="",
+                    output_logs={},
+                    plan_summary=get_plan_summary(terraform),
+                )
+
+        schema_cache = None
+        if module.params.get("provider_schema_cache"):
+            schema_cache = ProviderSchemaCache(
+                cache_dir,
+                checked_version,
+                module.params.get("provider_schema_cache_max_size") * 1024 * 1024,
+            )
+        provider_schemas = terraform.providers_schema(schema_cache)
         try:
             initial_state = terraform.show(state_file)
+            # outputs have to be read before sanitizing, which removes the sensitive values
+            initial_outputs = get_outputs_from_show(initial_state)
             if initial_state is not None:
                 initial_state = sanitize_state(initial_state, provider_schemas)
         except TerraformWarning as e:
             module.warn(e.message)
             initial_state = None
+            initial_outputs = {}
 
+        selected_workspace = terraform.workspace_selected()
         if not workspace:
-            workspace = terraform.workspace_show()
-        try:
-            workspace_ctx = terraform.workspace_list()
-        except TerraformWarning as e:
-            module.warn(e.message)
-            workspace_ctx = TerraformWorkspaceContext(current="default", all=[])
+            workspace = selected_workspace
+        if workspace == selected_workspace:
+            # the workspace is already selected, it is not necessary to enumerate the backend workspaces
+            workspace_ctx = TerraformWorkspaceContext(current=workspace, all=[workspace])
+        else:
+            try:
+                workspace_ctx = terraform.workspace_list()
+            except TerraformWarning as e:
+                module.warn(e.message)
+                workspace_ctx = TerraformWorkspaceContext(current="default", all=[])
 
         if workspace_ctx.current != workspace:
             if workspace not in workspace_ctx.all:
@@ -552,27 +968,6 @@ def main() -> None:
             else:
                 terraform.workspace(WorkspaceCommand.SELECT, workspace)
 
-        variables_args = []
-        if complex_vars:
-            for k, v in variables.items():
-                if isinstance(v, dict):
-                    variables_args.extend(["-var", "{0}={{{1}}}".format(k, process_complex_args(v))])
-                elif isinstance(v, list):
-                    variables_args.extend(["-var", "{0}={1}".format(k, process_complex_args(v))])
-                # on the top-level we need to pass just the python string with necessary
-                # terraform string escape sequences
-                elif isinstance(v, str):
-                    variables_args.extend(["-var", "{0}={1}".format(k, v)])
-                else:
-                    variables_args.extend(["-var", "{0}={1}".format(k, format_args(v))])
-        else:
-            for k, v in variables.items():
-                variables_args.extend(["-var", "{0}={1}".format(k, v)])
-
-        if variables_files:
-            for f in variables_files:
-                variables_args.extend(["-var-file", f])
-
         # only use an existing plan file if we're not in the deprecated "planned" mode
         # or if check_mode is set to False
         if plan_file and not computed_check_mode:
@@ -581,8 +976,20 @@ def main() -> None:
 
             plan_file_needs_application = True
             plan_file_to_apply = plan_file
+            planned = False
         else:
             plan_file_to_apply = plan_file
+            if refresh_mode == "only":
+                if computed_state == "absent":
+                    raise TerraformError("refresh_mode=only cannot be used with state=absent")
+                if checked_version < LooseVersion("0.15.4"):
+                    raise TerraformError(
+                        "refresh_mode=only requires Terraform 0.15.4 or later, found {0}".format(checked_version)
+                    )
+            if plan_format == "json" and checked_version < LooseVersion("0.15.3"):
+                raise TerraformError(
+                    "plan_format=json requires Terraform 0.15.3 or later, found {0}".format(checked_version)
+                )
             if not plan_file:
                 f, new_plan_file = tempfile.mkstemp(suffix=".tfplan")
                 module.add_cleanup_file(new_plan_file)
@@ -594,6 +1001,11 @@ def main() -> None:
                 destroy=state == "absent",
                 state_args=get_state_args(state_file),
                 variables_args=variables_args,
+                parallelism=module.params.get("parallelism"),
+                lock=module.params.get("lock"),
+                lock_timeout=module.params.get("lock_timeout"),
+                refresh_mode=refresh_mode,
+                json_output=plan_format == "json",
             )
 
             if computed_state == "present" and plan_result_any_destroyed and check_destroy:
@@ -605,8 +1017,17 @@ def main() -> None:
             plan_file_needs_application = plan_result_changed
             out = plan_stdout
             err = plan_stderr
+            planned = True
 
-        preflight_validation(terraform, terraform_binary, project_path, checked_version, variables_args)
+        preflight_validation(
+            terraform,
+            terraform_binary,
+            project_path,
+            checked_version,
+            variables_args,
+            cache=ValidationCache(cache_dir) if validation == "cached" else None,
+            skip_validate=validation == "plan" and planned,
+        )
 
         try:
             planned_state = terraform.show(plan_file_to_apply)
@@ -635,22 +1056,23 @@ def main() -> None:
 
         if not computed_check_mode:
             applied_state = terraform.show(state_file)
+            outputs = get_outputs_from_show(applied_state)
             if applied_state is not None:
                 applied_state = sanitize_state(applied_state, provider_schemas)
             final_state = applied_state
             out = apply_stdout
             err = apply_stderr
         else:
+            # nothing was applied, the outputs are the ones of the current state
+            outputs = initial_outputs
             final_state = planned_state
 
-        outputs = get_outputs(
-            run_command_fp=module.run_command,
-            terraform_binary=terraform_binary,
-            project_path=project_path,
-            state_file=state_file,
-            output_format="json",
-            workspace=workspace,
-        )
+        if skip_unchanged and not computed_check_mode:
+            if plan_file_needs_application:
+                # the state changed, its serial has to be read again
+                fingerprint, pulled_state = get_apply_fingerprint(**fingerprint_args)
+            if fingerprint is not None:
+                write_apply_fingerprint(project_path, fingerprint)
 
         # Restore the Terraform workspace found when running the module
         if workspace_ctx.current != workspace:
@@ -658,20 +1080,19 @@ def main() -> None:
         if computed_state == "absent" and workspace != "default" and purge_workspace is True:
             terraform.workspace(WorkspaceCommand.DELETE, workspace)
 
-        diff = dict(
-            before=dataclasses.asdict(initial_state) if initial_state is not None else {},
-            after=dataclasses.asdict(final_state) if final_state is not None else {},
-        )
-
         module.exit_json(
             changed=plan_file_needs_application,
-            diff=diff,
+            diff=get_diff(
+                module.params.get("diff_format"), initial_state, final_state, module.params.get("diff_max_resources")
+            ),
             state=computed_state,
             workspace=workspace,
             outputs=outputs,
             stdout=out,
             stderr=err,
             command=final_apply_command,
+            output_logs=terraform.output_logs,
+            plan_summary=get_plan_summary(terraform),
         )
     except TerraformError as e:
         e.fail_json(module)
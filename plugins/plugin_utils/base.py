@@ -17,3 +17,6 @@ class TerraformInventoryPluginBase(BaseInventoryPlugin):  # type: ignore  # mypy
 
     def debug(self, message: Any) -> None:
         display.debug(message)
+
+    def vvv(self, message: Any) -> None:
+        display.vvv(message)
@@ -3,13 +3,17 @@
 # Copyright: Ansible Project
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import os
 import subprocess
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 
 # no module available here, mock functionality to be consistent throughout the rest of the codebase
-def module_run_command(cmd: List[str], cwd: str, check_rc: bool) -> Tuple[int, str, str]:
-    completed_process = subprocess.run(cmd, capture_output=True, check=check_rc, cwd=cwd)
+def module_run_command(
+    cmd: List[str], cwd: str, check_rc: bool, environ_update: Optional[Dict[str, str]] = None
+) -> Tuple[int, str, str]:
+    env = dict(os.environ, **environ_update) if environ_update else None
+    completed_process = subprocess.run(cmd, capture_output=True, check=check_rc, cwd=cwd, env=env)
     return (
         completed_process.returncode,
         completed_process.stdout.decode("utf-8"),
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+
+# Copyright: Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Readers pulling the state of the backends storing it as a plain JSON document,
+without running the terraform binary, and telling whether a state changed without decoding it.
+"""
+
+import base64
+import http.client
+import json
+import os
+import re
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
+from urllib.parse import SplitResult, urljoin, urlsplit
+
+from ansible.module_utils._text import to_bytes, to_native, to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError
+from ansible_collections.cloud.terraform.plugins.module_utils.models import TerraformState, TerraformStateResource
+
+DEFAULT_WORKSPACE = "default"
+LOCAL_DEFAULT_STATE_PATH = "terraform.tfstate"
+LOCAL_DEFAULT_WORKSPACE_DIR = "terraform.tfstate.d"
+# the backend configuration keys each reader knows about, any other key is left to terraform
+LOCAL_CONFIG_KEYS = frozenset(("path", "workspace_dir"))
+HTTP_CONFIG_KEYS = frozenset(
+    (
+        "address",
+        "username",
+        "password",
+        "skip_cert_verification",
+        "client_ca_certificate_pem",
+        "client_certificate_pem",
+        "client_private_key_pem",
+        "retry_max",
+        "retry_wait_min",
+        "retry_wait_max",
+        # only used to write or lock the state
+        "update_method",
+        "lock_address",
+        "lock_method",
+        "unlock_address",
+        "unlock_method",
+    )
+)
+HTTP_TIMEOUT = 30
+# like the http client of terraform, redirects are followed up to 10 times
+HTTP_REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+HTTP_MAX_REDIRECTS = 10
+# the retries of the http backend and their defaults in terraform, set in the configuration or the environment
+HTTP_RETRY_SETTINGS = (
+    ("retry_max", "TF_HTTP_RETRY_MAX", 2),
+    ("retry_wait_min", "TF_HTTP_RETRY_WAIT_MIN", 1),
+    ("retry_wait_max", "TF_HTTP_RETRY_WAIT_MAX", 30),
+)
+STATE_HEADER_SIZE = 4096
+JSON_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+STATE_LINEAGE_RE = re.compile(rb'"lineage"\s*:\s*"([^"]*)"')
+STATE_SERIAL_RE = re.compile(rb'"serial"\s*:\s*(\d+)')
+
+
+def supports_native_read(
+    backend_type: str, backend_config: Optional[Dict[str, Any]], backend_config_files: Optional[List[str]]
+) -> bool:
+    """Whether the state of the backend can be read without the terraform binary.
+
+    The backend configuration files use the HCL syntax, the backends configured with them are pulled by terraform.
+    """
+    if backend_config_files:
+        return False
+    known_keys = {"local": LOCAL_CONFIG_KEYS, "http": HTTP_CONFIG_KEYS}.get(backend_type.lower())
+    return known_keys is not None and set(backend_config or {}) <= known_keys
+
+
+@dataclass
+class StateContent:
+    """The document read from a backend, empty when the backend holds no state or when it did not change."""
+
+    content: bytes
+    source: str
+    # the values identifying this version of the document, sent back to skip reading it again when unchanged
+    validators: Dict[str, str] = field(default_factory=dict)
+    modified: bool = True
+
+
+def fetch_state(
+    backend_type: str,
+    backend_config: Optional[Dict[str, Any]],
+    workspace: Optional[str] = None,
+    validators: Optional[Dict[str, str]] = None,
+    size: int = -1,
+) -> StateContent:
+    """Fetch the state document of a local or http backend, unless it did not change since the validators.
+
+    When the size is set, only that head of a local state file is read.
+    """
+    if backend_type.lower() == "local":
+        return fetch_local_state(backend_config or {}, workspace, validators, size)
+    return fetch_http_state(backend_config or {}, workspace, validators)
+
+
+def state_unchanged(
+    backend_type: str,
+    backend_config: Optional[Dict[str, Any]],
+    workspace: Optional[str],
+    validators: Dict[str, str],
+    header: Optional[Tuple[str, int]],
+) -> bool:
+    """Whether the state of a local or http backend still has the lineage and serial of the version fetched with
+    the validators, None for no state. Only the head of a local state file is read, a conditional request is sent
+    to the http backend.
+    """
+    fetched = fetch_state(backend_type, backend_config, workspace, validators, size=STATE_HEADER_SIZE)
+    if not fetched.modified:
+        return True
+    if not fetched.content.strip():
+        return header is None
+    current = state_header(fetched.content)
+    return current is not None and current == header
+
+
+def _skip_whitespace(text: str, position: int) -> int:
+    match = JSON_WHITESPACE_RE.match(text, position)
+    return match.end() if match else position
+
+
+def _expect(text: str, position: int, delimiters: str) -> Tuple[str, int]:
+    """The delimiter found at the position, after the whitespaces, and the position following it."""
+    position = _skip_whitespace(text, position)
+    delimiter = text[position] if position < len(text) else ""
+    if not delimiter or delimiter not in delimiters:
+        raise ValueError("Expecting one of '{0}' at char {1}".format(delimiters, position))
+    return delimiter, _skip_whitespace(text, position + 1)
+
+
+def _decode_state(
+    text: str, keep_resource: Optional[Callable[[Dict[str, Any]], bool]]
+) -> Tuple[Dict[str, Any], List[TerraformStateResource]]:
+    """Decode the members of a state document, and the kept resources one at a time.
+
+    Only one resource of the state is decoded at a time, and only the kept ones are turned into models.
+    """
+    decoder = json.JSONDecoder()
+    members: Dict[str, Any] = {}
+    resources: List[TerraformStateResource] = []
+    _, position = _expect(text, 0, "{")
+    if text.startswith("}", position):
+        return members, resources
+    delimiter = ","
+    while delimiter == ",":
+        key, position = decoder.raw_decode(text, position)
+        _, position = _expect(text, position, ":")
+        if key == "resources" and text.startswith("[", position):
+            _, position = _expect(text, position, "[")
+            if text.startswith("]", position):
+                position += 1
+            else:
+                delimiter = ","
+                while delimiter == ",":
+                    resource, position = decoder.raw_decode(text, position)
+                    if keep_resource is None or keep_resource(resource):
+                        resources.append(TerraformStateResource.from_json(resource))
+                    delimiter, position = _expect(text, position, ",]")
+            members[key] = []
+        else:
+            members[key], position = decoder.raw_decode(text, position)
+        delimiter, position = _expect(text, position, ",}")
+    return members, resources
+
+
+def parse_state(
+    content: Union[str, bytes], source: str, keep_resource: Optional[Callable[[Dict[str, Any]], bool]] = None
+) -> Optional[TerraformState]:
+    """Parse a state document, keeping only the resources for which keep_resource, given their JSON, is true.
+
+    The content is read from a backend as bytes, or output by terraform state pull as text, which is used as is.
+    """
+    if not content.strip():
+        return None
+    try:
+        members, resources = _decode_state(to_text(content, errors="surrogate_or_strict"), keep_resource)
+        state = TerraformState.from_json(members)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise TerraformError("Could not parse the state read from {0}: {1}".format(source, e))
+    state.resources = resources
+    return state
+
+
+def state_header(content: Union[str, bytes]) -> Optional[Tuple[str, int]]:
+    """The lineage and serial of a state document, read without decoding it.
+
+    Terraform writes them before the outputs and the resources, only that head of the document is searched.
+    """
+    head = to_bytes(content[:STATE_HEADER_SIZE], errors="surrogate_or_strict")
+    for body_key in (b'"outputs"', b'"resources"'):
+        position = head.find(body_key)
+        if position >= 0:
+            head = head[:position]
+    lineage = STATE_LINEAGE_RE.search(head)
+    serial = STATE_SERIAL_RE.search(head)
+    if not lineage or not serial:
+        return None
+    return to_native(lineage.group(1)), int(serial.group(1))
+
+
+def fetch_local_state(
+    backend_config: Dict[str, Any],
+    workspace: Optional[str] = None,
+    validators: Optional[Dict[str, str]] = None,
+    size: int = -1,
+) -> StateContent:
+    if workspace and workspace != DEFAULT_WORKSPACE:
+        # like terraform, the state of the other workspaces does not follow the path option
+        workspace_dir = backend_config.get("workspace_dir") or LOCAL_DEFAULT_WORKSPACE_DIR
+        path = os.path.join(workspace_dir, workspace, LOCAL_DEFAULT_STATE_PATH)
+    else:
+        path = backend_config.get("path") or LOCAL_DEFAULT_STATE_PATH
+    try:
+        with open(path, "rb") as state_file:
+            stat = os.fstat(state_file.fileno())
+            current = {"mtime": str(stat.st_mtime_ns), "size": str(stat.st_size)}
+            if validators == current:
+                return StateContent(b"", path, current, modified=False)
+            content = state_file.read(size)
+    except FileNotFoundError:
+        return StateContent(b"", path)
+    except OSError as e:
+        raise TerraformError("Could not read the state file {0}: {1}".format(path, to_native(e)))
+    return StateContent(content, path, current)
+
+
+class HTTPConnectionPool:
+    """Idle connections kept open between the reads of the states of the same server."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[Any, ...], List[http.client.HTTPConnection]] = {}
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[http.client.HTTPConnection]:
+        with self._lock:
+            connections = self._idle.get(key)
+            return connections.pop() if connections else None
+
+    def put(self, key: Tuple[Any, ...], connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def clear(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+connection_pool = HTTPConnectionPool()
+
+
+def _ssl_context(backend_config: Dict[str, Any]) -> ssl.SSLContext:
+    context = ssl.create_default_context(cadata=backend_config.get("client_ca_certificate_pem"))
+    if boolean(backend_config.get("skip_cert_verification") or False):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if backend_config.get("client_certificate_pem") and backend_config.get("client_private_key_pem"):
+        # the ssl module only loads the client certificate from files
+        with TemporaryDirectory() as temp_dir:
+            certificate = os.path.join(temp_dir, "client.pem")
+            private_key = os.path.join(temp_dir, "client.key")
+            for path, pem in ((certificate, "client_certificate_pem"), (private_key, "client_private_key_pem")):
+                with open(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600), "w") as pem_file:
+                    pem_file.write(backend_config[pem])
+            context.load_cert_chain(certificate, private_key)
+    return context
+
+
+def _safe_address(address: str) -> str:
+    """The address without the credentials it may embed."""
+    url = urlsplit(address)
+    return "{0}://{1}{2}".format(url.scheme, url.netloc.rpartition("@")[2], url.path)
+
+
+def _request(
+    key: Tuple[Any, ...], connection: http.client.HTTPConnection, path: str, headers: Dict[str, str]
+) -> Tuple[int, bytes, Dict[str, str], Optional[str]]:
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    content = response.read()
+    if response.will_close:
+        connection.close()
+    else:
+        connection_pool.put(key, connection)
+    validators = {}
+    for name, header in (("etag", "ETag"), ("last_modified", "Last-Modified")):
+        value = response.getheader(header)
+        if value:
+            validators[name] = value
+    return response.status, content, validators, response.getheader("Location")
+
+
+def _split_address(address: str) -> SplitResult:
+    url = urlsplit(address)
+    if url.scheme not in ("http", "https") or not url.hostname:
+        raise TerraformError("The address of the http backend must be an http or https URL.")
+    return url
+
+
+def _send(
+    backend_config: Dict[str, Any], url: SplitResult, headers: Dict[str, str]
+) -> Tuple[int, bytes, Dict[str, str], Optional[str]]:
+    """Send a GET request on an idle connection to the server when there is one, on a new connection otherwise."""
+    path = url.path or "/"
+    if url.query:
+        path += "?" + url.query
+
+    key: Tuple[Any, ...] = (
+        url.scheme,
+        url.netloc,
+        boolean(backend_config.get("skip_cert_verification") or False),
+        backend_config.get("client_ca_certificate_pem"),
+        backend_config.get("client_certificate_pem"),
+    )
+    connection = connection_pool.get(key)
+    if connection is not None:
+        try:
+            return _request(key, connection, path, headers)
+        except (http.client.HTTPException, OSError):
+            # the server may have closed the idle connection meanwhile, the request is retried on a new one
+            connection.close()
+
+    hostname = cast(str, url.hostname)  # checked when splitting the address
+    if url.scheme == "https":
+        connection = http.client.HTTPSConnection(
+            hostname, url.port, timeout=HTTP_TIMEOUT, context=_ssl_context(backend_config)
+        )
+    else:
+        connection = http.client.HTTPConnection(hostname, url.port, timeout=HTTP_TIMEOUT)
+    try:
+        return _request(key, connection, path, headers)
+    except (http.client.HTTPException, OSError) as e:
+        connection.close()
+        raise TerraformError(
+            "Could not read the state from the http backend {0}: {1}".format(_safe_address(url.geturl()), e)
+        )
+
+
+def _retry_settings(backend_config: Dict[str, Any]) -> Tuple[int, int, int]:
+    """The number of retries of the http backend, and the minimum and maximum seconds to wait between them."""
+    settings: List[int] = []
+    for name, env, default in HTTP_RETRY_SETTINGS:
+        value = backend_config.get(name)
+        if value is None:
+            value = os.environ.get(env) or default
+        try:
+            settings.append(int(value))
+        except (TypeError, ValueError):
+            raise TerraformError("The '{0}' of the http backend must be an integer, got {1!r}.".format(name, value))
+    return settings[0], settings[1], settings[2]
+
+
+def _retryable(status: int) -> bool:
+    # like terraform, the throttled requests and the server errors but not implemented are retried
+    return status == 429 or (status >= 500 and status != 501)
+
+
+def _http_get(
+    backend_config: Dict[str, Any], address: str, validators: Optional[Dict[str, str]] = None
+) -> Tuple[int, bytes, Dict[str, str]]:
+    headers = {"Accept": "application/json"}
+    username = backend_config.get("username") or os.environ.get("TF_HTTP_USERNAME")
+    password = backend_config.get("password") or os.environ.get("TF_HTTP_PASSWORD")
+    if username or password:
+        credentials = to_bytes("{0}:{1}".format(username or "", password or ""))
+        headers["Authorization"] = "Basic " + base64.b64encode(credentials).decode("ascii")
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    retry_max, retry_wait_min, retry_wait_max = _retry_settings(backend_config)
+    url = _split_address(address)
+    redirects = 0
+    attempt = 0
+    while True:
+        try:
+            status, content, current, location = _send(backend_config, url, headers)
+        except TerraformError:
+            if attempt >= retry_max:
+                raise
+        else:
+            if status in HTTP_REDIRECT_STATUSES and location:
+                redirects += 1
+                if redirects > HTTP_MAX_REDIRECTS:
+                    raise TerraformError(
+                        "Could not read the state from the http backend {0}: stopped after {1} redirects".format(
+                            _safe_address(address), HTTP_MAX_REDIRECTS
+                        )
+                    )
+                target = _split_address(urljoin(url.geturl(), location))
+                if target.netloc != url.netloc:
+                    # like terraform, the credentials are not sent to another host
+                    headers.pop("Authorization", None)
+                url = target
+                continue
+            if not _retryable(status) or attempt >= retry_max:
+                return status, content, current
+        time.sleep(min(retry_wait_min * 2**attempt, retry_wait_max))
+        attempt += 1
+
+
+def fetch_http_state(
+    backend_config: Dict[str, Any], workspace: Optional[str] = None, validators: Optional[Dict[str, str]] = None
+) -> StateContent:
+    if workspace and workspace != DEFAULT_WORKSPACE:
+        raise TerraformError("The http backend does not support workspaces.")
+    address = backend_config.get("address") or os.environ.get("TF_HTTP_ADDRESS")
+    if not address:
+        raise TerraformError("The 'address' of the http backend is required.")
+
+    source = _safe_address(address)
+    status, content, current = _http_get(backend_config, address, validators)
+    if status == 304:
+        return StateContent(b"", source, dict(validators or {}), modified=False)
+    # like terraform, a missing state is not an error
+    if status in (204, 404):
+        return StateContent(b"", source)
+    if status != 200:
+        raise TerraformError(
+            "Could not read the state from the http backend {0}: HTTP status {1}".format(source, status)
+        )
+    return StateContent(content, source, current)
@@ -4,8 +4,11 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 
+import json
+import os
 import random
 import string
+import time
 from typing import Any, Dict, Optional
 from unittest.mock import ANY, MagicMock, call
 
@@ -16,20 +19,36 @@ from ansible.template import Templar
 from ansible_collections.cloud.terraform.plugins.inventory.terraform_state import (
     PROVIDERS_CONFIG,
     TERRAFORM_STATE_FILE_SUPPORT_VERSION,
+    HostChanges,
+    HostnameResolver,
+    HostVarProjection,
     InventoryModule,
+    ProviderMatcher,
     TerraformError,
-    filter_instances,
+    TerraformProviderInstance,
+    colliding_hostnames,
+    compiled_expressions,
+    constructed_expressions,
     get_preferred_hostname,
     get_tag_hostname,
+    host_digests_path,
     parse_provider_from_state_file_resource,
     purge_backend_config,
+    read_host_digests,
+    remove_expired_working_dirs,
+    resource_filter,
+    supports_compile_hook,
+    working_dir_key,
+    write_host_digests,
     write_terraform_config,
 )
 from ansible_collections.cloud.terraform.plugins.module_utils.models import (
     TerraformState,
     TerraformStateResource,
     TerraformStateResourceInstance,
+    TerraformWorkspaceContext,
 )
+from ansible_collections.cloud.terraform.plugins.plugin_utils.state_readers import parse_state
 
 # from plugins.module_utils.errors import TerraformError
 
@@ -104,18 +123,18 @@ class TestParseProviderFromStateFileResource:
         assert not parse_provider_from_state_file_resource('["registry.terraform.io/hashicorp/aws"]')
 
 
-class TestFilterInstances:
-    def create_state_resource(
-        self, type: str, provider_name: str, module: Optional[str] = None
-    ) -> TerraformStateResource:
-        return TerraformStateResource(
+class TestResourceFilter:
+    def create_state_resource(self, type: str, provider_name: str, module: Optional[str] = None) -> Dict[str, Any]:
+        resource = dict(
             name="".join(random.choices(string.ascii_letters + string.digits, k=12)),
             mode="managed",
-            module=module,
             type=type,
             provider=provider_name,
             instances=[],
         )
+        if module:
+            resource["module"] = module
+        return resource
 
     def test_filter_instances(self, mocker):
         m_resources = [
@@ -134,7 +153,8 @@ class TestFilterInstances:
             "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.parse_provider_from_state_file_resource"
         )
         m_parse_provider_from_state_file_resource.side_effect = lambda x: x
-        assert filter_instances(m_resources + fake_resources, False, []) == m_resources
+        is_instance = resource_filter(False, [])
+        assert [r for r in m_resources + fake_resources if is_instance(r)] == m_resources
 
     @pytest.mark.parametrize("search_child_modules", [True, False])
     def test_filter_instances_with_search_child_modules(self, mocker, search_child_modules):
@@ -158,7 +178,58 @@ class TestFilterInstances:
         )
         m_parse_provider_from_state_file_resource.side_effect = lambda x: x
         results = root_module_resources + child_modules_resources if search_child_modules else root_module_resources
-        assert filter_instances(root_module_resources + child_modules_resources, search_child_modules, []) == results
+        is_instance = resource_filter(search_child_modules, [])
+        assert [r for r in root_module_resources + child_modules_resources if is_instance(r)] == results
+
+    def test_filter_instances_with_type_patterns(self):
+        provider_name = "registry.terraform.io/digitalocean/digitalocean"
+        resources = [
+            self.create_state_resource(type=type, provider_name='provider["%s"]' % name)
+            for type, name in [
+                ("digitalocean_droplet", provider_name),
+                ("digitalocean_droplet_snapshot", provider_name),
+                ("digitalocean_volume", provider_name),
+                ("digitalocean_droplet", "registry.terraform.io/other/digitalocean"),
+                ("aws_instance", "registry.terraform.io/hashicorp/aws"),
+            ]
+        ]
+        custom_providers = [TerraformProviderInstance(provider_name=provider_name, types=["digitalocean_droplet*"])]
+        is_instance = resource_filter(False, custom_providers)
+        assert [r for r in resources if is_instance(r)] == [resources[0], resources[1], resources[4]]
+
+    @pytest.mark.parametrize("search_child_modules", [True, False])
+    def test_resource_filter(self, search_child_modules):
+        is_instance = resource_filter(search_child_modules, [])
+        aws = 'provider["registry.terraform.io/hashicorp/aws"]'
+        assert is_instance({"type": "aws_instance", "provider": aws})
+        assert not is_instance({"type": "aws_s3_bucket", "provider": aws})
+        assert not is_instance({"type": "aws_instance"})
+        assert is_instance({"type": "aws_instance", "provider": aws, "module": "module.web"}) is search_child_modules
+
+
+class TestProviderMatcher:
+    def test_matches(self, mocker):
+        parse_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.parse_provider_from_state_file_resource",
+            side_effect=lambda x: x,
+        )
+        matcher = ProviderMatcher(
+            [
+                TerraformProviderInstance(provider_name="aws", types=["aws_instance", "aws_spot_*"]),
+                TerraformProviderInstance(provider_name="google", types=["google_compute_[ir]*"]),
+            ]
+        )
+
+        assert matcher.matches("aws", "aws_instance")
+        assert matcher.matches("aws", "aws_spot_instance_request")
+        assert not matcher.matches("aws", "aws_s3_bucket")
+        assert not matcher.matches("google", "aws_instance")
+        assert matcher.matches("google", "google_compute_instance")
+        assert not matcher.matches("google", "google_compute_disk")
+        assert not matcher.matches("other", "aws_spot_instance_request")
+        # answers are memoized per provider and type
+        assert matcher.matches("aws", "aws_instance")
+        assert parse_patch.call_count == 7
 
 
 class TestGetTagHostName:
@@ -192,7 +263,7 @@ class TestGetPreferredHostName:
         assert result == resource_type + "_" + resource_name
 
     @pytest.mark.parametrize(
-        "tag_hostnames,get_tag_hostname",
+        "tag_hostnames,expected",
         [
             ("tag:Name", "ansible_host"),
             ("tag:Name=ansible_host", "Name_ansible_host"),
@@ -201,32 +272,20 @@ class TestGetPreferredHostName:
             ("tag:Name,Phase=dev", "Phase_dev"),
         ],
     )
-    def test_with_tag_prefix(self, terraform_state_resource_instance, mocker, tag_hostnames, get_tag_hostname):
-        get_tag_hostname_patch = mocker.patch(
-            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.get_tag_hostname"
-        )
-        get_tag_hostname_patch.return_value = get_tag_hostname
+    def test_with_tag_prefix(self, terraform_state_resource_instance, tag_hostnames, expected):
         result = get_preferred_hostname(
             self.resource_name, self.resource_type, terraform_state_resource_instance, [tag_hostnames]
         )
-        assert result == get_tag_hostname
+        assert result == expected
 
-    def test_with_literal_value(self, terraform_state_resource_instance, mocker):
-        get_tag_hostname_patch = mocker.patch(
-            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.get_tag_hostname"
-        )
+    def test_with_literal_value(self, terraform_state_resource_instance):
         hostname = "some_dummy_value"
         result = get_preferred_hostname(
             self.resource_name, self.resource_type, terraform_state_resource_instance, [hostname]
         )
         assert result == hostname
-        get_tag_hostname_patch.assert_not_called()
 
-    def test_with_prefix_containig_tag(self, terraform_state_resource_instance, mocker):
-        get_tag_hostname_patch = mocker.patch(
-            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.get_tag_hostname"
-        )
-        get_tag_hostname_patch.return_value = "ansible_host"
+    def test_with_prefix_containig_tag(self, terraform_state_resource_instance):
         hostname = {"name": "tag:Name"}
         result = get_preferred_hostname(
             self.resource_name, self.resource_type, terraform_state_resource_instance, [hostname]
@@ -245,14 +304,60 @@ class TestGetPreferredHostName:
 
     def test_with_prefix_missing_name_key(self, terraform_state_resource_instance):
         hostname = {"key": "private_ip"}
-        with pytest.raises(Exception):
-            try:
-                get_preferred_hostname(
-                    self.resource_name, self.resource_type, terraform_state_resource_instance, [hostname]
-                )
-            except TerraformError as e:
-                assert "A 'name' key must be defined in a hostnames dictionary." in str(e.value)
-                raise
+        with pytest.raises(TerraformError, match="A 'name' key must be defined in a hostnames dictionary."):
+            get_preferred_hostname(
+                self.resource_name, self.resource_type, terraform_state_resource_instance, [hostname]
+            )
+
+
+class TestHostnameResolver:
+    def test_default(self, terraform_state_resource_instance):
+        resolve_hostname = HostnameResolver()
+        assert resolve_hostname("web", "aws_instance", terraform_state_resource_instance) == "aws_instance_web"
+
+    @pytest.mark.parametrize(
+        "preference,expected",
+        [
+            ({"name": "tag:Name", "prefix": "instance_type"}, "t2.micro_ansible_host"),
+            ({"name": "tag:Name", "prefix": "tag:Phase", "separator": "-"}, "dev-ansible_host"),
+            ({"name": "tag:Name", "prefix": "tag:Missing", "separator": "-"}, "ansible_host"),
+            ({"name": "tag:Missing", "prefix": "instance_type"}, None),
+            ({"name": "instance_type", "prefix": "cluster", "separator": "."}, "cluster.t2.micro"),
+        ],
+    )
+    def test_prefix_and_separator(self, terraform_state_resource_instance, preference, expected):
+        resolve_hostname = HostnameResolver([preference])
+        assert resolve_hostname("web", "aws_instance", terraform_state_resource_instance) == expected
+
+    @pytest.mark.parametrize(
+        "hostnames,expected",
+        [
+            (["tag:Missing", "tag:Phase"], "dev"),
+            (["tag:Phase", "tag:Name"], "dev"),
+            (["tag:Name=runner", "tag:Phase=dev"], "Phase_dev"),
+            (["tag:Missing", "tag:Name=runner"], None),
+        ],
+    )
+    def test_tag_list(self, terraform_state_resource_instance, hostnames, expected):
+        resolve_hostname = HostnameResolver(hostnames)
+        assert resolve_hostname("web", "aws_instance", terraform_state_resource_instance) == expected
+
+    @pytest.mark.parametrize(
+        "hostnames,expected",
+        [
+            (["tag:Missing", "instance_type"], "t2.micro"),
+            (["tag:Missing", "literal_host"], "literal_host"),
+            (["literal_host", "instance_type"], "literal_host"),
+        ],
+    )
+    def test_literal_fallback(self, terraform_state_resource_instance, hostnames, expected):
+        resolve_hostname = HostnameResolver(hostnames)
+        assert resolve_hostname("web", "aws_instance", terraform_state_resource_instance) == expected
+
+    def test_missing_name_key(self):
+        # the preferences are checked once, before any instance is resolved
+        with pytest.raises(TerraformError, match="A 'name' key must be defined in a hostnames dictionary."):
+            HostnameResolver(["tag:Name", {"prefix": "tag:Phase"}])
 
 
 class TestInventoryModuleVerifyFile:
@@ -323,10 +428,10 @@ class TestInventoryModuleCreateInventory:
 
         config = {f"id{id}": {"hostvar": f"fromInstanceId{id}"} for id in range(5)}
         resources = [self.create_state_resource(name=n, attributes=attr) for n, attr in config.items()]
-        get_preferred_hostname_patch = mocker.patch(
-            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.get_preferred_hostname"
+        hostname_resolver_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.HostnameResolver"
         )
-        get_preferred_hostname_patch.side_effect = lambda resource_name, resource_type, instance, _: resource_name
+        hostname_resolver_patch.return_value.side_effect = lambda resource_name, resource_type, instance: resource_name
 
         inventory_plugin._set_composite_vars = MagicMock()
         inventory_plugin._add_host_to_keyed_groups = MagicMock()
@@ -338,8 +443,9 @@ class TestInventoryModuleCreateInventory:
         for name, value in config.items():
             inventory_plugin.inventory.assert_value(name, value)
 
-        get_preferred_hostname_patch.assert_has_calls(
-            [call(r.name, r.type, i, hostnames) for r in resources for i in r.instances],
+        hostname_resolver_patch.assert_called_once_with(hostnames)
+        hostname_resolver_patch.return_value.assert_has_calls(
+            [call(r.name, r.type, i) for r in resources for i in r.instances],
             any_order=True,
         )
         inventory_plugin._set_composite_vars.assert_has_calls(
@@ -355,6 +461,251 @@ class TestInventoryModuleCreateInventory:
             any_order=True,
         )
 
+    def test_create_inventory_with_hostvar_projection(self, inventory_plugin, mocker):
+        attributes = {"id": "i-01", "tags": {"Name": "web"}, "tags_all": {"Name": "web"}, "user_data": "x" * 100}
+        resources = [self.create_state_resource(name="web", attributes=attributes)]
+        inventory_plugin._set_composite_vars = MagicMock()
+        inventory_plugin._add_host_to_keyed_groups = MagicMock()
+        inventory_plugin._add_host_to_composed_groups = MagicMock()
+        inventory_plugin.inventory = self.ansibleInventory()
+
+        inventory_plugin.create_inventory(
+            resources,
+            ["id"],
+            {},
+            [],
+            {},
+            False,
+            hostvar_projection=HostVarProjection(None, ["tags_all"], max_bytes=64),
+        )
+
+        inventory_plugin.inventory.assert_value("i-01", {"id": "i-01", "tags": {"Name": "web"}})
+        # the groups and composed variables still see all the attributes
+        inventory_plugin._set_composite_vars.assert_called_once_with({}, attributes, "i-01", strict=False)
+        inventory_plugin._add_host_to_composed_groups.assert_called_once_with({}, attributes, "i-01", strict=False)
+
+    def test_create_inventory_with_workspaces(self, inventory_plugin):
+        resources = [
+            self.create_state_resource(name="web", attributes={"id": "i-01"}),
+            self.create_state_resource(name="db", attributes={"id": "i-02"}),
+        ]
+        resources[0].workspace = "prod"
+
+        inventory_plugin.create_inventory(resources, ["id"], None, [], {}, False)
+
+        # the names which do not collide are kept
+        assert inventory_plugin.inventory.get_host("i-01").vars["terraform_workspace"] == "prod"
+        assert "ansible_host" not in inventory_plugin.inventory.get_host("i-01").vars
+        assert "terraform_workspace" not in inventory_plugin.inventory.get_host("i-02").vars
+        assert [h.name for h in inventory_plugin.inventory.groups["workspace_prod"].get_hosts()] == ["i-01"]
+
+    def test_create_inventory_same_hosts_in_workspaces(self, inventory_plugin):
+        resources = [
+            self.create_state_resource(name="web", attributes={"id": "i-01"}),
+            self.create_state_resource(name="web", attributes={"id": "i-02"}),
+            self.create_state_resource(name="db", attributes={"id": "i-03"}),
+        ]
+        resources[0].workspace = "eu-west-1"
+        resources[1].workspace = "default"
+        resources[2].workspace = "default"
+
+        inventory_plugin.create_inventory(resources, [], None, [], {}, False)
+
+        hosts = inventory_plugin.inventory.hosts
+        assert sorted(hosts) == ["aws_instance_db", "default_aws_instance_web", "eu-west-1_aws_instance_web"]
+        assert hosts["eu-west-1_aws_instance_web"].vars["id"] == "i-01"
+        assert hosts["default_aws_instance_web"].vars["id"] == "i-02"
+        groups = inventory_plugin.inventory.groups
+        assert [h.name for h in groups["workspace_eu_west_1"].get_hosts()] == ["eu-west-1_aws_instance_web"]
+        assert sorted(h.name for h in groups["workspace_default"].get_hosts()) == [
+            "aws_instance_db",
+            "default_aws_instance_web",
+        ]
+
+    def test_create_inventory_same_address_in_workspaces(self, inventory_plugin):
+        resources = [
+            self.create_state_resource(name="web", attributes={"id": "i-01", "private_ip": "10.0.0.1"}),
+            self.create_state_resource(name="web", attributes={"id": "i-02", "private_ip": "10.0.0.1"}),
+            self.create_state_resource(name="web", attributes={"id": "i-03", "private_ip": "10.0.0.2"}),
+        ]
+        resources[0].workspace = "eu-west-1"
+        resources[2].workspace = "us-east-1"
+
+        inventory_plugin.create_inventory(resources, ["private_ip"], None, [], {}, False)
+
+        hosts = inventory_plugin.inventory.hosts
+        assert sorted(hosts) == ["10.0.0.1", "10.0.0.2", "eu-west-1_10.0.0.1"]
+        # the prefixed host is still reached at its address
+        assert hosts["eu-west-1_10.0.0.1"].vars["ansible_host"] == "10.0.0.1"
+        assert hosts["eu-west-1_10.0.0.1"].vars["id"] == "i-01"
+        assert "ansible_host" not in hosts["10.0.0.1"].vars
+        assert "ansible_host" not in hosts["10.0.0.2"].vars
+
+    def test_create_inventory_with_host_changes(self, inventory_plugin):
+        resources = [
+            self.create_state_resource(name="web", attributes={"id": "i-01", "ami": "ami-02"}),
+            self.create_state_resource(name="db", attributes={"id": "i-02", "ami": "ami-01"}),
+        ]
+        previous = HostChanges({})
+        previous.add("i-01", {"id": "i-01", "ami": "ami-01"})
+        previous.add("i-02", {"id": "i-02", "ami": "ami-01"})
+        host_changes = HostChanges(previous.current)
+
+        inventory_plugin.create_inventory(resources, ["id"], None, [], {}, False, host_changes=host_changes)
+
+        assert [h.name for h in inventory_plugin.inventory.groups["tf_changed"].get_hosts()] == ["i-01"]
+        assert [h.name for h in inventory_plugin.inventory.groups["tf_unchanged"].get_hosts()] == ["i-02"]
+        assert "tf_added" not in inventory_plugin.inventory.groups
+
+
+class TestCompiledExpressions:
+    def test_constructed_expressions(self):
+        compose = {"ansible_host": "private_ip", "ignored": 1}
+        keyed_groups = [{"key": "tags.env", "prefix": "env"}, {"prefix": "no_key"}, "invalid"]
+        groups = {"web": " 'web' in tags.Name\n"}
+
+        expressions = constructed_expressions(compose, keyed_groups, groups)
+
+        assert expressions == {"private_ip", "tags.env", "'web' in tags.Name"}
+        assert constructed_expressions(None, [], {}) == set()
+
+    @pytest.mark.skipif(not hasattr(Templar(loader=None), "_engine"), reason="requires ansible-core >= 2.19")
+    def test_compiled_expressions(self, mocker):
+        from ansible.template import trust_as_template
+
+        templar = Templar(loader=None)
+        compile_expression = mocker.spy(templar._engine, "_compile_expression")
+
+        note = MagicMock()
+        with compiled_expressions(templar, {"tags.env | upper"}, note):
+            for env in ("dev", "prod"):
+                templar.available_variables = {"tags": {"env": env}, "id": "i-01"}
+                assert templar.evaluate_expression(trust_as_template("tags.env | upper")) == env.upper()
+                assert templar.evaluate_conditional(trust_as_template("id == 'i-01'"))
+
+        assert [c.args[0] for c in compile_expression.call_args_list] == [
+            "tags.env | upper",
+            "id == 'i-01'",
+            "id == 'i-01'",
+        ]
+        # the engine compiles again once the inventory is created
+        assert templar._engine._compile_expression is compile_expression
+        note.assert_not_called()
+
+    def test_compiled_expressions_unsupported_templar(self):
+        templar = MagicMock(spec=["evaluate_expression"])
+        note = MagicMock()
+
+        with compiled_expressions(templar, {"private_ip"}, note):
+            pass
+
+        assert not hasattr(templar, "_engine")
+        note.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "version,compile_expression",
+        [
+            ("2.18.6", lambda expression, options: None),
+            ("2.20.0", lambda expression, options, trusted: None),
+        ],
+    )
+    def test_compiled_expressions_fallback(self, mocker, version, compile_expression):
+        mocker.patch("ansible_collections.cloud.terraform.plugins.inventory.terraform_state.ansible_version", version)
+        engine = MagicMock(spec=["_compile_expression"])
+        engine._compile_expression = compile_expression
+        templar = MagicMock(_engine=engine)
+        note = MagicMock()
+
+        with compiled_expressions(templar, {"private_ip"}, note):
+            assert engine._compile_expression is compile_expression
+
+        assert "compiled for each host" in note.call_args[0][0]
+
+    def test_supports_compile_hook(self):
+        engine = MagicMock(spec=["_compile_expression"])
+        engine._compile_expression = lambda expression, options: None
+        assert supports_compile_hook(engine)
+        assert not supports_compile_hook(None)
+
+
+class TestCollidingHostnames:
+    def test_colliding_hostnames(self):
+        hosts = [("web", "prod"), ("web", "dev"), ("db", "prod"), ("db", "prod"), ("cache", None), ("cache", "dev")]
+        assert colliding_hostnames(hosts) == {"web", "cache"}
+
+
+class TestHostVarProjection:
+    ATTRIBUTES = {
+        "id": "i-01",
+        "instance_type": "t2.micro",
+        "tags": {"Name": "web"},
+        "tags_all": {"Name": "web"},
+        "user_data": "#!/bin/sh\n" * 20,
+        "private_ip": "10.0.0.1",
+        "root_block_device": [{"volume_size": 8, "tags": {"Name": "root"}}],
+        "monitoring": False,
+        "cpu_core_count": 1,
+        "timeouts": None,
+    }
+
+    @pytest.mark.parametrize(
+        "include,exclude,max_bytes,expected",
+        [
+            (None, None, 0, list(ATTRIBUTES)),
+            (["id", "tags*"], None, 0, ["id", "tags", "tags_all"]),
+            (["id", "tags*"], ["*_all"], 0, ["id", "tags"]),
+            (
+                None,
+                ["user_data", "root_*"],
+                0,
+                ["id", "instance_type", "tags", "tags_all", "private_ip", "monitoring", "cpu_core_count", "timeouts"],
+            ),
+            (
+                None,
+                None,
+                16,
+                ["id", "instance_type", "tags", "tags_all", "private_ip", "monitoring", "cpu_core_count", "timeouts"],
+            ),
+        ],
+    )
+    def test_projection(self, include, exclude, max_bytes, expected):
+        assert list(HostVarProjection(include, exclude, max_bytes)(self.ATTRIBUTES)) == expected
+
+    def test_max_bytes_escaped_string(self):
+        projection = HostVarProjection(None, None, max_bytes=20)
+        # 9 bytes, 54 once serialized as JSON
+        assert projection({"escaped": "\x01" * 9, "plain": "a" * 9}) == {"plain": "a" * 9}
+
+
+class TestHostChanges:
+    def test_groups(self):
+        previous = HostChanges({})
+        previous.add("web", {"id": "i-01", "tags": {"Name": "web"}})
+        previous.add("db", {"id": "i-02"})
+
+        host_changes = HostChanges(previous.current)
+        host_changes.add("web", {"tags": {"Name": "web"}, "id": "i-01"})
+        host_changes.add("db", {"id": "i-03"})
+        host_changes.add("cache", {"id": "i-04"})
+
+        assert dict(host_changes.groups()) == {"web": "tf_unchanged", "db": "tf_changed", "cache": "tf_added"}
+
+    def test_host_digests(self, tmp_path):
+        path = host_digests_path(str(tmp_path), "inventory/terraform_state.yml")
+        assert path.startswith(str(tmp_path / "inventory_hosts"))
+        assert read_host_digests(path, [dict(lineage="4a6b1c5e", serial=3)]) == {}
+
+        states = [dict(lineage="4a6b1c5e", serial=3), dict(lineage="0b1d2c3e", serial=1)]
+        write_host_digests(path, states, {"web": "a"}, {"web": "b"})
+        # the states of several backends are compared regardless of their order
+        assert read_host_digests(path, states[::-1]) == {"web": "a"}
+        assert read_host_digests(path, [dict(lineage="4a6b1c5e", serial=4), states[1]]) == {"web": "b"}
+
+    def test_read_host_digests_invalid(self, tmp_path):
+        path = tmp_path / "hosts.json"
+        path.write_text("{not json")
+        assert read_host_digests(str(path), []) == {}
+
 
 class TestWriteTerraformConfig:
     @pytest.mark.parametrize(
@@ -426,13 +777,14 @@ class TestInventoryModuleQuery:
             "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.write_terraform_config"
         )
         self.instances = MagicMock()
-        self.filter_instances_patch = mocker.patch(
-            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.filter_instances"
-        )
-        self.filter_instances_patch.return_value = self.instances
         self.purge_backend_config_patch = mocker.patch(
             "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.purge_backend_config"
         )
+        # the states read without terraform are covered by TestInventoryModuleQueryNative
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.supports_native_read",
+            return_value=False,
+        )
 
         self.terraform_commands = MagicMock()
         self.terraform_command_patch = mocker.patch(
@@ -445,9 +797,13 @@ class TestInventoryModuleQuery:
             lineage="970415ab-6c6b-82c4-112b-0415b3655014",
             serial=4,
             outputs={},
-            resources=[],
+            resources=self.instances,
+        )
+        self.terraform_commands.state_pull_content.return_value = "{}"
+        self.parse_state_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.parse_state",
+            return_value=self.terraform_state,
         )
-        self.terraform_commands.state_pull.return_value = self.terraform_state
         self.terraform_binary = MagicMock()
         self.search_child_modules = MagicMock()
 
@@ -475,10 +831,8 @@ class TestInventoryModuleQuery:
         self.terraform_commands.init.assert_called_once_with(
             backend_config=None, backend_config_files=tf_backend_config_files
         )
-        self.terraform_commands.state_pull.assert_called_once()
-        self.filter_instances_patch.assert_called_once_with(
-            self.terraform_state.resources, self.search_child_modules, []
-        )
+        self.terraform_commands.state_pull_content.assert_called_once()
+        self.parse_state_patch.assert_called_once_with("{}", "terraform state pull", ANY)
         self.purge_backend_config_patch.assert_not_called()
         if state_file_version != TERRAFORM_STATE_FILE_SUPPORT_VERSION:
             inventory_plugin.warn.assert_called_once()
@@ -511,10 +865,8 @@ class TestInventoryModuleQuery:
         self.terraform_commands.init.assert_called_once_with(
             backend_config=backend_config, backend_config_files=backend_config_files_args
         )
-        self.terraform_commands.state_pull.assert_called_once()
-        self.filter_instances_patch.assert_called_once_with(
-            self.terraform_state.resources, self.search_child_modules, []
-        )
+        self.terraform_commands.state_pull_content.assert_called_once()
+        self.parse_state_patch.assert_called_once_with("{}", "terraform state pull", ANY)
         self.purge_backend_config_patch.assert_called_once_with(backend_config, ANY)
 
     @pytest.mark.parametrize(
@@ -539,12 +891,276 @@ class TestInventoryModuleQuery:
         )
         self.write_terraform_config_patch.assert_called_once_with(backend_type, backend_config, ANY)
         self.terraform_commands.init.assert_called_once_with(backend_config={}, backend_config_files=[])
-        self.terraform_commands.state_pull.assert_called_once()
-        self.filter_instances_patch.assert_called_once_with(
-            self.terraform_state.resources, self.search_child_modules, []
-        )
+        self.terraform_commands.state_pull_content.assert_called_once()
+        self.parse_state_patch.assert_called_once_with("{}", "terraform state pull", ANY)
         self.purge_backend_config_patch.assert_not_called()
 
+    def query_working_dir(self, inventory_plugin, tmp_path, backend_config=None):
+        return inventory_plugin._query(
+            self.terraform_binary,
+            "s3",
+            backend_config or {"bucket": "my-bucket"},
+            None,
+            self.search_child_modules,
+            [],
+            working_dir_ttl=3600,
+            cache_dir=str(tmp_path),
+        )
+
+    def test__query_reuse_working_dir(self, inventory_plugin, mocker, tmp_path):
+        self.setup_mockers(mocker)
+        self.purge_backend_config_patch.return_value = False
+        self.terraform_binary = "/usr/bin/terraform"
+
+        assert self.instances == self.query_working_dir(inventory_plugin, tmp_path)
+        assert self.instances == self.query_working_dir(inventory_plugin, tmp_path)
+
+        self.terraform_commands.init.assert_called_once()
+        assert self.terraform_commands.state_pull_content.call_count == 2
+        working_dirs = os.listdir(tmp_path / "inventory")
+        assert len(working_dirs) == 1
+        working_dir = tmp_path / "inventory" / working_dirs[0]
+        assert (working_dir / ".initialized").is_file()
+        assert working_dir.stat().st_mode & 0o777 == 0o700
+
+        # another backend uses another working directory
+        self.query_working_dir(inventory_plugin, tmp_path, backend_config={"bucket": "other-bucket"})
+        assert self.terraform_commands.init.call_count == 2
+        assert len(os.listdir(tmp_path / "inventory")) == 2
+
+    def test__query_working_dir_expired(self, inventory_plugin, mocker, tmp_path):
+        self.setup_mockers(mocker)
+        self.purge_backend_config_patch.return_value = False
+        self.terraform_binary = "/usr/bin/terraform"
+
+        self.query_working_dir(inventory_plugin, tmp_path)
+        marker = tmp_path / "inventory" / os.listdir(tmp_path / "inventory")[0] / ".initialized"
+        expired = time.time() - 7200
+        os.utime(marker, (expired, expired))
+        self.query_working_dir(inventory_plugin, tmp_path)
+
+        assert self.terraform_commands.init.call_count == 2
+
+    def test__query_working_dir_pull_failure(self, inventory_plugin, mocker, tmp_path):
+        self.setup_mockers(mocker)
+        self.purge_backend_config_patch.return_value = False
+        self.terraform_binary = "/usr/bin/terraform"
+
+        self.query_working_dir(inventory_plugin, tmp_path)
+        self.terraform_commands.state_pull_content.side_effect = [TerraformError("expired credentials"), "{}"]
+        assert self.instances == self.query_working_dir(inventory_plugin, tmp_path)
+
+        assert self.terraform_commands.init.call_count == 2
+
+
+# a state file, as written by terraform
+STATE = {
+    "version": TERRAFORM_STATE_FILE_SUPPORT_VERSION,
+    "terraform_version": "1.6.3",
+    "serial": 4,
+    "lineage": "970415ab-6c6b-82c4-112b-0415b3655014",
+    "outputs": {},
+    "resources": [
+        {
+            "mode": "managed",
+            "type": "aws_instance",
+            "name": "test",
+            "provider": 'provider["registry.terraform.io/hashicorp/aws"]',
+            "instances": [{"schema_version": 1, "attributes": {"id": "i-01"}}],
+        }
+    ],
+}
+
+
+class TestInventoryModuleQueryNative:
+    def test__query_local(self, inventory_plugin, mocker, tmp_path):
+        terraform_commands_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformCommands"
+        )
+        state_path = tmp_path / "terraform.tfstate"
+        state_path.write_text(json.dumps(STATE))
+
+        resources = inventory_plugin._query(None, "local", {"path": str(state_path)}, None, False, [])
+
+        assert [r.name for r in resources] == ["test"]
+        assert inventory_plugin._pulled_states == [dict(lineage="970415ab-6c6b-82c4-112b-0415b3655014", serial=4)]
+        terraform_commands_patch.assert_not_called()
+
+    def test__query_local_no_state(self, inventory_plugin, tmp_path):
+        inventory_plugin.warn = MagicMock()
+        assert inventory_plugin._query(None, "local", {"path": str(tmp_path / "missing")}, None, False, []) == []
+        inventory_plugin.warn.assert_called_once_with("No state found in %s." % (tmp_path / "missing"))
+
+    def test__query_reuse_unchanged_local_state(self, inventory_plugin, mocker, tmp_path):
+        state_path = tmp_path / "terraform.tfstate"
+        state_path.write_text(json.dumps(STATE))
+        parse_state_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.parse_state",
+            wraps=parse_state,
+        )
+
+        def query():
+            return inventory_plugin._query(
+                None,
+                "local",
+                {"path": str(state_path)},
+                None,
+                False,
+                [],
+                cache_dir=str(tmp_path / "cache"),
+                reuse_unchanged_states=True,
+            )
+
+        assert [r.name for r in query()] == ["test"]
+        assert [r.name for r in query()] == ["test"]
+        assert parse_state_patch.call_count == 1
+        assert len(inventory_plugin._pulled_states) == 2
+
+        # touched but not changed, the lineage and serial are read without decoding the state
+        os.utime(state_path, (time.time() + 10, time.time() + 10))
+        assert [r.name for r in query()] == ["test"]
+        assert parse_state_patch.call_count == 1
+
+        state_path.write_text(json.dumps(dict(STATE, serial=5, resources=[])))
+        assert query() == []
+        assert parse_state_patch.call_count == 2
+
+    def test__query_reuse_unchanged_pulled_state(self, inventory_plugin, mocker, tmp_path):
+        terraform_commands = MagicMock()
+        terraform_commands.state_pull_content.return_value = json.dumps(STATE)
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformCommands",
+            return_value=terraform_commands,
+        )
+        parse_state_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.parse_state",
+            wraps=parse_state,
+        )
+
+        for dummy in range(2):
+            resources = inventory_plugin._query(
+                "/usr/bin/terraform",
+                "s3",
+                {"bucket": "my-bucket"},
+                None,
+                False,
+                [],
+                cache_dir=str(tmp_path),
+                reuse_unchanged_states=True,
+            )
+            assert [r.name for r in resources] == ["test"]
+
+        assert parse_state_patch.call_count == 1
+        terraform_commands.state_pull.assert_not_called()
+
+    def test__query_without_binary(self, inventory_plugin):
+        with pytest.raises(TerraformError, match="terraform binary is required"):
+            inventory_plugin._query(None, "s3", {"bucket": "my-bucket"}, None, False, [])
+
+
+class TestInventoryModuleQueryWorkspaces:
+    @pytest.fixture(autouse=True)
+    def setup(self, inventory_plugin, mocker):
+        mocker.patch("ansible_collections.cloud.terraform.plugins.inventory.terraform_state.write_terraform_config")
+        self.init_commands = MagicMock()
+        self.init_commands.workspace_list.return_value = TerraformWorkspaceContext(
+            current="default", all=["eu-west-1", "eu-west-2", "us-east-1"]
+        )
+        # the content of the state pulled from each workspace, or the error raised
+        self.contents = {}
+
+        def terraform_commands(run_command, working_dir, binary_path, check_mode, workspace=None):
+            if workspace is None:
+                return self.init_commands
+            state = dict(STATE, resources=[dict(STATE["resources"][0], name=workspace)])
+            return MagicMock(
+                state_pull_content=MagicMock(side_effect=[self.contents.get(workspace, json.dumps(state))])
+            )
+
+        self.terraform_command_patch = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformCommands",
+            side_effect=terraform_commands,
+        )
+        self.plugin = inventory_plugin
+
+    def query(self, workspaces, **kwargs):
+        return self.plugin._query(
+            "/usr/bin/terraform", "s3", {"bucket": "my-bucket"}, None, False, [], workspaces=workspaces, **kwargs
+        )
+
+    def test__query_workspaces(self):
+        resources = self.query(["eu-*", "us-east-1", "missing"], concurrency=2)
+
+        assert [(r.name, r.workspace) for r in resources] == [
+            ("eu-west-1", "eu-west-1"),
+            ("eu-west-2", "eu-west-2"),
+            ("us-east-1", "us-east-1"),
+        ]
+        # a single working directory is initialized for all the workspaces
+        self.init_commands.init.assert_called_once()
+        self.init_commands.state_pull_content.assert_not_called()
+        calls = self.terraform_command_patch.call_args_list
+        assert sorted(c[0][4] for c in calls[1:]) == ["eu-west-1", "eu-west-2", "us-east-1"]
+        assert {c[0][1] for c in calls[1:]} == {self.init_commands.project_path}
+        self.plugin.warn.assert_not_called()
+
+    def test__query_workspaces_failure_is_a_warning(self):
+        self.contents["eu-west-2"] = TerraformError("access denied")
+
+        resources = self.query(["eu-*"])
+
+        assert [r.workspace for r in resources] == ["eu-west-1"]
+        self.plugin.warn.assert_called_once_with("Failed to pull the state of workspace eu-west-2: access denied")
+
+    def test__query_workspaces_all_failures(self):
+        self.contents = {w: TerraformError("access denied") for w in ("eu-west-1", "eu-west-2")}
+
+        with pytest.raises(TerraformError, match="any of the 2 workspaces"):
+            self.query(["eu-*"])
+
+    def test__query_reuse_unchanged_workspace_states(self, tmp_path):
+        self.query(["eu-*"], reuse_unchanged_states=True, cache_dir=str(tmp_path))
+        resources = self.query(["eu-*"], reuse_unchanged_states=True, cache_dir=str(tmp_path))
+
+        assert [r.workspace for r in resources] == ["eu-west-1", "eu-west-2"]
+        # the states are recorded for each workspace
+        assert len(os.listdir(tmp_path / "inventory_states")) == 2
+
+    def test__query_no_matching_workspace(self):
+        assert self.query(["ap-*"]) == []
+        self.plugin.warn.assert_called_once_with("No workspace matches ap-*.")
+
+
+class TestWorkingDirKey:
+    def test_working_dir_key(self, tmp_path):
+        config_file = tmp_path / "backend.hcl"
+        config_file.write_text('key = "state"')
+        key = working_dir_key("/usr/bin/terraform", "s3", {"bucket": "b"}, [str(config_file)])
+        assert key == working_dir_key("/usr/bin/terraform", "s3", {"bucket": "b"}, [str(config_file)])
+        assert key != working_dir_key("/usr/bin/terraform", "s3", {"bucket": "c"}, [str(config_file)])
+        assert key != working_dir_key("/usr/bin/terraform", "gcs", {"bucket": "b"}, [str(config_file)])
+        assert key != working_dir_key("/opt/terraform", "s3", {"bucket": "b"}, [str(config_file)])
+        assert key != working_dir_key("/usr/bin/terraform", "s3", {"bucket": "b"}, [str(config_file)], "prod")
+        config_file.write_text('key = "other"')
+        assert key != working_dir_key("/usr/bin/terraform", "s3", {"bucket": "b"}, [str(config_file)])
+
+
+class TestRemoveExpiredWorkingDirs:
+    def test_remove_expired_working_dirs(self, tmp_path):
+        expired = time.time() - 7200
+        for name in ("fresh", "expired", "kept"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / ".initialized").touch()
+        for name in ("expired", "kept"):
+            os.utime(tmp_path / name / ".initialized", (expired, expired))
+
+        remove_expired_working_dirs(str(tmp_path), 3600, keep="kept")
+
+        assert sorted(os.listdir(tmp_path)) == ["fresh", "kept"]
+
+    def test_missing_working_dirs(self, tmp_path):
+        remove_expired_working_dirs(str(tmp_path / "missing"), 3600, keep="")
+
 
 class TestInventoryModuleParse:
     mockers = {}
@@ -577,6 +1193,21 @@ class TestInventoryModuleParse:
 
         assert "The parameter 'backend_type' is required to use this inventory plugin." == str(exc.value)
 
+    def test_parse_workspace_and_workspaces(self, inventory_plugin, mocker):
+        config = {
+            "backends": [{"backend_type": "s3", "backend_config": {"key": "k"}, "workspace": "a", "workspaces": ["b"]}]
+        }
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.InventoryModule._read_config_data",
+            side_effect=lambda _: config,
+        )
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformInventoryPluginBase.parse"
+        )
+
+        with pytest.raises(TerraformError, match="'workspace' and 'workspaces' of a backend are mutually exclusive"):
+            inventory_plugin.parse(MagicMock(), MagicMock(), "inventory_terraform_state.yml")
+
     def test_parse_missing_backend_configure(self, inventory_plugin, mocker):
         config = {
             "backend_type": "s3",
@@ -607,6 +1238,12 @@ class TestInventoryModuleParse:
             config.get("backend_config_files"),
             config.get("search_child_modules", False),
             [],
+            working_dir_ttl=config.get("working_dir_ttl", 0),
+            cache_dir=config.get("cache_dir"),
+            workspace=None,
+            reuse_unchanged_states=False,
+            workspaces=None,
+            concurrency=4,
         )
         self.get_mock("create_inventory").assert_called_once_with(
             self.get_mock("_query_instances"),
@@ -615,6 +1252,8 @@ class TestInventoryModuleParse:
             config.get("keyed_groups"),
             config.get("groups"),
             config.get("strict"),
+            hostvar_projection=None,
+            host_changes=None,
         )
 
         super_parse_patch.assert_called_once_with(
@@ -726,3 +1365,292 @@ class TestInventoryModuleParse:
         validate_bin_patch.assert_not_called()
 
         self.assert_calls(config, super_parse_patch, read_config_data_patch)
+
+
+class TestInventoryModuleQueryBackends:
+    @pytest.fixture(autouse=True)
+    def setup(self, inventory_plugin):
+        self.plugin = inventory_plugin
+        self.plugin.warn = MagicMock()
+        self.backends = [
+            dict(backend_type="s3", backend_config={"key": "network"}),
+            dict(backend_type="s3", backend_config={"key": "compute"}, workspace="prod"),
+            dict(backend_type="local", backend_config={"path": "terraform.tfstate"}),
+        ]
+
+    def query_backends(self, side_effect):
+        self.plugin._query = MagicMock(side_effect=side_effect)
+        return self.plugin._query_backends("terraform", self.backends, False, [], 2)
+
+    def test_merge_in_backend_order(self):
+        def query(*args, **kwargs):
+            # the first backend answers last
+            if args[2] == {"key": "network"}:
+                time.sleep(0.05)
+            name = args[2].get("key", "local")
+            return [TerraformStateResource(name=name, mode="managed", module="", type="", provider="", instances=[])]
+
+        resources = self.query_backends(query)
+        assert [(r.name, r.workspace) for r in resources] == [("network", None), ("compute", "prod"), ("local", None)]
+        assert self.plugin._query.call_count == 3
+        assert self.plugin._query.call_args_list[1][1]["workspace"] == "prod"
+        assert self.plugin._query.call_args_list[1][1]["concurrency"] == 2
+        self.plugin.warn.assert_not_called()
+
+    def test_failure_is_a_warning(self):
+        def query(*args, **kwargs):
+            if kwargs["workspace"] == "prod":
+                raise TerraformError("access denied")
+            return [args[1]]
+
+        assert self.query_backends(query) == ["s3", "local"]
+        self.plugin.warn.assert_called_once_with(
+            "Failed to pull the state from backend #1 (s3, workspace prod): access denied"
+        )
+
+    def test_all_failures(self):
+        with pytest.raises(TerraformError, match="any of the 3 backends"):
+            self.query_backends(TerraformError("access denied"))
+        assert self.plugin.warn.call_count == 3
+
+    def test_single_backend_failure_raises(self):
+        self.backends = self.backends[:1]
+        with pytest.raises(TerraformError, match="access denied"):
+            self.query_backends(TerraformError("access denied"))
+        self.plugin.warn.assert_not_called()
+
+    def test_native_backends_without_binary(self, inventory_plugin, mocker):
+        config = {"backend_type": "local", "backend_config": {"path": "terraform.tfstate"}}
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.InventoryModule._read_config_data",
+            side_effect=lambda _: config,
+        )
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformInventoryPluginBase.parse"
+        )
+        process_patch = mocker.patch("ansible_collections.cloud.terraform.plugins.inventory.terraform_state.process")
+        inventory_plugin._query = MagicMock(return_value=[])
+        inventory_plugin.create_inventory = MagicMock()
+
+        inventory_plugin.parse(MagicMock(), MagicMock(), "inventory_terraform_state.yml")
+
+        process_patch.get_bin_path.assert_not_called()
+        assert inventory_plugin._query.call_args[0][0] is None
+
+        # the workspaces are listed with terraform
+        config["workspaces"] = ["prod-*"]
+        inventory_plugin.parse(MagicMock(), MagicMock(), "inventory_terraform_state.yml")
+
+        process_patch.get_bin_path.assert_called_once_with("terraform")
+        assert inventory_plugin._query.call_args[1]["workspaces"] == ["prod-*"]
+
+
+class TestInventoryModuleParseCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, inventory_plugin, mocker, terraform_state_resource_instance):
+        config = {"backend_type": "s3", "backend_config": {"bucket": "my-bucket"}, "binary_path": "/bin/terraform"}
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.InventoryModule._read_config_data",
+            side_effect=lambda _: config,
+        )
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformInventoryPluginBase.parse"
+        )
+        mocker.patch("ansible_collections.cloud.terraform.plugins.inventory.terraform_state.validate_bin_path")
+        self.resources = [
+            TerraformStateResource(
+                name="test",
+                mode="managed",
+                module="",
+                type="aws_instance",
+                provider='provider["registry.terraform.io/hashicorp/aws"]',
+                instances=[terraform_state_resource_instance],
+            )
+        ]
+
+        def query(*args, **kwargs):
+            inventory_plugin._pulled_states.append(dict(lineage="4a6b1c5e", serial=3))
+            return self.resources
+
+        inventory_plugin._query = MagicMock(side_effect=query)
+        inventory_plugin.create_inventory = MagicMock()
+        inventory_plugin._options = {"cache": True}
+        inventory_plugin._cache = {}
+        self.plugin = inventory_plugin
+        self.cache_key = inventory_plugin.get_cache_key("/inventory/terraform_state.yml")
+
+    def parse(self, cache):
+        self.plugin.parse(MagicMock(), MagicMock(), "/inventory/terraform_state.yml", cache=cache)
+
+    def test_cache_miss(self):
+        self.parse(cache=True)
+
+        self.plugin._query.assert_called_once()
+        assert self.plugin._cache[self.cache_key]["states"] == [dict(lineage="4a6b1c5e", serial=3)]
+        assert len(self.plugin._cache[self.cache_key]["resources"]) == 1
+        assert self.plugin.create_inventory.call_args[0][0] == self.resources
+
+    def test_cache_hit(self):
+        self.parse(cache=True)
+        self.parse(cache=True)
+
+        self.plugin._query.assert_called_once()
+        assert self.plugin.create_inventory.call_count == 2
+        assert self.plugin.create_inventory.call_args[0][0] == self.resources
+
+    def test_cache_refresh(self):
+        self.parse(cache=True)
+        self.plugin._cache[self.cache_key]["states"] = []
+        self.parse(cache=False)
+
+        assert self.plugin._query.call_count == 2
+        assert self.plugin._cache[self.cache_key]["states"] == [dict(lineage="4a6b1c5e", serial=3)]
+
+    def test_cache_disabled(self):
+        self.plugin._options = {"cache": False}
+        self.parse(cache=True)
+        self.parse(cache=True)
+
+        assert self.plugin._query.call_count == 2
+        assert self.plugin._cache == {}
+
+
+class TestInventoryModuleParseCacheNativeState:
+    @pytest.fixture(autouse=True)
+    def setup(self, inventory_plugin, mocker, tmp_path):
+        self.state_path = tmp_path / "terraform.tfstate"
+        self.write_state(3, "i-01")
+        config = {"backend_type": "local", "backend_config": {"path": str(self.state_path)}}
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.InventoryModule._read_config_data",
+            side_effect=lambda _: config,
+        )
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformInventoryPluginBase.parse"
+        )
+        mocker.spy(inventory_plugin, "_query")
+        inventory_plugin.create_inventory = MagicMock()
+        inventory_plugin._options = {"cache": True}
+        inventory_plugin._cache = {}
+        self.plugin = inventory_plugin
+
+    def write_state(self, serial, instance_id):
+        resource = {
+            "mode": "managed",
+            "type": "aws_instance",
+            "name": "test",
+            "provider": 'provider["registry.terraform.io/hashicorp/aws"]',
+            "instances": [{"schema_version": 1, "attributes": {"id": instance_id}, "dependencies": []}],
+        }
+        state = {
+            "version": 4,
+            "terraform_version": "1.5.7",
+            "serial": serial,
+            "lineage": "4a6b1c5e",
+            "outputs": {},
+            "resources": [resource],
+        }
+        self.state_path.write_text(json.dumps(state, indent=2))
+
+    def parse(self):
+        self.plugin.parse(MagicMock(), MagicMock(), "/inventory/terraform_state.yml", cache=True)
+        resources = self.plugin.create_inventory.call_args[0][0]
+        return [instance.attributes["id"] for resource in resources for instance in resource.instances]
+
+    def test_cache_hit(self):
+        assert self.parse() == ["i-01"]
+        # rewritten with the same lineage and serial, the file is only checked from its head
+        self.write_state(3, "i-01")
+        assert self.parse() == ["i-01"]
+
+        self.plugin._query.assert_called_once()
+
+    def test_state_changed(self):
+        assert self.parse() == ["i-01"]
+        self.write_state(4, "i-02")
+        assert self.parse() == ["i-02"]
+        assert self.parse() == ["i-02"]
+
+        assert self.plugin._query.call_count == 2
+
+    def test_cache_without_native_states(self):
+        self.parse()
+        del self.plugin._cache[self.plugin.get_cache_key("/inventory/terraform_state.yml")]["native_states"]
+        self.parse()
+
+        assert self.plugin._query.call_count == 2
+
+
+class TestInventoryModuleParseChangeGroups:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker, tmp_path):
+        self.config = {
+            "backend_type": "s3",
+            "backend_config": {"bucket": "my-bucket"},
+            "binary_path": "/bin/terraform",
+            "hostnames": ["id"],
+            "change_groups": True,
+            "cache_dir": str(tmp_path),
+        }
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.InventoryModule._read_config_data",
+            side_effect=lambda _: self.config,
+        )
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.inventory.terraform_state.TerraformInventoryPluginBase.parse"
+        )
+        mocker.patch("ansible_collections.cloud.terraform.plugins.inventory.terraform_state.validate_bin_path")
+
+    def parse(self, serial, amis):
+        plugin = InventoryModule()
+        plugin.inventory = InventoryData()
+        plugin.templar = Templar(loader=None)
+        plugin._options = {}
+        resources = [
+            TerraformStateResource(
+                name="test",
+                mode="managed",
+                module="",
+                type="aws_instance",
+                provider='provider["registry.terraform.io/hashicorp/aws"]',
+                instances=[
+                    TerraformStateResourceInstance(
+                        schema_version=1,
+                        sensitive_attributes=[],
+                        private="",
+                        dependencies=[],
+                        attributes={"id": id, "ami": ami},
+                    )
+                    for id, ami in amis.items()
+                ],
+            )
+        ]
+
+        def query(*args, **kwargs):
+            plugin._pulled_states.append(dict(lineage="4a6b1c5e", serial=serial))
+            return resources
+
+        plugin._query = MagicMock(side_effect=query)
+        plugin.parse(MagicMock(), MagicMock(), "/inventory/terraform_state.yml", cache=False)
+        return {
+            group: sorted(h.name for h in plugin.inventory.groups[group].get_hosts())
+            for group in ("tf_added", "tf_changed", "tf_unchanged")
+            if group in plugin.inventory.groups
+        }
+
+    def test_change_groups(self):
+        assert self.parse(1, {"i-01": "ami-01", "i-02": "ami-01"}) == {"tf_added": ["i-01", "i-02"]}
+
+        changed = {"i-01": "ami-02", "i-02": "ami-01", "i-03": "ami-01"}
+        expected = {"tf_added": ["i-03"], "tf_changed": ["i-01"], "tf_unchanged": ["i-02"]}
+        assert self.parse(2, changed) == expected
+        # reading the inventory again keeps the groups until the state changes
+        assert self.parse(2, changed) == expected
+
+        assert self.parse(3, changed) == {"tf_unchanged": ["i-01", "i-02", "i-03"]}
+
+    def test_change_groups_disabled(self, tmp_path):
+        self.config["change_groups"] = False
+
+        assert self.parse(1, {"i-01": "ami-01"}) == {}
+        assert not (tmp_path / "inventory_hosts").exists()
@@ -0,0 +1,507 @@
+import os
+
+import pytest
+from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.cache import (
+    ProviderSchemaCache,
+    ValidationCache,
+    VersionCache,
+    apply_fingerprint,
+    directory_lock,
+    evict_to_size,
+    extract_hcl_blocks,
+    get_cache_dir,
+    get_data_dir,
+    get_plugin_cache_dir,
+    init_fingerprint,
+    plugin_cache_populated,
+    read_apply_fingerprint,
+    read_init_fingerprint,
+    write_apply_fingerprint,
+    write_init_fingerprint,
+)
+
+
+def create_project(path, lock_content="lock", binaries=None):
+    path.mkdir()
+    if lock_content is not None:
+        (path / ".terraform.lock.hcl").write_text(lock_content)
+    for name, content in (binaries or {}).items():
+        binary = path / ".terraform" / "providers" / name
+        binary.parent.mkdir(parents=True, exist_ok=True)
+        binary.write_text(content)
+    return str(path)
+
+
+@pytest.fixture
+def provider_schemas():
+    return {
+        "format_version": "1.0",
+        "provider_schemas": {
+            "registry.terraform.io/hashicorp/local": {
+                "provider": {"version": 0, "block": {"description_kind": "plain"}},
+                "resource_schemas": {
+                    "local_file": {
+                        "version": 0,
+                        "block": {
+                            "attributes": {
+                                "content": {"type": "string", "description_kind": "plain", "sensitive": True},
+                            },
+                            "block_types": {
+                                "timeouts": {
+                                    "nesting_mode": "single",
+                                    "block": {
+                                        "attributes": {"create": {"type": "string", "description_kind": "plain"}},
+                                        "description_kind": "plain",
+                                    },
+                                },
+                            },
+                            "description_kind": "plain",
+                        },
+                    },
+                },
+                "data_source_schemas": {"local_file": {"version": 0, "block": {}}},
+            },
+        },
+    }
+
+
+class TestGetCacheDir:
+    def test_explicit(self, monkeypatch):
+        monkeypatch.setenv("ANSIBLE_TERRAFORM_CACHE_DIR", "/from/env")
+        assert get_cache_dir("/explicit") == "/explicit"
+
+    def test_env(self, monkeypatch):
+        monkeypatch.setenv("ANSIBLE_TERRAFORM_CACHE_DIR", "/from/env")
+        assert get_cache_dir() == "/from/env"
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("ANSIBLE_TERRAFORM_CACHE_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", "/xdg")
+        assert get_cache_dir() == "/xdg/ansible/cloud.terraform"
+
+
+class TestGetDataDir:
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("TF_DATA_DIR", raising=False)
+        assert get_data_dir("/project") == "/project/.terraform"
+
+    @pytest.mark.parametrize("data_dir, expected", [("custom", "/project/custom"), ("/absolute", "/absolute")])
+    def test_tf_data_dir(self, monkeypatch, data_dir, expected):
+        monkeypatch.setenv("TF_DATA_DIR", data_dir)
+        assert get_data_dir("/project") == expected
+
+
+class TestGetPluginCacheDir:
+    def test_enabled(self, monkeypatch):
+        monkeypatch.setenv("TF_PLUGIN_CACHE_DIR", "/from/env")
+        assert get_plugin_cache_dir(True, "/cache") == "/cache/plugins"
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.delenv("TF_PLUGIN_CACHE_DIR", raising=False)
+        assert get_plugin_cache_dir(False, "/cache") is None
+
+    def test_disabled_with_tf_plugin_cache_dir(self, monkeypatch):
+        monkeypatch.setenv("TF_PLUGIN_CACHE_DIR", "/from/env")
+        assert get_plugin_cache_dir(False, "/cache") == "/from/env"
+
+
+class TestDirectoryLock:
+    def test_lock(self, tmp_path):
+        directory = tmp_path / "plugins"
+        with directory_lock(str(directory)) as locked:
+            assert locked
+            assert (directory / ".lock").is_file()
+        # the lock is released
+        with directory_lock(str(directory)) as locked:
+            assert locked
+
+    def test_non_blocking(self, tmp_path):
+        with directory_lock(str(tmp_path)):
+            pid = os.fork()
+            if pid == 0:
+                with directory_lock(str(tmp_path), blocking=False) as locked:
+                    os._exit(0 if not locked else 1)
+            assert os.waitpid(pid, 0)[1] == 0
+
+    def test_shared(self, tmp_path):
+        with directory_lock(str(tmp_path), shared=True):
+            pid = os.fork()
+            if pid == 0:
+                with directory_lock(str(tmp_path), blocking=False, shared=True) as shared_locked:
+                    pass
+                with directory_lock(str(tmp_path), blocking=False) as locked:
+                    os._exit(0 if shared_locked and not locked else 1)
+            assert os.waitpid(pid, 0)[1] == 0
+
+
+class TestPluginCachePopulated:
+    LOCK_FILE = """
+provider "registry.terraform.io/hashicorp/local" {
+  version     = "2.4.0"
+  constraints = "~> 2.4"
+  hashes = [
+    "h1:abc=",
+  ]
+}
+
+provider "registry.terraform.io/hashicorp/null" {
+  version = "3.2.1"
+}
+"""
+
+    def test_populated(self, tmp_path):
+        (tmp_path / ".terraform.lock.hcl").write_text(self.LOCK_FILE)
+        plugins = tmp_path / "plugins"
+        for provider in ("hashicorp/local/2.4.0", "hashicorp/null/3.2.1"):
+            (plugins / "registry.terraform.io" / provider / "linux_amd64").mkdir(parents=True)
+        assert plugin_cache_populated(str(tmp_path), str(plugins))
+
+    def test_missing_provider(self, tmp_path):
+        (tmp_path / ".terraform.lock.hcl").write_text(self.LOCK_FILE)
+        plugins = tmp_path / "plugins"
+        (plugins / "registry.terraform.io/hashicorp/local/2.4.0/linux_amd64").mkdir(parents=True)
+        (plugins / "registry.terraform.io/hashicorp/null/3.2.0/linux_amd64").mkdir(parents=True)
+        assert not plugin_cache_populated(str(tmp_path), str(plugins))
+
+    def test_without_lock_file(self, tmp_path):
+        assert not plugin_cache_populated(str(tmp_path), str(tmp_path / "plugins"))
+
+
+class TestProviderSchemaCache:
+    def test_key_shared_between_projects(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        binaries = {"registry.terraform.io/hashicorp/local/2.4.0/linux_amd64/terraform-provider-local": "bin"}
+        first = create_project(tmp_path / "first", binaries=binaries)
+        second = create_project(tmp_path / "second", binaries=binaries)
+        assert cache.key(first) is not None
+        assert cache.key(first) == cache.key(second)
+
+    def test_key_changes_with_lock_file(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        first = create_project(tmp_path / "first", lock_content="v1")
+        second = create_project(tmp_path / "second", lock_content="v2")
+        assert cache.key(first) != cache.key(second)
+
+    def test_key_changes_with_binaries(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        first = create_project(tmp_path / "first", binaries={"hashicorp/local/2.4.0/terraform-provider-local": "a"})
+        second = create_project(tmp_path / "second", binaries={"hashicorp/local/2.5.0/terraform-provider-local": "a"})
+        assert cache.key(first) != cache.key(second)
+
+    def test_key_changes_with_terraform_version(self, tmp_path):
+        project = create_project(tmp_path / "project")
+        first = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        second = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.6.0"), 1024)
+        assert first.key(project) != second.key(project)
+
+    def test_key_without_providers(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        assert cache.key(create_project(tmp_path / "project", lock_content=None)) is None
+
+    def test_get_missing(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        assert cache.get("missing") is None
+
+    def test_set_and_get(self, tmp_path, provider_schemas):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024 * 1024)
+        cache.set("key", provider_schemas)
+        assert cache.get("key") == {
+            "format_version": "1.0",
+            "provider_schemas": {
+                "registry.terraform.io/hashicorp/local": {
+                    "resource_schemas": {
+                        "local_file": {
+                            "version": 0,
+                            "block": {
+                                "attributes": {
+                                    "content": {"type": "string", "description_kind": "plain", "sensitive": True},
+                                },
+                                "block_types": {
+                                    "timeouts": {
+                                        "block": {
+                                            "attributes": {
+                                                "create": {"type": "string", "description_kind": "plain"},
+                                            },
+                                        },
+                                    },
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        }
+
+    def test_get_corrupted(self, tmp_path):
+        cache = ProviderSchemaCache(str(tmp_path / "cache"), LooseVersion("1.5.7"), 1024)
+        os.makedirs(cache.directory)
+        (tmp_path / "cache" / "provider_schemas" / "key.json.gz").write_text("not gzip")
+        assert cache.get("key") is None
+
+
+class TestEvictToSize:
+    def test_evict_least_recently_used(self, tmp_path):
+        for index, name in enumerate(["old", "middle", "new"]):
+            entry = tmp_path / name
+            entry.write_text("x" * 10)
+            os.utime(entry, (index, index))
+        evict_to_size(str(tmp_path), 20)
+        assert sorted(os.listdir(tmp_path)) == ["middle", "new"]
+
+    def test_nothing_to_evict(self, tmp_path):
+        (tmp_path / "entry").write_text("x" * 10)
+        evict_to_size(str(tmp_path), 10)
+        assert os.listdir(tmp_path) == ["entry"]
+
+
+class TestVersionCache:
+    def create_binary(self, path, content="#!/bin/sh\n"):
+        path.write_text(content)
+        path.chmod(0o755)
+        return str(path)
+
+    def test_key_missing_binary(self, tmp_path):
+        assert VersionCache(str(tmp_path / "cache")).key(str(tmp_path / "terraform")) is None
+
+    def test_key_follows_symlinks(self, tmp_path):
+        binary = self.create_binary(tmp_path / "terraform")
+        link = tmp_path / "link"
+        link.symlink_to(binary)
+        cache = VersionCache(str(tmp_path / "cache"))
+        assert cache.key(binary) == cache.key(str(link))
+
+    def test_key_changes_when_binary_is_replaced(self, tmp_path):
+        binary = self.create_binary(tmp_path / "terraform")
+        cache = VersionCache(str(tmp_path / "cache"))
+        key = cache.key(binary)
+        self.create_binary(tmp_path / "terraform", "#!/bin/sh\necho upgraded\n")
+        assert cache.key(binary) != key
+
+    def test_set_and_get(self, tmp_path):
+        cache = VersionCache(str(tmp_path / "cache"))
+        assert cache.get("key") is None
+        cache.set("key", "1.5.7")
+        assert cache.get("key") == "1.5.7"
+
+
+class TestValidationCache:
+    @pytest.fixture
+    def project(self, tmp_path):
+        project = tmp_path / "project"
+        (project / "modules" / "network").mkdir(parents=True)
+        (project / "main.tf").write_text('resource "null_resource" "foo" {}')
+        (project / "modules" / "network" / "main.tf.json").write_text("{}")
+        (project / "terraform.tfvars").write_text('name = "foo"')
+        (project / "README.md").write_text("readme")
+        (project / ".terraform").mkdir()
+        (project / ".terraform" / "terraform.tfstate").write_text("{}")
+        return project
+
+    def key(self, tmp_path, project, version="1.5.7", variables_args=None):
+        cache = ValidationCache(str(tmp_path / "cache"))
+        return cache.key(str(project), LooseVersion(version), variables_args or [])
+
+    def test_key_is_stable(self, tmp_path, project):
+        assert self.key(tmp_path, project) == self.key(tmp_path, project)
+
+    @pytest.mark.parametrize(
+        "path", ["main.tf", "modules/network/main.tf.json", "terraform.tfvars", "modules/network/new.tf"]
+    )
+    def test_key_changes_with_configuration(self, tmp_path, project, path):
+        key = self.key(tmp_path, project)
+        (project / path).write_text("changed")
+        assert self.key(tmp_path, project) != key
+
+    @pytest.mark.parametrize("path", ["README.md", ".terraform/terraform.tfstate", ".terraform/new.tf"])
+    def test_key_ignores_other_files(self, tmp_path, project, path):
+        key = self.key(tmp_path, project)
+        (project / path).write_text("changed")
+        assert self.key(tmp_path, project) == key
+
+    def test_key_changes_with_terraform_version(self, tmp_path, project):
+        assert self.key(tmp_path, project, version="1.5.7") != self.key(tmp_path, project, version="1.6.0")
+
+    def test_key_changes_with_variables(self, tmp_path, project):
+        assert self.key(tmp_path, project, variables_args=["-var", "name=foo"]) != self.key(
+            tmp_path, project, variables_args=["-var", "name=bar"]
+        )
+
+    def test_key_changes_with_variables_file_content(self, tmp_path, project):
+        variables_file = tmp_path / "vars.json"
+        variables_file.write_text('{"name": "foo"}')
+        variables_args = ["-var-file", str(variables_file)]
+        key = self.key(tmp_path, project, variables_args=variables_args)
+        variables_file.write_text('{"name": "bar"}')
+        assert self.key(tmp_path, project, variables_args=variables_args) != key
+
+    def test_has_and_add(self, tmp_path):
+        cache = ValidationCache(str(tmp_path / "cache"))
+        assert not cache.has("key")
+        cache.add("key")
+        assert cache.has("key")
+
+
+MAIN_TF = """# the main configuration
+terraform {
+  backend "s3" {
+    bucket = "my-bucket"
+  }
+}
+
+resource "null_resource" "foo" {
+  triggers = {
+    value = "{ not a block"
+    script = <<-EOT
+      if true; then { echo; }
+    EOT
+  }
+}
+
+/* module "commented" { source = "./nowhere" } */
+module "network" {
+  source  = "terraform-aws-modules/vpc/aws" // registry module
+  version = "5.0.0"
+}
+"""
+
+
+class TestExtractHclBlocks:
+    def test_extract_blocks(self):
+        assert extract_hcl_blocks(MAIN_TF, ("module", "terraform")) == [
+            'terraform {\n  backend "s3" {\n    bucket = "my-bucket"\n  }\n}',
+            'module "network" {\n  source  = "terraform-aws-modules/vpc/aws" // registry module\n  version = "5.0.0"\n}',
+        ]
+
+    def test_no_matching_block(self):
+        assert extract_hcl_blocks(MAIN_TF, ("provider",)) == []
+
+
+class TestInitFingerprint:
+    @pytest.fixture
+    def project(self, tmp_path):
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "main.tf").write_text(MAIN_TF)
+        (project / "backend.hcl").write_text('key = "state"')
+        (project / ".terraform.lock.hcl").write_text("lock")
+        return project
+
+    def fingerprint(self, project, **kwargs):
+        args = dict(
+            project_path=str(project),
+            terraform_version=LooseVersion("1.5.7"),
+            backend_config={"region": "us-east-1"},
+            backend_config_files=["backend.hcl"],
+            reconfigure=False,
+            plugin_paths=[],
+        )
+        args.update(kwargs)
+        return init_fingerprint(**args)
+
+    def test_fingerprint_is_stable(self, project):
+        assert self.fingerprint(project) == self.fingerprint(project)
+
+    def test_resources_changes_are_ignored(self, project):
+        fingerprint = self.fingerprint(project)
+        (project / "main.tf").write_text(MAIN_TF.replace("null_resource", "other_resource"))
+        (project / "outputs.tf").write_text('output "foo" { value = 1 }')
+        assert self.fingerprint(project) == fingerprint
+
+    @pytest.mark.parametrize(
+        "path, content",
+        [
+            ("main.tf", MAIN_TF.replace("5.0.0", "5.1.0")),
+            ("main.tf", MAIN_TF.replace("my-bucket", "other-bucket")),
+            ("modules.tf.json", '{"module": {"db": {"source": "./db"}}}'),
+            ("backend.hcl", 'key = "other"'),
+            (".terraform.lock.hcl", "upgraded"),
+        ],
+    )
+    def test_configuration_changes(self, project, path, content):
+        fingerprint = self.fingerprint(project)
+        (project / path).write_text(content)
+        assert self.fingerprint(project) != fingerprint
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            dict(backend_config={"region": "eu-west-1"}),
+            dict(backend_config_files=[]),
+            dict(reconfigure=True),
+            dict(plugin_paths=["/plugins"]),
+            dict(terraform_version=LooseVersion("1.6.0")),
+        ],
+    )
+    def test_arguments_changes(self, project, kwargs):
+        assert self.fingerprint(project) != self.fingerprint(project, **kwargs)
+
+    def test_read_and_write(self, project, monkeypatch):
+        monkeypatch.delenv("TF_DATA_DIR", raising=False)
+        assert read_init_fingerprint(str(project)) is None
+        write_init_fingerprint(str(project), "fingerprint")
+        assert (project / ".terraform" / "ansible_init_fingerprint").read_text() == "fingerprint"
+        assert read_init_fingerprint(str(project)) == "fingerprint"
+
+
+class TestApplyFingerprint:
+    @pytest.fixture
+    def project(self, tmp_path):
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "main.tf").write_text(MAIN_TF)
+        (project / "prod.tfvars").write_text('size = "large"')
+        (project / ".terraform.lock.hcl").write_text("lock")
+        return project
+
+    def fingerprint(self, project, **kwargs):
+        args = dict(
+            project_path=str(project),
+            terraform_version=LooseVersion("1.5.7"),
+            workspace="default",
+            variables_args=["-var", "a=b", "-var-file", "prod.tfvars"],
+            variables_files=["prod.tfvars"],
+            state_lineage="4a6b1c5e",
+            state_serial=3,
+            options=dict(state="present", targets=[]),
+        )
+        args.update(kwargs)
+        return apply_fingerprint(**args)
+
+    def test_fingerprint_is_stable(self, project):
+        assert self.fingerprint(project) == self.fingerprint(project)
+
+    @pytest.mark.parametrize(
+        "path, content",
+        [
+            ("main.tf", MAIN_TF.replace("null_resource", "other_resource")),
+            ("outputs.tf", 'output "foo" { value = 1 }'),
+            ("prod.tfvars", 'size = "small"'),
+            (".terraform.lock.hcl", "upgraded"),
+        ],
+    )
+    def test_configuration_changes(self, project, path, content):
+        fingerprint = self.fingerprint(project)
+        (project / path).write_text(content)
+        assert self.fingerprint(project) != fingerprint
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            dict(terraform_version=LooseVersion("1.6.0")),
+            dict(workspace="prod"),
+            dict(variables_args=["-var", "a=c"]),
+            dict(state_lineage="9f8e7d6c"),
+            dict(state_serial=4),
+            dict(options=dict(state="absent", targets=[])),
+        ],
+    )
+    def test_arguments_changes(self, project, kwargs):
+        assert self.fingerprint(project) != self.fingerprint(project, **kwargs)
+
+    def test_read_and_write(self, project, monkeypatch):
+        monkeypatch.delenv("TF_DATA_DIR", raising=False)
+        assert read_apply_fingerprint(str(project)) is None
+        write_apply_fingerprint(str(project), "fingerprint")
+        assert (project / ".terraform" / "ansible_apply_fingerprint").read_text() == "fingerprint"
+        assert read_apply_fingerprint(str(project)) == "fingerprint"
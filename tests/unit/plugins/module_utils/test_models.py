@@ -1,4 +1,10 @@
-from ansible_collections.cloud.terraform.plugins.module_utils.models import TerraformModuleResource
+import json
+
+from ansible_collections.cloud.terraform.plugins.module_utils.models import (
+    TerraformModuleResource,
+    TerraformPlanSummary,
+    TerraformProviderSchemaCollection,
+)
 
 
 class TestTerraformModuleResource:
@@ -74,3 +80,109 @@ class TestTerraformModuleResource:
         assert {} == tfm.values
         assert {} == tfm.sensitive_values
         assert [] == tfm.depends_on
+
+
+class TestTerraformProviderSchemaCollection:
+    def test_sensitive_attributes(self):
+        def resource_schema(sensitive_attributes):
+            return {
+                "version": 0,
+                "block": {
+                    "attributes": {
+                        name: {"type": "string", "description_kind": "plain", "sensitive": name in sensitive_attributes}
+                        for name in ["id", "password", "token"]
+                    },
+                    "block_types": {
+                        "credentials": {
+                            "block": {
+                                "attributes": {
+                                    "secret": {"type": "string", "description_kind": "plain", "sensitive": True},
+                                },
+                            },
+                        },
+                    },
+                },
+            }
+
+        schemas = TerraformProviderSchemaCollection.from_json(
+            {
+                "format_version": "1.0",
+                "provider_schemas": {
+                    "registry.terraform.io/hashicorp/first": {
+                        "resource_schemas": {"shared_resource": resource_schema(["password"])},
+                    },
+                    "registry.terraform.io/hashicorp/second": {
+                        "resource_schemas": {
+                            "shared_resource": resource_schema(["token"]),
+                            "other_resource": resource_schema(["password", "token"]),
+                        },
+                    },
+                },
+            }
+        )
+
+        # the first provider defining a resource type wins
+        assert schemas.sensitive_attributes("shared_resource") == {"password", "credentials"}
+        assert schemas.sensitive_attributes("other_resource") == {"password", "token", "credentials"}
+        assert schemas.sensitive_attributes("unknown_resource") == frozenset()
+
+
+class TestTerraformPlanSummary:
+    def test_from_json_lines(self):
+        events = [
+            {"@level": "info", "@message": "Terraform 1.5.7", "type": "version", "terraform": "1.5.7"},
+            {
+                "@level": "info",
+                "@message": "aws_instance.web: Plan to replace",
+                "type": "planned_change",
+                "change": {"resource": {"addr": "aws_instance.web"}, "action": "replace"},
+            },
+            {
+                "@level": "info",
+                "@message": "aws_s3_bucket.logs: Plan to delete",
+                "type": "planned_change",
+                "change": {"resource": {"addr": "aws_s3_bucket.logs"}, "action": "delete"},
+            },
+            {
+                "@level": "info",
+                "@message": "aws_s3_bucket.data: Plan to create",
+                "type": "planned_change",
+                "change": {"resource": {"addr": "aws_s3_bucket.data"}, "action": "create"},
+            },
+            {
+                "@level": "info",
+                "@message": "Plan: 2 to add, 0 to change, 2 to destroy.",
+                "type": "change_summary",
+                "changes": {"add": 2, "change": 0, "import": 0, "remove": 2, "operation": "plan"},
+            },
+        ]
+        lines = [json.dumps(event) + "\n" for event in events] + ["not json\n"]
+        assert TerraformPlanSummary.from_json_lines(lines) == TerraformPlanSummary(
+            to_add=2,
+            to_change=0,
+            to_destroy=2,
+            to_replace=1,
+            to_import=0,
+            destroyed_addresses=["aws_s3_bucket.logs"],
+            replaced_addresses=["aws_instance.web"],
+            message="Plan: 2 to add, 0 to change, 2 to destroy.",
+            errors=[],
+        )
+
+    def test_from_json_lines_without_address(self):
+        event = {"type": "planned_change", "change": {"resource": {}, "action": "replace"}}
+        summary = TerraformPlanSummary.from_json_lines([json.dumps(event)])
+        assert summary.destroyed_addresses == []
+        assert summary.replaced_addresses == []
+        assert summary.to_replace == 1
+
+    def test_from_json_lines_with_errors(self):
+        event = {
+            "@level": "error",
+            "@message": "Error: Unsupported argument",
+            "type": "diagnostic",
+            "diagnostic": {"severity": "error", "summary": "Unsupported argument", "detail": "foo is not expected"},
+        }
+        summary = TerraformPlanSummary.from_json_lines([json.dumps(event)])
+        assert summary.errors == ["Unsupported argument: foo is not expected"]
+        assert summary.to_add == 0
@@ -1,3 +1,6 @@
+import os
+import stat
+import subprocess
 from unittest.mock import MagicMock
 
 import pytest
@@ -8,9 +11,17 @@ from ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands
     TerraformWarning,
     WorkspaceCommand,
     _capture_error_message,
+    _read_excerpt,
 )
 
 
+def run_command(args, cwd=None, check_rc=False, use_unsafe_shell=False, environ_update=None):
+    """Run a command like AnsibleModule.run_command does."""
+    env = dict(os.environ, **(environ_update or {}))
+    proc = subprocess.run(args, cwd=cwd, env=env, shell=use_unsafe_shell, capture_output=True, text=True)
+    return proc.returncode, proc.stdout, proc.stderr
+
+
 class TestTerraformCommands:
     def setup_method(self):
         self.mock = MagicMock()
@@ -41,6 +52,72 @@ class TestTerraformCommands:
             environ_update={"TF_WORKSPACE": self.tf.tfworkspace},
         )
 
+    def test_run_logged_without_log_dir(self):
+        self.mock.return_value = (0, "out", "err")
+        assert self.tf._run_logged("plan", "-no-color") == (0, "out", "err")
+        self.mock.assert_called_once_with(["/binary/path", "plan", "-no-color"], cwd="/project/path", check_rc=False)
+        assert self.tf.output_logs == {}
+
+    def test_run_logged(self, tmp_path, monkeypatch):
+        binary = tmp_path / "terraform"
+        binary.write_text(
+            "#!/bin/sh\n"
+            'for i in $(seq 1 10); do echo "$TF_WORKSPACE line $i"; done\n'
+            'echo "warning" >&2\n'
+            "exit 2\n"
+        )
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        log_dir = tmp_path / "logs"
+        log_dir.mkdir()
+        tf = TerraformCommands(
+            self.mock, str(tmp_path), str(binary), False, "foo", output_log_dir=str(log_dir), output_excerpt_lines=2
+        )
+
+        self.mock.side_effect = run_command
+        rc, stdout, stderr = tf._run_logged("plan", "-no-color")
+
+        # the command goes through the module runner, with its outputs redirected to the log files
+        command = self.mock.call_args[0][0]
+        assert command.startswith("{0} plan -no-color < /dev/null > ".format(binary))
+        assert self.mock.call_args[1] == dict(
+            cwd=str(tmp_path), check_rc=False, use_unsafe_shell=True, environ_update={"TF_WORKSPACE": "foo"}
+        )
+        assert rc == 2
+        assert sorted(tf.output_logs) == ["plan"]
+        stdout_log = tf.output_logs["plan"]["stdout"]
+        assert os.path.dirname(stdout_log) == str(log_dir)
+        assert os.path.basename(stdout_log).startswith("terraform-plan-")
+        expected = "foo line 1\nfoo line 2\n\n... 6 lines omitted, see {0} ...\n\nfoo line 9\nfoo line 10\n"
+        assert stdout == expected.format(stdout_log)
+        assert stderr == "warning\n"
+        with open(stdout_log) as f:
+            assert len(f.readlines()) == 10
+
+    def test_run_logged_failure(self, tmp_path):
+        tf = TerraformCommands(
+            self.mock, str(tmp_path), "/binary/path", False, output_log_dir=str(tmp_path / "missing")
+        )
+        with pytest.raises(TerraformError):
+            tf._run_logged("plan")
+
+    def test_run_logged_redirection_failure(self, tmp_path):
+        self.mock.return_value = (2, "", "sh: 1: cannot create terraform-plan.stdout.log: Permission denied")
+        tf = TerraformCommands(self.mock, str(tmp_path), "/binary/path", False, output_log_dir=str(tmp_path))
+        with pytest.raises(TerraformError, match="Permission denied"):
+            tf._run_logged("plan")
+
+    @pytest.mark.parametrize(
+        "lines, expected",
+        [
+            (5, "1\n2\n3\n4\n5\n"),
+            (2, "1\n2\n\n... 1 lines omitted, see {path} ...\n\n4\n5\n"),
+        ],
+    )
+    def test__read_excerpt(self, tmp_path, lines, expected):
+        log = tmp_path / "log"
+        log.write_text("1\n2\n3\n4\n5\n")
+        assert _read_excerpt(str(log), lines) == expected.format(path=log)
+
     def test_apply_plan(self):
         self.mock.return_value = (self.rc, self.stdout, self.stderr)
         self.tf._run = self.mock
@@ -98,6 +175,48 @@ class TestTerraformCommands:
 
         self.mock.assert_called_with(*expected_cmd, check_rc=False)
 
+    def test_init_with_plugin_cache_dir(self, tmp_path):
+        self.tf._run = self.mock
+        self.mock.return_value = (self.rc, self.stdout, self.stderr)
+        plugin_cache_dir = str(tmp_path / "plugins")
+        self.tf.init(plugin_cache_dir=plugin_cache_dir)
+
+        self.mock.assert_called_with(
+            "init",
+            "-input=false",
+            "-no-color",
+            check_rc=False,
+            environ_update={"TF_PLUGIN_CACHE_DIR": plugin_cache_dir},
+        )
+        assert os.path.isdir(plugin_cache_dir)
+
+    @pytest.mark.parametrize(
+        "populated,upgrade,shared", [(True, False, True), (False, False, False), (True, True, False)]
+    )
+    def test_init_plugin_cache_lock(self, mocker, populated, upgrade, shared):
+        self.tf._run = self.mock
+        self.mock.return_value = (self.rc, self.stdout, self.stderr)
+        mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands.plugin_cache_populated",
+            return_value=populated,
+        )
+        directory_lock = mocker.patch(
+            "ansible_collections.cloud.terraform.plugins.module_utils.terraform_commands.directory_lock"
+        )
+        self.tf.init(upgrade=upgrade, plugin_cache_dir="/plugins")
+
+        directory_lock.assert_called_once_with("/plugins", shared=shared)
+
+    def test_run_with_environ_update(self):
+        self.tf.tfworkspace = "foo"
+        self.tf._run("init", check_rc=False, environ_update={"TF_PLUGIN_CACHE_DIR": "/plugins"})
+        self.mock.assert_called_with(
+            ["/binary/path", "init"],
+            cwd="/project/path",
+            check_rc=False,
+            environ_update={"TF_PLUGIN_CACHE_DIR": "/plugins", "TF_WORKSPACE": "foo"},
+        )
+
     def test_init_failure(self):
         self.tf._run = self.mock
         rc = 1
@@ -157,6 +276,143 @@ class TestTerraformCommands:
 
         self.mock.assert_called_with(*expected_cmd, check_rc=False)
 
+    @pytest.mark.parametrize(
+        "refresh_mode, expected_refresh_args",
+        [
+            ("full", []),
+            ("skip", ["-refresh=false"]),
+            ("only", ["-refresh-only"]),
+        ],
+    )
+    def test_plan_with_options(self, refresh_mode, expected_refresh_args):
+        self.mock.return_value = (self.rc, self.stdout, self.stderr)
+        self.tf._run = self.mock
+        self.tf.plan(
+            target_plan_file_path="/target/plan/file",
+            targets=[],
+            destroy=False,
+            state_args=[],
+            variables_args=[],
+            parallelism=20,
+            lock=False,
+            lock_timeout=30,
+            refresh_mode=refresh_mode,
+        )
+
+        expected_cmd = [
+            "plan",
+            "-lock=false",
+            "-input=false",
+            "-no-color",
+            "-detailed-exitcode",
+            "-out",
+            "/target/plan/file",
+            "-lock-timeout=30s",
+            "-parallelism=20",
+        ] + expected_refresh_args
+
+        self.mock.assert_called_with(*expected_cmd, check_rc=False)
+
+    @pytest.mark.parametrize("log_dir", [False, True])
+    def test_plan_json(self, tmp_path, log_dir):
+        binary = tmp_path / "terraform"
+        binary.write_text(
+            "#!/bin/sh\n"
+            'echo \'{"type": "planned_change", "change": '
+            '{"resource": {"addr": "null_resource.foo"}, "action": "delete"}}\'\n'
+            'echo \'{"type": "change_summary", "@message": "Plan: 0 to add, 0 to change, 1 to destroy.", '
+            '"changes": {"add": 0, "change": 0, "import": 0, "remove": 1}}\'\n'
+            "exit 2\n"
+        )
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        logs = tmp_path / "logs"
+        logs.mkdir()
+        tf = TerraformCommands(
+            self.mock, str(tmp_path), str(binary), False, output_log_dir=str(logs) if log_dir else None
+        )
+        self.mock.side_effect = run_command
+
+        changed, any_destroyed, stdout, stderr = tf.plan(
+            target_plan_file_path="/target/plan/file",
+            targets=[],
+            destroy=False,
+            state_args=[],
+            variables_args=[],
+            json_output=True,
+        )
+
+        self.mock.assert_called_once()
+        assert changed is True
+        assert any_destroyed is True
+        assert stdout == "Plan: 0 to add, 0 to change, 1 to destroy."
+        assert tf.plan_summary.to_destroy == 1
+        assert tf.plan_summary.destroyed_addresses == ["null_resource.foo"]
+        assert sorted(tf.output_logs) == (["plan"] if log_dir else [])
+        assert len(os.listdir(logs)) == (2 if log_dir else 0)
+
+    def test_plan_json_replace_is_not_destroy(self, tmp_path):
+        binary = tmp_path / "terraform"
+        binary.write_text(
+            "#!/bin/sh\n"
+            'echo \'{"type": "planned_change", "change": '
+            '{"resource": {"addr": "null_resource.foo"}, "action": "replace"}}\'\n'
+            'echo \'{"type": "change_summary", "@message": "Plan: 1 to add, 0 to change, 1 to destroy.", '
+            '"changes": {"add": 1, "change": 0, "import": 0, "remove": 1}}\'\n'
+            "exit 2\n"
+        )
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        tf = TerraformCommands(run_command, str(tmp_path), str(binary), False)
+
+        changed, any_destroyed, _stdout, _stderr = tf.plan(
+            target_plan_file_path="/target/plan/file",
+            targets=[],
+            destroy=False,
+            state_args=[],
+            variables_args=[],
+            json_output=True,
+        )
+
+        # like the text output, check_destroy does not prevent destroy and re-create actions
+        assert changed is True
+        assert any_destroyed is False
+        assert tf.plan_summary.destroyed_addresses == []
+        assert tf.plan_summary.replaced_addresses == ["null_resource.foo"]
+
+    def test_plan_summary_after_apply(self, tmp_path):
+        binary = tmp_path / "terraform"
+        binary.write_text(
+            "#!/bin/sh\n"
+            'echo \'{"type": "change_summary", "@message": "Plan: 1 to add, 0 to change, 0 to destroy.", '
+            '"changes": {"add": 1, "change": 0, "import": 0, "remove": 0}}\'\n'
+            "exit 2\n"
+        )
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        self.mock.side_effect = lambda *args, **kwargs: (
+            run_command(*args, **kwargs) if kwargs.get("use_unsafe_shell") else (0, "Apply complete!", "")
+        )
+        tf = TerraformCommands(self.mock, str(tmp_path), str(binary), False)
+
+        tf.plan(
+            target_plan_file_path="/target/plan/file",
+            targets=[],
+            destroy=False,
+            state_args=[],
+            variables_args=[],
+            json_output=True,
+        )
+        tf.apply_plan(
+            plan_file_path="/target/plan/file",
+            version=LooseVersion("1.5.7"),
+            parallelism=None,
+            lock=True,
+            lock_timeout=None,
+            targets=[],
+            needs_application=True,
+        )
+
+        assert self.mock.call_count == 2
+        assert tf.plan_summary.to_add == 1
+
     def test_providers_schema(self):
         self.stdout = '{"format_version":"1.0"}'
         self.mock.return_value = (self.rc, self.stdout, self.stderr)
@@ -167,6 +423,32 @@ class TestTerraformCommands:
 
         self.mock.assert_called_with(*expected_cmd, check_rc=False)
 
+    def test_providers_schema_cached(self):
+        cache = MagicMock()
+        cache.key.return_value = "key"
+        cache.get.return_value = {"format_version": "1.0", "provider_schemas": {}}
+        self.tf._run = self.mock
+
+        result = self.tf.providers_schema(cache)
+
+        assert result.format_version == "1.0"
+        cache.key.assert_called_once_with("/project/path")
+        self.mock.assert_not_called()
+        cache.set.assert_not_called()
+
+    def test_providers_schema_not_cached(self):
+        cache = MagicMock()
+        cache.key.return_value = "key"
+        cache.get.return_value = None
+        self.stdout = '{"format_version":"1.0"}'
+        self.mock.return_value = (self.rc, self.stdout, self.stderr)
+        self.tf._run = self.mock
+
+        self.tf.providers_schema(cache)
+
+        self.mock.assert_called_with("providers", "schema", "-json", check_rc=False)
+        cache.set.assert_called_once_with("key", {"format_version": "1.0"})
+
     def test_show(self):
         self.stdout = '{"format_version":"1.0"}'
         self.mock.return_value = (self.rc, self.stdout, self.stderr)
@@ -200,6 +482,27 @@ class TestTerraformCommands:
         expected_cmd = ["version", "-json"]
         self.mock.assert_called_with(*expected_cmd, check_rc=True)
 
+    def test_version_cached(self):
+        cache = MagicMock()
+        cache.key.return_value = "key"
+        cache.get.return_value = "1.5.7"
+        self.tf._run = self.mock
+
+        assert self.tf.version(cache) == LooseVersion("1.5.7")
+        cache.key.assert_called_once_with("/binary/path")
+        self.mock.assert_not_called()
+
+    def test_version_not_cached(self):
+        cache = MagicMock()
+        cache.key.return_value = "key"
+        cache.get.return_value = None
+        self.mock.return_value = (self.rc, '{"terraform_version": "1.3.6"}', self.stderr)
+        self.tf._run = self.mock
+
+        assert self.tf.version(cache) == LooseVersion("1.3.6")
+        self.mock.assert_called_with("version", "-json", check_rc=True)
+        cache.set.assert_called_once_with("key", "1.3.6")
+
     @pytest.mark.parametrize(
         "test_workspace_cmd, expected_workspace_cmd_value",
         [(WorkspaceCommand.NEW, "new"), (WorkspaceCommand.SELECT, "select"), (WorkspaceCommand.DELETE, "delete")],
@@ -234,6 +537,36 @@ class TestTerraformCommands:
         expected_cmd = ["workspace", "show", "-no-color"]
         self.mock.assert_called_with(*expected_cmd, check_rc=False)
 
+    @pytest.mark.parametrize(
+        "environment, expected",
+        [(None, "default"), ("", "default"), ("staging\n", "staging")],
+    )
+    def test_workspace_selected(self, tmp_path, monkeypatch, environment, expected):
+        monkeypatch.delenv("TF_WORKSPACE", raising=False)
+        monkeypatch.delenv("TF_DATA_DIR", raising=False)
+        self.tf.project_path = str(tmp_path)
+        self.tf._run = self.mock
+        if environment is not None:
+            (tmp_path / ".terraform").mkdir()
+            (tmp_path / ".terraform" / "environment").write_text(environment)
+        assert self.tf.workspace_selected() == expected
+        self.mock.assert_not_called()
+
+    def test_workspace_selected_with_tf_data_dir(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("TF_WORKSPACE", raising=False)
+        monkeypatch.setenv("TF_DATA_DIR", "custom")
+        self.tf.project_path = str(tmp_path)
+        (tmp_path / "custom").mkdir()
+        (tmp_path / "custom" / "environment").write_text("production")
+        assert self.tf.workspace_selected() == "production"
+
+    def test_workspace_selected_with_tf_workspace(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TF_WORKSPACE", "from_env")
+        self.tf.project_path = str(tmp_path)
+        (tmp_path / ".terraform").mkdir()
+        (tmp_path / ".terraform" / "environment").write_text("production")
+        assert self.tf.workspace_selected() == "from_env"
+
     @pytest.mark.parametrize("exists", [True, False])
     def test_is_initialized(self, tmp_path, exists):
         self.tf.project_path = tmp_path
@@ -246,6 +579,29 @@ class TestTerraformCommands:
         else:
             assert self.tf.is_initialized() is False
 
+    @pytest.mark.parametrize("marker", ["providers", "modules", "ansible_init_fingerprint"])
+    def test_is_initialized_without_backend_block(self, tmp_path, marker):
+        # terraform writes no backend state for the implicit local backend
+        self.tf.project_path = str(tmp_path)
+        (tmp_path / "main.tf").write_text('resource "null_resource" "test" {}')
+        (tmp_path / ".terraform").mkdir()
+        assert self.tf.is_initialized() is False
+
+        if marker == "ansible_init_fingerprint":
+            (tmp_path / ".terraform" / marker).write_text("0123")
+        else:
+            (tmp_path / ".terraform" / marker).mkdir()
+        assert self.tf.is_initialized() is True
+
+    def test_is_initialized_with_tf_data_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TF_DATA_DIR", "data")
+        self.tf.project_path = str(tmp_path)
+        (tmp_path / ".terraform" / "providers").mkdir(parents=True)
+        assert self.tf.is_initialized() is False
+
+        (tmp_path / "data" / "providers").mkdir(parents=True)
+        assert self.tf.is_initialized() is True
+
     @pytest.mark.parametrize(
         "stderr, expected",
         [
@@ -1,5 +1,14 @@
+from unittest.mock import MagicMock
+
 import pytest
-from ansible_collections.cloud.terraform.plugins.module_utils.utils import _convert_value_to_hcl, ansible_dict_to_hcl
+from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.models import TerraformShow
+from ansible_collections.cloud.terraform.plugins.module_utils.utils import (
+    _convert_value_to_hcl,
+    ansible_dict_to_hcl,
+    get_outputs_from_show,
+    preflight_validation,
+)
 
 
 class TestConvertToHCL:
@@ -63,3 +72,60 @@ class TestConvertToHCL:
     def test__ansible_dict_to_hcl(self, value, key, expected):
         res = ansible_dict_to_hcl(value, key)
         assert res == expected, f"Error converting Python dict value to HCL. Expected ({expected}) Got ({res})"
+
+
+class TestGetOutputsFromShow:
+    def test_get_outputs_from_show(self):
+        show = TerraformShow.from_json(
+            {
+                "format_version": "1.0",
+                "terraform_version": "1.5.7",
+                "values": {
+                    "outputs": {
+                        "bucket": {"sensitive": False, "value": "my-bucket", "type": "string"},
+                        "password": {"sensitive": True, "value": "s3cr3t", "type": "string"},
+                        "zones": {"sensitive": False, "value": ["a", "b"], "type": ["list", "string"]},
+                    },
+                    "root_module": {},
+                },
+            }
+        )
+        assert get_outputs_from_show(show) == {
+            "bucket": {"sensitive": False, "value": "my-bucket", "type": "string"},
+            "password": {"sensitive": True, "value": "s3cr3t", "type": "string"},
+            "zones": {"sensitive": False, "value": ["a", "b"], "type": ["list", "string"]},
+        }
+
+    def test_get_outputs_from_show_without_state(self):
+        assert get_outputs_from_show(None) == {}
+
+
+class TestPreflightValidation:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker):
+        mocker.patch("ansible_collections.cloud.terraform.plugins.module_utils.utils.validate_project_path")
+        mocker.patch("ansible_collections.cloud.terraform.plugins.module_utils.utils.validate_bin_path")
+        self.terraform = MagicMock()
+        self.version = LooseVersion("1.5.7")
+
+    def test_without_cache(self):
+        preflight_validation(self.terraform, "/bin/terraform", "/project", self.version, ["-var", "a=b"])
+        self.terraform.validate.assert_called_once_with(self.version, ["-var", "a=b"])
+
+    def test_skip_validate(self):
+        preflight_validation(self.terraform, "/bin/terraform", "/project", self.version, [], skip_validate=True)
+        self.terraform.validate.assert_not_called()
+
+    @pytest.mark.parametrize("cached", [True, False])
+    def test_with_cache(self, cached):
+        cache = MagicMock()
+        cache.key.return_value = "key"
+        cache.has.return_value = cached
+        preflight_validation(self.terraform, "/bin/terraform", "/project", self.version, [], cache=cache)
+        cache.key.assert_called_once_with("/project", self.version, [])
+        if cached:
+            self.terraform.validate.assert_not_called()
+            cache.add.assert_not_called()
+        else:
+            self.terraform.validate.assert_called_once_with(self.version, [])
+            cache.add.assert_called_once_with("key")
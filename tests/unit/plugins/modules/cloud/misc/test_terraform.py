@@ -17,3 +17,15 @@ def test_terraform_without_argument(capfd):
         assert not err
         assert json.loads(out)["failed"]
         assert "project_path" in json.loads(out)["msg"]
+
+
+@pytest.mark.parametrize("option", ["output_excerpt_lines", "diff_max_resources"])
+def test_terraform_negative_count(capfd, tmp_path, option):
+    with set_module_args({"project_path": str(tmp_path), option: -1}):
+        with pytest.raises(SystemExit):
+            terraform.main()
+
+        out, err = capfd.readouterr()
+        assert not err
+        assert json.loads(out)["failed"]
+        assert json.loads(out)["msg"] == "{0} must be greater than or equal to 0".format(option)
@@ -3,12 +3,19 @@
 #
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import copy
+import dataclasses
+from unittest.mock import MagicMock
+
 import pytest
+from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformWarning
 from ansible_collections.cloud.terraform.plugins.module_utils.models import (
     TerraformAttributeSpec,
     TerraformBlockSensitive,
     TerraformNestedAttributeSpec,
     TerraformOutput,
+    TerraformPlanSummary,
     TerraformProviderSchema,
     TerraformProviderSchemaCollection,
     TerraformResourceSchema,
@@ -17,10 +24,15 @@ from ansible_collections.cloud.terraform.plugins.module_utils.models import (
     TerraformShow,
     TerraformShowValues,
     TerraformSimpleAttributeSpec,
+    TerraformState,
 )
 from ansible_collections.cloud.terraform.plugins.modules.terraform import (
     filter_outputs,
     filter_resource_attributes,
+    get_apply_fingerprint,
+    get_diff,
+    get_plan_summary,
+    get_resources_diff,
     is_attribute_in_sensitive_values,
     is_attribute_sensitive_in_providers_schema,
     sanitize_state,
@@ -460,6 +472,94 @@ class TestSanitizeState:
         )
 
 
+class TestGetResourcesDiff:
+    def test_no_changes(self, state_contents):
+        diff = get_resources_diff(state_contents, copy.deepcopy(state_contents), 100)
+        assert diff == dict(before=dict(resources={}, outputs={}), after=dict(resources={}, outputs={}))
+
+    def test_changed_resource_and_output(self, state_contents, root_module_resource):
+        final_state = copy.deepcopy(state_contents)
+        final_state.values.root_module.resources[0].values["content"] = "new content"
+        final_state.values.outputs["my_output"].value = "new_value"
+
+        diff = get_resources_diff(state_contents, final_state, 100)
+        assert list(diff["before"]["resources"]) == ["local_file.foo"]
+        assert diff["before"]["resources"]["local_file.foo"] == dataclasses.asdict(root_module_resource)
+        assert diff["after"]["resources"]["local_file.foo"]["values"]["content"] == "new content"
+        assert diff["before"]["outputs"] == {"my_output": {"sensitive": False, "value": "my_value", "type": "string"}}
+        assert diff["after"]["outputs"] == {"my_output": {"sensitive": False, "value": "new_value", "type": "string"}}
+
+    def test_added_and_removed_resources(self, state_contents):
+        diff = get_resources_diff(None, state_contents, 100)
+        assert diff["before"] == dict(resources={}, outputs={})
+        assert sorted(diff["after"]["resources"]) == ["local_file.foo", "local_sensitive_file.sensitive_foo"]
+        assert sorted(diff["after"]["outputs"]) == ["my_output", "my_sensitive_output"]
+
+        diff = get_resources_diff(state_contents, None, 100)
+        assert sorted(diff["before"]["resources"]) == ["local_file.foo", "local_sensitive_file.sensitive_foo"]
+        assert diff["after"] == dict(resources={}, outputs={})
+
+    def test_max_resources(self, state_contents):
+        diff = get_resources_diff(state_contents, None, 1)
+        assert list(diff["before"]["resources"]) == ["local_file.foo"]
+        assert diff["before"]["omitted_resources"] == 1
+        assert diff["after"] == dict(resources={}, outputs={}, omitted_resources=1)
+
+
+class TestGetDiff:
+    def test_full(self, state_contents):
+        diff = get_diff("full", None, state_contents, 100)
+        assert diff == dict(before={}, after=dataclasses.asdict(state_contents))
+
+    @pytest.mark.parametrize("diff_format", ["resources", "full"])
+    def test_unchanged_without_states(self, diff_format, state_contents):
+        # the skipped runs return the same diff as the runs which did not change anything
+        expected = dict(before={}, after={})
+        if diff_format == "resources":
+            expected = get_resources_diff(state_contents, copy.deepcopy(state_contents), 100)
+        assert get_diff(diff_format, None, None, 100) == expected
+
+
+class TestGetPlanSummary:
+    def test_get_plan_summary(self):
+        terraform = MagicMock(plan_summary=None)
+        assert get_plan_summary(terraform) == {}
+
+        terraform.plan_summary = TerraformPlanSummary(to_add=1)
+        assert get_plan_summary(terraform)["to_add"] == 1
+
+
+class TestGetApplyFingerprint:
+    def get_apply_fingerprint(self, terraform, tmp_path):
+        return get_apply_fingerprint(
+            terraform=terraform,
+            project_path=str(tmp_path),
+            version=LooseVersion("1.5.7"),
+            workspace="default",
+            variables_args=[],
+            variables_files=[],
+            options={},
+        )
+
+    def test_with_state(self, tmp_path):
+        terraform = MagicMock()
+        terraform.state_pull.return_value = TerraformState(
+            version=4, terraform_version="1.5.7", lineage="4a6b1c5e", serial=3, outputs={}, resources=[]
+        )
+        fingerprint, state = self.get_apply_fingerprint(terraform, tmp_path)
+        assert fingerprint is not None
+        assert state == terraform.state_pull.return_value
+
+        terraform.state_pull.return_value.serial = 4
+        assert self.get_apply_fingerprint(terraform, tmp_path)[0] != fingerprint
+
+    @pytest.mark.parametrize("error", [TerraformWarning("no workspace"), ValueError("no state")])
+    def test_without_state(self, tmp_path, error):
+        terraform = MagicMock()
+        terraform.state_pull.side_effect = error
+        assert self.get_apply_fingerprint(terraform, tmp_path) == (None, None)
+
+
 class TestTerraformResourceSchema:
     def test_from_json(self):
         resource = {
@@ -24,3 +24,14 @@ class TestModuleRunCommand:
         completed_process = module_run_command(cmd=cmd, cwd=cwd, check_rc=False)
 
         assert completed_process == (0, "stdout", "stderr")
+
+    def test_module_run_command_with_environ_update(self, mocker, monkeypatch):
+        monkeypatch.setenv("PATH", "/usr/bin")
+        run_patch = mocker.patch("ansible_collections.cloud.terraform.plugins.plugin_utils.common.subprocess.run")
+        run_patch.return_value = CompletedProcess(args=["test"], returncode=0, stdout=b"", stderr=b"")
+
+        module_run_command(cmd=["test"], cwd="test/directory", check_rc=False, environ_update={"TF_WORKSPACE": "dev"})
+
+        env = run_patch.call_args[1]["env"]
+        assert env["TF_WORKSPACE"] == "dev"
+        assert env["PATH"] == "/usr/bin"
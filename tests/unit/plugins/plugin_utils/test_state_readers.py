@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+
+# Copyright: Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import ssl
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from ansible_collections.cloud.terraform.plugins.module_utils.errors import TerraformError
+from ansible_collections.cloud.terraform.plugins.plugin_utils.state_readers import (
+    _ssl_context,
+    connection_pool,
+    fetch_http_state,
+    fetch_local_state,
+    fetch_state,
+    parse_state,
+    state_header,
+    state_unchanged,
+    supports_native_read,
+)
+
+STATE = {
+    "version": 4,
+    "terraform_version": "1.6.3",
+    "lineage": "970415ab-6c6b-82c4-112b-0415b3655014",
+    "serial": 4,
+    "outputs": {},
+    "resources": [],
+}
+ETAG = '"5d41402abc4b2a76"'
+
+
+class StateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    states = {"/state": json.dumps(STATE).encode()}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("Authorization"), self.client_address[1]))
+        body = b""
+        if self.path == "/error":
+            self.send_response(500)
+        elif self.path == "/flaky":
+            failed = len([request for request in self.requests if request[0] == "/flaky"]) <= 2
+            self.send_response(503 if failed else 200)
+            body = b"" if failed else self.states["/state"]
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/state")
+        elif self.path == "/moved-host":
+            self.send_response(307)
+            self.send_header("Location", "http://localhost:%d/state" % self.server.server_port)
+        elif self.path == "/loop":
+            self.send_response(301)
+            self.send_header("Location", "/loop")
+        elif self.path in self.states and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+        elif self.path in self.states:
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            body = self.states[self.path]
+        else:
+            self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_and_parse(backend_type, backend_config, workspace=None):
+    fetched = fetch_state(backend_type, backend_config, workspace)
+    return parse_state(fetched.content, fetched.source)
+
+
+@pytest.fixture
+def http_backend():
+    StateHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StateHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_port
+    connection_pool.clear()
+    server.shutdown()
+    server.server_close()
+
+
+class TestSupportsNativeRead:
+    @pytest.mark.parametrize(
+        "backend_type,backend_config,backend_config_files,expected",
+        [
+            ("local", None, None, True),
+            ("local", {"path": "terraform.tfstate"}, [], True),
+            ("HTTP", {"address": "https://example.com/state", "username": "user"}, None, True),
+            ("local", {"path": "terraform.tfstate"}, ["backend.hcl"], False),
+            ("http", {"address": "https://example.com/state", "headers": {}}, None, False),
+            ("s3", {"bucket": "my-bucket"}, None, False),
+        ],
+    )
+    def test_supports_native_read(self, backend_type, backend_config, backend_config_files, expected):
+        assert supports_native_read(backend_type, backend_config, backend_config_files) is expected
+
+
+class TestParseState:
+    RESOURCES = [
+        {"mode": "managed", "type": "aws_instance", "name": "web", "provider": "aws", "instances": []},
+        {"mode": "managed", "type": "aws_s3_bucket", "name": "logs", "provider": "aws", "instances": []},
+        {"mode": "managed", "module": "module.db", "type": "aws_instance", "name": "db", "provider": "aws"},
+    ]
+
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_parse_state(self, indent):
+        content = json.dumps(dict(STATE, resources=self.RESOURCES), indent=indent).encode()
+        state = parse_state(content, "test")
+        assert [r.name for r in state.resources] == ["web", "logs", "db"]
+        assert state.lineage == STATE["lineage"]
+        assert state.serial == 4
+
+    def test_parse_state_text(self):
+        # the content pulled by terraform is already text
+        state = parse_state(json.dumps(dict(STATE, resources=self.RESOURCES)), "terraform state pull")
+        assert [r.name for r in state.resources] == ["web", "logs", "db"]
+
+    def test_parse_state_keep_resource(self):
+        content = json.dumps(dict(STATE, resources=self.RESOURCES)).encode()
+        kept = []
+
+        def keep_resource(resource):
+            kept.append(resource["name"])
+            return resource["type"] == "aws_instance" and not resource.get("module")
+
+        state = parse_state(content, "test", keep_resource)
+        assert [r.name for r in state.resources] == ["web"]
+        assert kept == ["web", "logs", "db"]
+
+    @pytest.mark.parametrize("resources", ['"resources": []', '"resources" : [ ]'])
+    def test_parse_state_no_resources(self, resources):
+        content = (
+            '{ "version": 4, "terraform_version": "1.6.3", "serial": 1, "lineage": "x", %s }' % resources
+        ).encode()
+        assert parse_state(content, "test").resources == []
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            b'{"version": 4, "resources": [{"type": "aws_instance"}',
+            b'{"version": 4 "serial": 1}',
+            b"[]",
+            b'{"version": 4}',
+        ],
+    )
+    def test_parse_state_invalid(self, content):
+        with pytest.raises(TerraformError, match="Could not parse the state read from test"):
+            parse_state(content, "test")
+
+    def test_parse_state_empty(self):
+        assert parse_state(b"\n", "test") is None
+
+
+class TestStateHeader:
+    def test_state_header(self):
+        assert state_header(json.dumps(STATE, indent=2).encode()) == (STATE["lineage"], 4)
+
+    def test_state_header_text(self):
+        assert state_header(json.dumps(STATE, indent=2)) == (STATE["lineage"], 4)
+
+    def test_state_header_ignores_body(self):
+        state = dict(version=4, outputs={"lineage": {"value": "x"}, "serial": {"value": 1}}, resources=[])
+        assert state_header(json.dumps(state).encode()) is None
+
+    def test_state_header_not_a_state(self):
+        assert state_header(b"") is None
+
+
+class TestStateUnchanged:
+    def test_local_state(self, tmp_path):
+        path = tmp_path / "terraform.tfstate"
+        path.write_text(json.dumps(STATE))
+        validators = fetch_local_state({"path": str(path)}).validators
+        header = (STATE["lineage"], 4)
+        assert state_unchanged("local", {"path": str(path)}, None, validators, header)
+
+        # rewritten with the same serial
+        path.write_text(json.dumps(STATE, indent=2))
+        assert state_unchanged("local", {"path": str(path)}, None, validators, header)
+
+        path.write_text(json.dumps(dict(STATE, serial=5)))
+        assert not state_unchanged("local", {"path": str(path)}, None, validators, header)
+
+    def test_local_state_removed(self, tmp_path):
+        path = tmp_path / "terraform.tfstate"
+        assert state_unchanged("local", {"path": str(path)}, None, {}, None)
+        assert not state_unchanged("local", {"path": str(path)}, None, {}, (STATE["lineage"], 4))
+
+    def test_http_state(self, http_backend):
+        config = {"address": http_backend + "/state"}
+        assert state_unchanged("http", config, None, {"etag": ETAG}, (STATE["lineage"], 4))
+        assert state_unchanged("http", config, None, {"etag": '"other"'}, (STATE["lineage"], 4))
+        assert not state_unchanged("http", config, None, {"etag": '"other"'}, (STATE["lineage"], 3))
+
+
+class TestFetchLocalState:
+    def test_fetch_local_state(self, tmp_path):
+        path = tmp_path / "my.tfstate"
+        path.write_text(json.dumps(STATE))
+        state = fetch_and_parse("local", {"path": str(path)})
+        assert state.lineage == STATE["lineage"]
+        assert state.serial == 4
+
+    def test_fetch_local_state_workspace(self, tmp_path):
+        (tmp_path / "workspaces" / "prod").mkdir(parents=True)
+        (tmp_path / "workspaces" / "prod" / "terraform.tfstate").write_text(json.dumps(dict(STATE, serial=7)))
+        state = fetch_and_parse(
+            "local", {"path": str(tmp_path / "ignored.tfstate"), "workspace_dir": str(tmp_path / "workspaces")}, "prod"
+        )
+        assert state.serial == 7
+
+    def test_fetch_local_state_unchanged(self, tmp_path):
+        path = tmp_path / "terraform.tfstate"
+        path.write_text(json.dumps(STATE))
+        fetched = fetch_local_state({"path": str(path)})
+        assert fetched.modified
+        assert fetch_local_state({"path": str(path)}, validators=fetched.validators).modified is False
+
+        path.write_text(json.dumps(dict(STATE, serial=15)))
+        assert fetch_local_state({"path": str(path)}, validators=fetched.validators).modified
+
+    def test_fetch_local_state_missing(self, tmp_path):
+        assert fetch_and_parse("local", {"path": str(tmp_path / "missing.tfstate")}) is None
+
+    def test_fetch_local_state_invalid(self, tmp_path):
+        path = tmp_path / "terraform.tfstate"
+        path.write_text("{not json")
+        with pytest.raises(TerraformError, match="Could not parse the state"):
+            fetch_and_parse("local", {"path": str(path)})
+
+
+class TestSslContext:
+    @pytest.mark.parametrize("skip_cert_verification", [None, False, "false", "no"])
+    def test_verify_certificate(self, skip_cert_verification):
+        context = _ssl_context({"skip_cert_verification": skip_cert_verification})
+        assert context.verify_mode == ssl.CERT_REQUIRED
+        assert context.check_hostname
+
+    @pytest.mark.parametrize("skip_cert_verification", [True, "true", "yes"])
+    def test_skip_cert_verification(self, skip_cert_verification):
+        context = _ssl_context({"skip_cert_verification": skip_cert_verification})
+        assert context.verify_mode == ssl.CERT_NONE
+        assert not context.check_hostname
+
+
+class TestFetchHttpState:
+    def test_fetch_http_state(self, http_backend):
+        state = fetch_and_parse("http", {"address": http_backend + "/state", "username": "user", "password": "secret"})
+        assert state.serial == 4
+        assert StateHandler.requests == [("/state", "Basic dXNlcjpzZWNyZXQ=", StateHandler.requests[0][2])]
+
+    def test_fetch_http_state_reuses_connection(self, http_backend):
+        fetch_and_parse("http", {"address": http_backend + "/state"})
+        fetch_and_parse("http", {"address": http_backend + "/state"})
+        assert len({port for _path, _auth, port in StateHandler.requests}) == 1
+
+    def test_fetch_http_state_unchanged(self, http_backend):
+        fetched = fetch_http_state({"address": http_backend + "/state"})
+        assert fetched.validators == {"etag": ETAG}
+
+        unchanged = fetch_http_state({"address": http_backend + "/state"}, validators=fetched.validators)
+        assert unchanged.modified is False
+        assert unchanged.content == b""
+        assert unchanged.validators == {"etag": ETAG}
+
+    def test_fetch_http_state_address_from_environment(self, http_backend, monkeypatch):
+        monkeypatch.setenv("TF_HTTP_ADDRESS", http_backend + "/state")
+        assert fetch_and_parse("http", {}).serial == 4
+
+    def test_fetch_http_state_missing(self, http_backend):
+        assert fetch_and_parse("http", {"address": http_backend + "/missing"}) is None
+
+    def test_fetch_http_state_error(self, http_backend):
+        address = http_backend.replace("http://", "http://user:secret@") + "/error"
+        with pytest.raises(TerraformError) as exc:
+            fetch_and_parse("http", {"address": address, "retry_max": "1", "retry_wait_min": 0})
+        assert str(exc.value) == "Could not read the state from the http backend %s/error: HTTP status 500" % (
+            http_backend
+        )
+        assert len(StateHandler.requests) == 2
+
+    def test_fetch_http_state_retries(self, http_backend, monkeypatch):
+        sleep = []
+        monkeypatch.setattr("time.sleep", sleep.append)
+        assert fetch_and_parse("http", {"address": http_backend + "/flaky"}).serial == 4
+        assert sleep == [1, 2]
+
+    def test_fetch_http_state_retry_max_from_environment(self, http_backend, monkeypatch):
+        monkeypatch.setenv("TF_HTTP_RETRY_MAX", "0")
+        with pytest.raises(TerraformError, match="HTTP status 503"):
+            fetch_and_parse("http", {"address": http_backend + "/flaky"})
+
+    def test_fetch_http_state_invalid_retry_max(self, http_backend):
+        with pytest.raises(TerraformError, match="'retry_max' of the http backend must be an integer"):
+            fetch_and_parse("http", {"address": http_backend + "/state", "retry_max": "many"})
+
+    def test_fetch_http_state_redirect(self, http_backend):
+        config = {"address": http_backend + "/moved", "username": "user", "password": "secret"}
+        assert fetch_and_parse("http", config).serial == 4
+        assert [(path, auth) for path, auth, _port in StateHandler.requests] == [
+            ("/moved", "Basic dXNlcjpzZWNyZXQ="),
+            ("/state", "Basic dXNlcjpzZWNyZXQ="),
+        ]
+
+    def test_fetch_http_state_redirect_other_host(self, http_backend):
+        config = {"address": http_backend + "/moved-host", "username": "user", "password": "secret"}
+        assert fetch_and_parse("http", config).serial == 4
+        assert [(path, auth) for path, auth, _port in StateHandler.requests] == [
+            ("/moved-host", "Basic dXNlcjpzZWNyZXQ="),
+            ("/state", None),
+        ]
+
+    def test_fetch_http_state_redirect_loop(self, http_backend):
+        with pytest.raises(TerraformError, match="stopped after 10 redirects"):
+            fetch_and_parse("http", {"address": http_backend + "/loop"})
+
+    def test_fetch_http_state_workspace(self):
+        with pytest.raises(TerraformError, match="does not support workspaces"):
+            fetch_and_parse("http", {"address": "http://127.0.0.1/state"}, "prod")
+
+    def test_fetch_http_state_no_address(self, monkeypatch):
+        monkeypatch.delenv("TF_HTTP_ADDRESS", raising=False)
+        with pytest.raises(TerraformError, match="'address' of the http backend is required"):
+            fetch_and_parse("http", {})